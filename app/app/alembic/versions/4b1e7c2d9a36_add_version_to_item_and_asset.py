@@ -0,0 +1,30 @@
+"""add version to item and asset
+
+Revision ID: 4b1e7c2d9a36
+Revises: 68be5904d3fd
+Create Date: 2026-10-18 09:12:31.482913
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '4b1e7c2d9a36'
+down_revision = '68be5904d3fd'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.add_column('item', sa.Column('version', sa.Integer(), server_default='1', nullable=False))
+    op.add_column('item', sa.Column('updated_at', sa.DateTime(), server_default=sa.func.now(), nullable=True))
+    op.add_column('asset', sa.Column('version', sa.Integer(), server_default='1', nullable=False))
+    op.add_column('asset', sa.Column('updated_at', sa.DateTime(), server_default=sa.func.now(), nullable=True))
+
+
+def downgrade():
+    op.drop_column('asset', 'updated_at')
+    op.drop_column('asset', 'version')
+    op.drop_column('item', 'updated_at')
+    op.drop_column('item', 'version')
@@ -1,6 +1,6 @@
 from fastapi import APIRouter
 
-from api.api_v1.endpoints import items, login, users, utils, assets
+from api.api_v1.endpoints import analytics, items, login, users, utils, assets
 
 api_router = APIRouter()
 api_router.include_router(login.router, tags=["login"])
@@ -8,3 +8,4 @@ api_router.include_router(users.router, prefix="/users", tags=["users"])
 api_router.include_router(utils.router, prefix="/utils", tags=["utils"])
 api_router.include_router(items.router, prefix="/items", tags=["items"])
 api_router.include_router(assets.router, prefix="/assets", tags=["assets"])
+api_router.include_router(analytics.router, prefix="/analytics", tags=["analytics"])
@@ -0,0 +1,70 @@
+from datetime import datetime, timedelta, timezone
+from typing import Any, List, Optional
+
+from fastapi import APIRouter, Depends, HTTPException, Query
+from sqlalchemy.orm import Session
+
+import crud, models, schemas
+from api import deps
+
+router = APIRouter()
+
+MAX_HOURLY_RANGE = timedelta(days=31)
+
+
+def as_utc(value: datetime) -> datetime:
+    if value.tzinfo is not None:
+        value = value.astimezone(timezone.utc).replace(tzinfo=None)
+    return value
+
+
+@router.get("/scans", response_model=List[schemas.ScanRollup])
+def read_scan_rollups(
+    *,
+    db: Session = Depends(deps.get_db),
+    start: datetime,
+    end: datetime,
+    granularity: str = Query("day", regex="^(hour|day)$"),
+    item_id: Optional[int] = None,
+    per_item: bool = False,
+    owner_id: Optional[int] = None,
+    current_user: models.User = Depends(deps.get_current_active_user),
+) -> Any:
+    """
+    Scans per hour or day bucket in [start, end), read from the rollups.
+
+    Returns the totals of all the owner's items, or one series per item with
+    `per_item` (or for a single item with `item_id`).
+    """
+    start, end = as_utc(start), as_utc(end)
+    if end <= start:
+        raise HTTPException(status_code=400, detail="end must be after start")
+    if granularity == "hour" and end - start > MAX_HOURLY_RANGE:
+        raise HTTPException(
+            status_code=400, detail="Hourly ranges are limited to 31 days"
+        )
+    if owner_id is None:
+        owner_id = current_user.id
+    elif owner_id != current_user.id and not crud.user.is_superuser(current_user):
+        raise HTTPException(status_code=403, detail="Not enough permissions")
+    if item_id is not None:
+        item = crud.item.get(db=db, id=item_id)
+        if not item:
+            raise HTTPException(status_code=404, detail="Item not found")
+        if not crud.user.is_superuser(current_user) and (
+            item.owner_id != current_user.id
+        ):
+            raise HTTPException(status_code=403, detail="Not enough permissions")
+        owner_id = item.owner_id
+    if item_id is not None or per_item:
+        return crud.scan_event.get_item_rollups(
+            db,
+            owner_id=owner_id,
+            granularity=granularity,
+            start=start,
+            end=end,
+            item_id=item_id,
+        )
+    return crud.scan_event.get_owner_rollups(
+        db, owner_id=owner_id, granularity=granularity, start=start, end=end
+    )
@@ -1,45 +1,126 @@
-import io
-import qrcode
-import qrcode.image.svg
+from datetime import date
+from typing import Any, Dict, Iterable, List, Optional, Tuple
 
-from typing import Any, List
-
-from fastapi import APIRouter, Depends, HTTPException, UploadFile, File
+from fastapi import APIRouter, Depends, Header, HTTPException, Query, UploadFile, File
+from fastapi.encoders import jsonable_encoder
 from sqlalchemy.orm import Session
+from starlette.concurrency import run_in_threadpool
+from starlette.responses import (
+    JSONResponse,
+    RedirectResponse,
+    Response,
+    StreamingResponse,
+)
 
 import crud
 import models
 import schemas
 from api import deps
-from aws_utils import create_presigned_url, delete_s3_object
+from api.etag import etag_matches, make_etag, not_modified
+from api.fields import fields_param, fields_response, project
+from api.ndjson import ndjson_response, wants_ndjson
+from api.pagination import PageParams, paginate
+from aws_utils import create_presigned_urls, delete_s3_object
+from core.cache import scan_cache
+from core.celery_app import celery_app
 from core.config import settings
+from core.scan_counter import scan_counter
+from core.scan_events import scan_events
+from core.scan_filter import scan_filter
+from crud.crud_item import DuplicateSKUError
+from export_utils import EXPORT_MEDIA_TYPES, iter_export
+from import_utils import ImportValidationError, remove_spooled, spool_upload
+from qr_utils import (
+    QRCODE_MEDIA_TYPES,
+    is_stored_rendering,
+    iter_zip,
+    qr_cache,
+    qrcode_filename,
+    qrcode_object_key,
+    qrcode_payload,
+    render_qrcodes,
+)
+from schemas.item_filter import ITEM_SORT_KEYS
 
 router = APIRouter()
 
 
+def get_item_filter(
+    sku_prefix: Optional[str] = None,
+    type: Optional[List[str]] = Query(None),
+    price_min: Optional[float] = None,
+    price_max: Optional[float] = None,
+    quantity_min: Optional[int] = None,
+    quantity_max: Optional[int] = None,
+    qaod_from: Optional[date] = None,
+    qaod_to: Optional[date] = None,
+    q: Optional[str] = None,
+    sort: str = Query("id", regex="^-?(" + "|".join(ITEM_SORT_KEYS) + ")$"),
+) -> schemas.ItemFilter:
+    return schemas.ItemFilter(
+        sku_prefix=sku_prefix,
+        type=type,
+        price_min=price_min,
+        price_max=price_max,
+        quantity_min=quantity_min,
+        quantity_max=quantity_max,
+        qaod_from=qaod_from,
+        qaod_to=qaod_to,
+        q=q,
+        sort=sort,
+    )
+
+
+item_fields = fields_param(schemas.Item, models.Item)
+asset_fields = fields_param(schemas.Asset, models.Asset)
+
+
 @router.get("/", response_model=List[schemas.Item])
 def read_items(
+    response: Response,
     db: Session = Depends(deps.get_db),
-    skip: int = 0,
-    # limit: int = 100,
+    item_filter: schemas.ItemFilter = Depends(get_item_filter),
+    page: PageParams = Depends(),
+    fields: Optional[List[str]] = Depends(item_fields),
+    accept: Optional[str] = Header(None),
     current_user: models.User = Depends(deps.get_current_active_user),
 ) -> Any:
     """
-    Retrieve items.
+    Retrieve items, a page at a time; the X-Next-Cursor header holds the
+    cursor of the next page.
+
+    Items can be filtered by SKU prefix, types (repeat `type`), price,
+    quantity and QAOD ranges, searched by SKU and description with `q`, and
+    sorted by `sort` (id, sku, price, quantity or qaod; "-" for descending).
+    With `fields`, only those columns are loaded and returned.
+
+    With `Accept: application/x-ndjson`, every matching item is streamed
+    instead, one JSON object per line, and `limit` and `cursor` are ignored.
     """
-    if crud.user.is_superuser(current_user):
-        items = crud.item.get_multi(
-            db,
-            skip=skip,
-            # limit=limit
-        )
-    else:
-        items = crud.item.get_multi_by_owner(
+    owner_id = None if crud.user.is_superuser(current_user) else current_user.id
+    if wants_ndjson(accept):
+        items = crud.item.iter_search(
             db=db,
-            owner_id=current_user.id,
-            skip=skip,
-            # limit=limit
+            item_filter=item_filter,
+            owner_id=owner_id,
+            batch_size=settings.EXPORT_BATCH_SIZE,
+            fields=fields,
+        )
+        return ndjson_response(
+            items, schemas.Item, chunk_rows=settings.EXPORT_BATCH_SIZE, fields=fields
         )
+    response.headers["Vary"] = "Accept"
+    items = paginate(
+        response,
+        page,
+        crud.item.search,
+        db=db,
+        item_filter=item_filter,
+        owner_id=owner_id,
+        fields=fields,
+    )
+    if fields is not None:
+        return fields_response(response, [project(item, fields) for item in items])
     return items
 
 
@@ -53,7 +134,19 @@ def create_item(
     """
     Create new item.
     """
-    item = crud.item.create_with_owner(db=db, obj_in=item_in, owner_id=current_user.id)
+    if crud.item.get_by_sku(db, owner_id=current_user.id, sku=item_in.sku):
+        raise HTTPException(
+            status_code=400, detail="An item with this SKU already exists"
+        )
+    try:
+        item = crud.item.create_with_owner(
+            db=db, obj_in=item_in, owner_id=current_user.id
+        )
+    except DuplicateSKUError:
+        # Created concurrently since the check
+        raise HTTPException(
+            status_code=400, detail="An item with this SKU already exists"
+        )
     return item
 
 
@@ -79,37 +172,266 @@ def delete_item(
 
 @router.post("/upload", response_model=List[schemas.Item])
 def upload_items(
+    response: Response,
     file: UploadFile = File(...),
     *,
     db: Session = Depends(deps.get_db),
     current_user: models.User = Depends(deps.get_current_active_user),
 ) -> Any:
-    items = crud.item.import_from_sheet(db=db, file=file, owner_id=current_user.id)
-    return items
+    """
+    Import a sheet. Rows of a SKU the user already has update that item, and
+    keep its hash; the created and updated items are returned, and the counts
+    are in the X-Import-Inserted, X-Import-Updated and X-Import-Unchanged
+    headers.
+    """
+    try:
+        result = crud.item.import_from_sheet(
+            db=db, file=file, owner_id=current_user.id
+        )
+    except ImportValidationError as e:
+        raise HTTPException(
+            status_code=422,
+            detail=[
+                error._asdict()
+                for error in e.errors[:settings.IMPORT_MAX_REPORTED_ERRORS]
+            ],
+        )
+    response.headers["X-Import-Inserted"] = str(len(result.inserted))
+    response.headers["X-Import-Updated"] = str(len(result.updated))
+    response.headers["X-Import-Unchanged"] = str(result.unchanged)
+    return result.inserted + result.updated
+
+
+@router.post("/upload/stream", response_model=schemas.ImportSummary)
+def upload_items_in_batches(
+    file: UploadFile = File(...),
+    *,
+    db: Session = Depends(deps.get_db),
+    dry_run: bool = False,
+    current_user: models.User = Depends(deps.get_current_active_user),
+) -> Any:
+    """
+    Import a large sheet in batches of IMPORT_BATCH_SIZE rows.
 
+    Each batch is committed on its own and invalid rows are skipped, so the
+    response summarizes the import instead of listing the created items. Rows
+    of existing SKUs update their item like /upload does.
 
-@router.get("/hash/{hash}")
+    With `dry_run` the sheet is only validated: the summary reports its rows
+    and errors, and no item is written.
+    """
+    return crud.item.import_sheet_in_batches(
+        db=db,
+        filename=file.filename,
+        file=file.file,
+        owner_id=current_user.id,
+        batch_size=settings.IMPORT_BATCH_SIZE,
+        max_errors=settings.IMPORT_MAX_REPORTED_ERRORS,
+        dry_run=dry_run,
+    )
+
+
+@router.post("/imports", response_model=schemas.ImportJob, status_code=202)
+def create_import_job(
+    file: UploadFile = File(...),
+    *,
+    db: Session = Depends(deps.get_db),
+    current_user: models.User = Depends(deps.get_current_active_user),
+) -> Any:
+    """
+    Import a sheet in the background; poll the returned job for its progress.
+
+    Uploading a sheet that is already being imported, or was imported, returns
+    the existing job instead of importing it twice.
+    """
+    location, sha256 = spool_upload(file.file)
+    job, created = crud.import_job.create(
+        db,
+        owner_id=current_user.id,
+        filename=file.filename,
+        sha256=sha256,
+        location=location,
+    )
+    if not created:
+        remove_spooled(location)
+        return job
+    celery_app.send_task("app.worker.run_import_job", args=[job.id])
+    return job
+
+
+def get_own_import_job(
+    db: Session, *, id: int, current_user: models.User
+) -> models.ImportJob:
+    job = crud.import_job.get(db=db, id=id)
+    if not job:
+        raise HTTPException(status_code=404, detail="Import job not found")
+    if not crud.user.is_superuser(current_user) and (job.owner_id != current_user.id):
+        raise HTTPException(status_code=403, detail="Not enough permissions")
+    return job
+
+
+@router.get("/imports/{id}", response_model=schemas.ImportJob)
+def read_import_job(
+    *,
+    db: Session = Depends(deps.get_db),
+    id: int,
+    current_user: models.User = Depends(deps.get_current_active_user),
+) -> Any:
+    return get_own_import_job(db, id=id, current_user=current_user)
+
+
+@router.post("/imports/{id}/cancel", response_model=schemas.ImportJob)
+def cancel_import_job(
+    *,
+    db: Session = Depends(deps.get_db),
+    id: int,
+    current_user: models.User = Depends(deps.get_current_active_user),
+) -> Any:
+    """
+    Cancel a queued or running import. Batches already imported are kept.
+    """
+    job = get_own_import_job(db, id=id, current_user=current_user)
+    if not crud.import_job.cancel(db, id=id):
+        raise HTTPException(status_code=409, detail="Import job already finished")
+    db.refresh(job)
+    return job
+
+
+@router.post("/qrcodes/export")
+def export_item_qrcodes(
+    *,
+    db: Session = Depends(deps.get_db),
+    export_in: schemas.QRCodeExport,
+    current_user: models.User = Depends(deps.get_current_active_user),
+) -> Any:
+    """
+    Export the QR codes of many items, or of all my items, as a ZIP archive.
+
+    All my items are streamed from a server-side cursor as they are rendered.
+    """
+    rows: Iterable[Tuple[int, int, str, str]]
+    if export_in.ids is None:
+        rows = crud.item.iter_qrcode_rows(
+            db=db, owner_id=current_user.id, batch_size=settings.EXPORT_BATCH_SIZE
+        )
+    else:
+        ids = set(export_in.ids)
+        rows = list(crud.item.iter_qrcode_rows(db=db, ids=list(ids)))
+        if len(rows) != len(ids):
+            raise HTTPException(status_code=404, detail="Item(s) not found")
+        owned = [row for row in rows if row.owner_id == current_user.id]
+        if not crud.user.is_superuser(current_user) and len(owned) != len(ids):
+            raise HTTPException(status_code=403, detail="Not enough permissions")
+    jobs = (
+        (
+            qrcode_filename(id, sku, export_in.format),
+            (
+                qrcode_payload(hash),
+                export_in.format,
+                export_in.size,
+                export_in.border,
+                export_in.error_correction,
+            ),
+        )
+        for id, _, sku, hash in rows
+    )
+    entries = render_qrcodes(jobs, max_in_flight=settings.QR_EXPORT_MAX_IN_FLIGHT)
+    return StreamingResponse(
+        iter_zip(entries),
+        media_type="application/zip",
+        headers={"Content-Disposition": 'attachment; filename="qrcodes.zip"'},
+    )
+
+
+@router.get("/export")
+def export_items(
+    *,
+    db: Session = Depends(deps.get_db),
+    format: str = Query("csv", regex="^(csv|xlsx|ndjson)$"),
+    current_user: models.User = Depends(deps.get_current_active_user),
+) -> Any:
+    """
+    Export my items, or all items for superusers. CSV and XLSX exports have
+    the columns of an imported sheet and can be imported back.
+
+    Rows are streamed from a server-side cursor as they are encoded, so the
+    size of the catalog does not matter.
+    """
+    owner_id = None if crud.user.is_superuser(current_user) else current_user.id
+    rows = crud.item.iter_export_rows(
+        db=db, owner_id=owner_id, batch_size=settings.EXPORT_BATCH_SIZE
+    )
+    return StreamingResponse(
+        iter_export(format, rows, chunk_rows=settings.EXPORT_BATCH_SIZE),
+        media_type=EXPORT_MEDIA_TYPES[format],
+        headers={"Content-Disposition": f'attachment; filename="items.{format}"'},
+    )
+
+
+def build_scan_payload(item: models.Item) -> Dict[str, Any]:
+    item_out = schemas.Item.from_orm(item)
+    assets = [schemas.Asset.from_orm(asset) for asset in item.assets]
+    linked_assets = [
+        asset for asset in assets if asset.type == 'video' or asset.type == 'doc']
+    keys = [
+        str(item.id) + '-' + str(asset.id) + '-' + asset.link
+        for asset in linked_assets]
+    if item_out.logo:
+        keys.append(str(item.id) + '-logo-' + item_out.logo)
+    urls = create_presigned_urls(
+        settings.AWS_S3_BUCKET_NAME,
+        keys,
+        expiration=settings.AWS_PRESIGNED_URL_EXPIRATION,
+    )
+    for asset, url in zip(linked_assets, urls):
+        asset.presigned_link = url
+    if item_out.logo:
+        item_out.logo = urls[-1]
+    return jsonable_encoder(schemas.ItemScan(item=item_out, assets=assets))
+
+
+def record_scan(
+    item_id: int, hash: str, user_agent: Optional[str], referer: Optional[str]
+) -> None:
+    scan_counter.increment(item_id)
+    scan_events.append(
+        item_id=item_id, hash=hash, user_agent=user_agent, referrer=referer)
+
+
+@router.get("/hash/{hash}", response_model=schemas.ItemScan)
 def get_item_by_hash(
     *,
     db: Session = Depends(deps.get_db),
     hash: str,
+    if_none_match: Optional[str] = Header(None),
+    user_agent: Optional[str] = Header(None),
+    referer: Optional[str] = Header(None),
 ) -> Any:
     """
     Get Item By Hash
     """
-    print(hash)
-    item = crud.item.get_by_hash(db=db, hash=hash)
+    entry = scan_cache.get(hash)
+    if entry is not None:
+        record_scan(entry["payload"]["item"]["id"], hash, user_agent, referer)
+        if etag_matches(if_none_match, entry["etag"]):
+            return not_modified(entry["etag"])
+        return JSONResponse(entry["payload"], headers={"ETag": entry["etag"]})
+    if not scan_filter.might_exist(hash):
+        raise HTTPException(status_code=404, detail="Item not found")
+    item = crud.item.get_by_hash_with_assets(db=db, hash=hash)
     if not item:
+        scan_filter.record_miss(hash)
         raise HTTPException(status_code=404, detail="Item not found")
-    assets = crud.asset.get_multi_by_item(db=db, item_id=item.id)
-    if len(item.logo) > 0:
-        item.logo = create_presigned_url(
-                settings.AWS_S3_BUCKET_NAME, str(item.id) + '-logo-' + item.logo)
-    for asset in assets:
-        if asset.type == 'video' or asset.type == 'doc':
-            asset.presigned_link = create_presigned_url(
-                settings.AWS_S3_BUCKET_NAME, str(item.id) + '-' + str(asset.id) + '-' + asset.link)
-    return {"item": item, "assets": assets}
+    record_scan(item.id, hash, user_agent, referer)
+    # The presigned links are part of the representation, so the ETag changes
+    # before a client could keep reusing links that have expired. They are
+    # signed again on every cache miss, so the ETag is only weak.
+    etag = make_etag("scan", item.id, item.version, scan_cache.link_window(), weak=True)
+    if etag_matches(if_none_match, etag):
+        return not_modified(etag)
+    payload = build_scan_payload(item)
+    scan_cache.set(hash, {"etag": etag, "payload": payload})
+    return JSONResponse(payload, headers={"ETag": etag})
 
 
 @router.put("/{id}", response_model=schemas.Item)
@@ -128,7 +450,18 @@ def update_item(
         raise HTTPException(status_code=404, detail="Item not found")
     if not crud.user.is_superuser(current_user) and (item.owner_id != current_user.id):
         raise HTTPException(status_code=403, detail="Not enough permissions")
-    item = crud.item.update(db=db, db_obj=item, obj_in=item_in)
+    if item_in.sku is not None and item_in.sku != item.sku and crud.item.get_by_sku(
+        db, owner_id=item.owner_id, sku=item_in.sku
+    ):
+        raise HTTPException(
+            status_code=400, detail="An item with this SKU already exists"
+        )
+    try:
+        item = crud.item.update(db=db, db_obj=item, obj_in=item_in)
+    except DuplicateSKUError:
+        raise HTTPException(
+            status_code=400, detail="An item with this SKU already exists"
+        )
     return item
 
 
@@ -137,16 +470,25 @@ def read_item(
     *,
     db: Session = Depends(deps.get_db),
     id: int,
+    response: Response,
+    fields: Optional[List[str]] = Depends(item_fields),
+    if_none_match: Optional[str] = Header(None),
     current_user: models.User = Depends(deps.get_current_active_user),
 ) -> Any:
     """
-    Get item by ID.
+    Get item by ID, or only its `fields`.
     """
     item = crud.item.get(db=db, id=id)
     if not item:
         raise HTTPException(status_code=404, detail="Item not found")
     if not crud.user.is_superuser(current_user) and (item.owner_id != current_user.id):
         raise HTTPException(status_code=403, detail="Not enough permissions")
+    etag = make_etag("item", item.id, item.version, *(fields or []))
+    if etag_matches(if_none_match, etag):
+        return not_modified(etag)
+    response.headers["ETag"] = etag
+    if fields is not None:
+        return fields_response(response, project(item, fields))
     return item
 
 
@@ -193,17 +535,54 @@ def get_item_assets(
     *,
     db: Session = Depends(deps.get_db),
     id: int,
+    response: Response,
+    page: PageParams = Depends(),
+    fields: Optional[List[str]] = Depends(asset_fields),
+    if_none_match: Optional[str] = Header(None),
+    accept: Optional[str] = Header(None),
     current_user: models.User = Depends(deps.get_current_active_user),
 ) -> Any:
     """
-    get all assets belong to an item
+    get all assets belong to an item, a page at a time, or all of them as
+    newline-delimited JSON with `Accept: application/x-ndjson`; with `fields`,
+    only those columns are loaded and returned
     """
     item = crud.item.get(db=db, id=id)
     if not item:
         raise HTTPException(status_code=404, detail="Item not found")
     if not crud.user.is_superuser(current_user) and (item.owner_id != current_user.id):
         raise HTTPException(status_code=403, detail="Not enough permissions")
-    assets = crud.asset.get_multi_by_item(db=db, item_id=id)
+    ndjson = wants_ndjson(accept)
+    # Every asset write bumps the version of its item
+    if ndjson:
+        etag = make_etag("assets", item.id, item.version, "ndjson", *(fields or []))
+    else:
+        etag = make_etag(
+            "assets",
+            item.id,
+            item.version,
+            page.limit,
+            page.cursor or "",
+            *(fields or []),
+        )
+    if etag_matches(if_none_match, etag):
+        return not_modified(etag)
+    if ndjson:
+        assets = crud.asset.iter_by_item(
+            db=db, item_id=id, batch_size=settings.EXPORT_BATCH_SIZE, fields=fields
+        )
+        response = ndjson_response(
+            assets, schemas.Asset, chunk_rows=settings.EXPORT_BATCH_SIZE, fields=fields
+        )
+        response.headers["ETag"] = etag
+        return response
+    response.headers["ETag"] = etag
+    response.headers["Vary"] = "Accept"
+    assets = paginate(
+        response, page, crud.asset.get_page_by_item, db=db, item_id=id, fields=fields
+    )
+    if fields is not None:
+        return fields_response(response, [project(asset, fields) for asset in assets])
     return assets
 
 
@@ -227,29 +606,89 @@ def create_asset(
     return asset
 
 
+@router.get("/{id}/scans", response_model=schemas.ScanCount)
+def get_item_scans(
+    *,
+    db: Session = Depends(deps.get_db),
+    id: int,
+    current_user: models.User = Depends(deps.get_current_active_user),
+) -> Any:
+    """
+    Get how many times the item's QR code was scanned.
+
+    Scans are written in batches, so the count may lag by a few seconds.
+    """
+    item = crud.item.get(db=db, id=id)
+    if not item:
+        raise HTTPException(status_code=404, detail="Item not found")
+    if not crud.user.is_superuser(current_user) and (item.owner_id != current_user.id):
+        raise HTTPException(status_code=403, detail="Not enough permissions")
+    scans = crud.scan_count.get_by_item(db=db, item_id=id)
+    if not scans:
+        return schemas.ScanCount(item_id=id)
+    return scans
+
+
+def qrcode_format_from_accept(accept: Optional[str]) -> Optional[str]:
+    """First QR code format listed in an Accept header"""
+    for media_range in (accept or "").split(","):
+        media_type = media_range.split(";")[0].strip()
+        for format, format_media_type in QRCODE_MEDIA_TYPES.items():
+            if media_type == format_media_type:
+                return format
+    return None
+
+
 @router.get("/{id}/qrcode", response_model=str)
-def get_item_qrcode(
+async def get_item_qrcode(
     *,
     db: Session = Depends(deps.get_db),
     id: int,
+    format: Optional[str] = Query(None, regex="^(svg|png|pdf)$"),
+    size: int = Query(10, ge=1, le=100),
+    border: int = Query(4, ge=0, le=20),
+    error_correction: str = Query("M", regex="^[LMQH]$"),
+    accept: Optional[str] = Header(None),
     current_user: models.User = Depends(deps.get_current_active_user),
 ) -> Any:
     """
     Generate QR Code
+
+    The format is taken from `format`, else from the Accept header. PNG, PDF
+    and SVG requested as image/svg+xml are returned as raw images; otherwise
+    the SVG fragment is returned as a JSON string. Raw images with the default
+    options redirect to the copy stored by the worker once it exists.
     """
-    item = crud.item.get(db=db, id=id)
+    item = await run_in_threadpool(crud.item.get, db=db, id=id)
     if not item:
         raise HTTPException(status_code=404, detail="Item not found")
     if not crud.user.is_superuser(current_user) and (item.owner_id != current_user.id):
         raise HTTPException(status_code=403, detail="Not enough permissions")
 
-    qr = qrcode.QRCode()
-    qr.add_data(settings.MENU_APP_BASE_URL + '/' + item.hash)
-    img = qr.make_image(image_factory=qrcode.image.svg.SvgFragmentImage)
-    file_like = io.BytesIO()
-    img.save(file_like)
-    file_like.seek(0)
-    return file_like.read()
+    accepted = qrcode_format_from_accept(accept)
+    format = format or accepted or "svg"
+    raw = format != "svg" or accepted == "svg"
+    if (
+        raw
+        and item.qrcode_hash == item.hash
+        and is_stored_rendering(size, border, error_correction)
+    ):
+        url = create_presigned_urls(
+            settings.AWS_S3_BUCKET_NAME,
+            [qrcode_object_key(item.hash, format)],
+            expiration=settings.AWS_PRESIGNED_URL_EXPIRATION,
+        )[0]
+        return RedirectResponse(url, status_code=307)
+    data = await qr_cache.get_or_render_async(
+        qrcode_payload(item.hash),
+        format=format,
+        size=size,
+        border=border,
+        error_correction=error_correction,
+    )
+    if not raw:
+        return data.decode()
+    return Response(data, media_type=QRCODE_MEDIA_TYPES[format])
 
 
 @router.post("/{id}/refreshHash", response_model=schemas.Item)
@@ -5,10 +5,12 @@ from fastapi import APIRouter, Body, Depends, HTTPException
 from fastapi.encoders import jsonable_encoder
 from pydantic.networks import EmailStr
 from sqlalchemy.orm import Session
+from starlette.responses import Response
 from core import security
 
 import crud, models, schemas
 from api import deps
+from api.pagination import PageParams, paginate
 from core.config import settings
 from utils import send_new_account_email
 
@@ -17,16 +19,16 @@ router = APIRouter()
 
 @router.get("/", response_model=List[schemas.User])
 def read_users(
+    response: Response,
     db: Session = Depends(deps.get_db),
-    skip: int = 0,
-    limit: int = 100,
+    page: PageParams = Depends(),
     current_user: models.User = Depends(deps.get_current_active_superuser),
 ) -> Any:
     """
-    Retrieve users.
+    Retrieve users, a page at a time; the X-Next-Cursor header holds the
+    cursor of the next page.
     """
-    users = crud.user.get_multi(db, skip=skip, limit=limit)
-    return users
+    return paginate(response, page, crud.user.get_page, db=db)
 
 
 @router.post("/", response_model=schemas.UserWithToken)
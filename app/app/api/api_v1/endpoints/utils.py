@@ -9,9 +9,10 @@ from api import deps
 from core.celery_app import celery_app
 from schemas.objectKey import ObjectKey
 from utils import send_test_email
-from aws_utils import create_presigned_post, create_presigned_url
+from aws_utils import create_presigned_post, create_presigned_url, s3_clients
 
 from core.config import settings
+from core.scan_filter import scan_filter
 
 router = APIRouter()
 
@@ -54,3 +55,13 @@ def test_aws(
     current_user: models.User = Depends(deps.get_current_user),
 ) -> Any:
     return create_presigned_url(settings.AWS_S3_BUCKET_NAME, obj.object_key)
+
+
+@router.get("/metrics")
+def read_metrics(
+    current_user: models.User = Depends(deps.get_current_active_superuser),
+) -> Any:
+    """
+    Process-local counters of the shared resources.
+    """
+    return {"s3_client": s3_clients.stats(), "scan_filter": scan_filter.stats()}
@@ -0,0 +1,37 @@
+from typing import Any, Optional
+
+from starlette.responses import Response
+
+
+def make_etag(*parts: Any, weak: bool = False) -> str:
+    """
+    Build an ETag from the values identifying a representation. It is strong
+    unless `weak`, for representations that are equivalent but not
+    byte-identical.
+    """
+    etag = '"' + "-".join(str(part) for part in parts) + '"'
+    return "W/" + etag if weak else etag
+
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """
+    Evaluate an If-None-Match header against the current ETag (RFC 7232 weak
+    comparison, as required for If-None-Match).
+    """
+    if not if_none_match:
+        return False
+    if etag.startswith("W/"):
+        etag = etag[2:]
+    for tag in if_none_match.split(","):
+        tag = tag.strip()
+        if tag == "*":
+            return True
+        if tag.startswith("W/"):
+            tag = tag[2:]
+        if tag == etag:
+            return True
+    return False
+
+
+def not_modified(etag: str) -> Response:
+    return Response(status_code=304, headers={"ETag": etag})
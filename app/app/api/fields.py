@@ -0,0 +1,57 @@
+from typing import Any, Callable, Dict, List, Optional, Type
+
+from fastapi import HTTPException, Query
+from fastapi.encoders import jsonable_encoder
+from pydantic import BaseModel
+from sqlalchemy import inspect
+from starlette.responses import JSONResponse, Response
+
+
+def selectable_fields(schema: Type[BaseModel], model: Any) -> List[str]:
+    """Fields of a response schema stored in columns of `model`"""
+    columns = {column.key for column in inspect(model).column_attrs}
+    return [name for name in schema.__fields__ if name in columns]
+
+
+def fields_param(
+    schema: Type[BaseModel], model: Any
+) -> Callable[..., Optional[List[str]]]:
+    """
+    Dependency reading a sparse fieldset: the comma-separated `fields` query
+    parameter, limited to the `selectable_fields` of `schema`.
+    """
+    allowed = selectable_fields(schema, model)
+
+    def get_fields(
+        fields: Optional[str] = Query(
+            None, description="Comma-separated fields: " + ", ".join(allowed)
+        ),
+    ) -> Optional[List[str]]:
+        if not fields:
+            return None
+        names = list(dict.fromkeys(name.strip() for name in fields.split(",")))
+        unknown = [name for name in names if name not in allowed]
+        if unknown:
+            raise HTTPException(
+                status_code=400, detail="Unknown fields: " + ", ".join(unknown)
+            )
+        return names
+
+    return get_fields
+
+
+def project(row: Any, fields: List[str]) -> Dict[str, Any]:
+    return jsonable_encoder({name: getattr(row, name) for name in fields})
+
+
+def fields_response(response: Response, content: Any) -> JSONResponse:
+    """
+    Response of projected rows, keeping the headers already set on the
+    endpoint's `response`. It bypasses the response model, whose other fields
+    were not loaded.
+    """
+    projected = JSONResponse(content)
+    for key, value in response.headers.items():
+        if key != "content-length":
+            projected.headers[key] = value
+    return projected
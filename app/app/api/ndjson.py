@@ -0,0 +1,55 @@
+import itertools
+import json
+from typing import Any, Iterable, Iterator, List, Optional, Type
+
+from pydantic import BaseModel
+from starlette.responses import StreamingResponse
+
+from api.fields import project
+
+NDJSON_MEDIA_TYPE = "application/x-ndjson"
+
+
+def wants_ndjson(accept: Optional[str]) -> bool:
+    """Whether an Accept header asks for newline-delimited JSON"""
+    return any(
+        media_range.split(";")[0].strip() == NDJSON_MEDIA_TYPE
+        for media_range in (accept or "").split(",")
+    )
+
+
+def iter_ndjson(
+    rows: Iterable[Any],
+    schema: Type[BaseModel],
+    chunk_rows: int,
+    fields: Optional[List[str]] = None,
+) -> Iterator[bytes]:
+    """
+    ORM rows serialized through `schema`, or only their `fields` when given,
+    one per line and `chunk_rows` a chunk
+    """
+    rows = iter(rows)
+    while True:
+        chunk = list(itertools.islice(rows, chunk_rows))
+        if not chunk:
+            return
+        yield "".join(_encode(row, schema, fields) + "\n" for row in chunk).encode()
+
+
+def _encode(row: Any, schema: Type[BaseModel], fields: Optional[List[str]]) -> str:
+    if fields is None:
+        return schema.from_orm(row).json()
+    return json.dumps(project(row, fields))
+
+
+def ndjson_response(
+    rows: Iterable[Any],
+    schema: Type[BaseModel],
+    chunk_rows: int = 1000,
+    fields: Optional[List[str]] = None,
+) -> StreamingResponse:
+    return StreamingResponse(
+        iter_ndjson(rows, schema, chunk_rows, fields),
+        media_type=NDJSON_MEDIA_TYPE,
+        headers={"Vary": "Accept"},
+    )
@@ -0,0 +1,41 @@
+from typing import Any, Callable, List, Optional, Tuple
+
+from fastapi import HTTPException, Query
+from starlette.responses import Response
+
+from core.config import settings
+from core.pagination import InvalidCursor
+
+
+class PageParams:
+    """
+    Query parameters of a paginated listing: the page size and the cursor
+    returned in the X-Next-Cursor header of the previous page.
+    """
+
+    def __init__(
+        self,
+        limit: int = Query(settings.PAGE_SIZE, ge=1, le=settings.MAX_PAGE_SIZE),
+        cursor: Optional[str] = None,
+    ):
+        self.limit = limit
+        self.cursor = cursor
+
+
+def paginate(
+    response: Response,
+    page: PageParams,
+    get_page: Callable[..., Tuple[List[Any], Optional[str]]],
+    **kwargs: Any,
+) -> List[Any]:
+    """
+    Rows of a page from a CRUD `get_page` method, setting the X-Next-Cursor
+    header unless it is the last page.
+    """
+    try:
+        rows, next_cursor = get_page(limit=page.limit, cursor=page.cursor, **kwargs)
+    except InvalidCursor:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+    if next_cursor is not None:
+        response.headers["X-Next-Cursor"] = next_cursor
+    return rows
@@ -1,4 +1,12 @@
+import datetime
+import hashlib
+import hmac
 import logging
+import os
+import threading
+from typing import Any, Dict, List, Tuple
+from urllib.parse import quote, urlsplit
+
 import boto3
 from botocore.exceptions import ClientError
 from botocore.client import Config
@@ -6,6 +14,61 @@ from botocore.client import Config
 from core.config import settings
 
 
+class S3ClientProvider:
+    """Build one S3 client per process and hand it out to every caller.
+
+    boto3 clients are thread-safe but expensive to construct, so the client
+    is created lazily on first use and rebuilt only when the provider is used
+    from a new process (gunicorn and celery fork their workers).
+    """
+
+    def __init__(self, region: str, max_pool_connections: int):
+        self.region = region
+        self.max_pool_connections = max_pool_connections
+        self._lock = threading.Lock()
+        self._client = None
+        self._pid = None
+        self._hits = 0
+        self._builds = 0
+        if hasattr(os, "register_at_fork"):
+            os.register_at_fork(after_in_child=self._after_fork)
+
+    def _after_fork(self) -> None:
+        # The parent's lock may have been held by another thread at fork time
+        self._lock = threading.Lock()
+        self._client = None
+        self._pid = None
+
+    def get_client(self) -> Any:
+        with self._lock:
+            if self._client is None or self._pid != os.getpid():
+                session = boto3.session.Session(
+                    aws_access_key_id=settings.AWS_ACCESS_KEY_ID,
+                    aws_secret_access_key=settings.AWS_SECRET_ACCESS_KEY,
+                    region_name=self.region,
+                )
+                self._client = session.client(
+                    's3',
+                    config=Config(
+                        signature_version='s3v4',
+                        max_pool_connections=self.max_pool_connections,
+                    ),
+                )
+                self._pid = os.getpid()
+                self._builds += 1
+            else:
+                self._hits += 1
+            return self._client
+
+    def stats(self) -> Dict[str, int]:
+        return {"hits": self._hits, "builds": self._builds}
+
+
+s3_clients = S3ClientProvider(
+    settings.AWS_REGION, settings.AWS_S3_MAX_POOL_CONNECTIONS
+)
+
+
 def create_presigned_url(bucket_name, object_name, expiration=3600, http_method=None):
     """Generate a presigned URL to share an S3 object
 
@@ -17,13 +80,7 @@ def create_presigned_url(bucket_name, object_name, expiration=3600, http_method=
     """
 
     # Generate a presigned URL for the S3 object
-    s3_client = boto3.client(
-        's3',
-        'us-east-2',
-        aws_access_key_id=settings.AWS_ACCESS_KEY_ID,
-        aws_secret_access_key=settings.AWS_SECRET_ACCESS_KEY,
-        config=Config(signature_version='s3v4')
-    )
+    s3_client = s3_clients.get_client()
     try:
         response = s3_client.generate_presigned_url('get_object',
                                                     Params={'Bucket': bucket_name,
@@ -38,6 +95,94 @@ def create_presigned_url(bucket_name, object_name, expiration=3600, http_method=
     return response
 
 
+class S3UrlSigner:
+    """Presign many S3 GET URLs without going through the botocore pipeline.
+
+    Reproduces botocore's SigV4 query-string presigning for `get_object`, so
+    the URLs are byte-identical to `generate_presigned_url`. The SigV4
+    signing key only depends on the date, region and service, so it is
+    derived once per day and reused for every key.
+    """
+
+    def __init__(self, provider: S3ClientProvider):
+        self.provider = provider
+        self._signing_key: Tuple[str, bytes] = ("", b"")
+        self._base_urls: Dict[str, Tuple[str, str, str]] = {}
+
+    def _base_url(self, bucket_name: str) -> Tuple[str, str, str]:
+        # Let botocore resolve the endpoint and addressing style once per
+        # bucket; the URL of every object only differs by the key in its path.
+        base = self._base_urls.get(bucket_name)
+        if base is None:
+            probe = self.provider.get_client().generate_presigned_url(
+                'get_object', Params={'Bucket': bucket_name, 'Key': 'probe'})
+            parts = urlsplit(probe)
+            host = parts.hostname
+            default_port = {'http': 80, 'https': 443}.get(parts.scheme)
+            if parts.port is not None and parts.port != default_port:
+                host = '%s:%d' % (host, parts.port)
+            origin = parts.scheme + '://' + parts.netloc
+            base = (origin, parts.path[:-len('probe')], host)
+            self._base_urls[bucket_name] = base
+        return base
+
+    def _get_signing_key(self, date: str) -> bytes:
+        cached_date, key = self._signing_key
+        if cached_date != date:
+            key = ('AWS4' + settings.AWS_SECRET_ACCESS_KEY).encode('utf-8')
+            for msg in (date, self.provider.region, 's3', 'aws4_request'):
+                key = hmac.new(key, msg.encode('utf-8'), hashlib.sha256).digest()
+            self._signing_key = (date, key)
+        return key
+
+    def presign(
+        self, bucket_name: str, object_names: List[str], expiration: int = 3600
+    ) -> List[str]:
+        origin, base_path, host = self._base_url(bucket_name)
+        timestamp = datetime.datetime.utcnow().strftime('%Y%m%dT%H%M%SZ')
+        date = timestamp[:8]
+        scope = '%s/%s/s3/aws4_request' % (date, self.provider.region)
+        query = '&'.join([
+            'X-Amz-Algorithm=AWS4-HMAC-SHA256',
+            'X-Amz-Credential=' + quote(
+                settings.AWS_ACCESS_KEY_ID + '/' + scope, safe='-_.~'),
+            'X-Amz-Date=' + timestamp,
+            'X-Amz-Expires=%d' % expiration,
+            'X-Amz-SignedHeaders=host',
+        ])
+        # The auth params are already in canonical (sorted) order
+        request_tail = '\n%s\nhost:%s\n\nhost\nUNSIGNED-PAYLOAD' % (query, host)
+        sts_head = 'AWS4-HMAC-SHA256\n%s\n%s\n' % (timestamp, scope)
+        signing_key = self._get_signing_key(date)
+
+        urls = []
+        for object_name in object_names:
+            path = base_path + quote(object_name, safe='/~')
+            canonical_request = 'GET\n' + path + request_tail
+            string_to_sign = sts_head + hashlib.sha256(
+                canonical_request.encode('utf-8')).hexdigest()
+            signature = hmac.new(
+                signing_key, string_to_sign.encode('utf-8'), hashlib.sha256
+            ).hexdigest()
+            urls.append(
+                origin + path + '?' + query + '&X-Amz-Signature=' + signature)
+        return urls
+
+
+s3_signer = S3UrlSigner(s3_clients)
+
+
+def create_presigned_urls(bucket_name, object_names, expiration=3600):
+    """Generate presigned URLs to share many S3 objects in one call
+
+    :param bucket_name: string
+    :param object_names: list of strings
+    :param expiration: Time in seconds for the presigned URLs to remain valid
+    :return: List of presigned URLs, in the order of object_names
+    """
+    return s3_signer.presign(bucket_name, list(object_names), expiration)
+
+
 def create_presigned_post(bucket_name, object_name,
                           fields=None, conditions=None, expiration=3600):
     """Generate a presigned URL S3 POST request to upload a file
@@ -54,13 +199,7 @@ def create_presigned_post(bucket_name, object_name,
     """
 
     # Generate a presigned S3 POST URL
-    s3_client = boto3.client(
-        's3',
-        'us-east-2',
-        aws_access_key_id=settings.AWS_ACCESS_KEY_ID,
-        aws_secret_access_key=settings.AWS_SECRET_ACCESS_KEY,
-        config=Config(signature_version='s3v4')
-    )
+    s3_client = s3_clients.get_client()
     try:
         response = s3_client.generate_presigned_post(bucket_name,
                                                      object_name,
@@ -85,13 +224,58 @@ def delete_s3_object(bucket_name, object_key):
         fields: Dictionary of form fields and values to submit with the POST
     :return: None if error.
     """
-    s3_client = boto3.client(
-        's3',
-        'us-east-2',
-        aws_access_key_id=settings.AWS_ACCESS_KEY_ID,
-        aws_secret_access_key=settings.AWS_SECRET_ACCESS_KEY,
-        config=Config(signature_version='s3v4')
-    )
+    s3_client = s3_clients.get_client()
     delete = s3_client.delete_object(Bucket=bucket_name, Key=object_key)
     print(delete)
     return delete
+
+
+def upload_s3_object(bucket_name, object_key, data, content_type):
+    """Upload bytes to an object in s3 bucket
+
+    :param bucket_name: string
+    :param object_key: string
+    :param data: bytes
+    :param content_type: Content-Type served with the object
+    :return: The put_object response
+    """
+    s3_client = s3_clients.get_client()
+    return s3_client.put_object(
+        Bucket=bucket_name, Key=object_key, Body=data, ContentType=content_type
+    )
+
+
+def delete_s3_objects(bucket_name, object_keys):
+    """Delete many objects in s3 bucket with a single request
+
+    :param bucket_name: string
+    :param object_keys: list of at most 1000 strings
+    :return: The delete_objects response
+    """
+    s3_client = s3_clients.get_client()
+    return s3_client.delete_objects(
+        Bucket=bucket_name,
+        Delete={"Objects": [{"Key": key} for key in object_keys], "Quiet": True},
+    )
+
+
+def upload_s3_fileobj(bucket_name, object_key, fileobj):
+    """Upload a file object to s3 bucket, in parts when it is large
+
+    :param bucket_name: string
+    :param object_key: string
+    :param fileobj: binary file object open for reading
+    """
+    s3_client = s3_clients.get_client()
+    s3_client.upload_fileobj(fileobj, bucket_name, object_key)
+
+
+def download_s3_fileobj(bucket_name, object_key, fileobj):
+    """Download an s3 object into a file object
+
+    :param bucket_name: string
+    :param object_key: string
+    :param fileobj: binary file object open for writing
+    """
+    s3_client = s3_clients.get_client()
+    s3_client.download_fileobj(bucket_name, object_key, fileobj)
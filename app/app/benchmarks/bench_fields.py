@@ -0,0 +1,134 @@
+"""
+Item listing cost for an owner of 10k items, serializing the full item
+versus the sparse fieldset id,sku,price,quantity. The fieldset is measured
+loading every column and loading only its own (load_only), to separate what
+the query saves from what the encoding saves. Measures the query and the JSON
+encoding of a page of 100 and 1000 items and of the whole NDJSON stream, and
+the size of the payloads. Needs the database; the items are created for a
+throwaway user that is deleted afterwards, which cascades to the items.
+
+Run from the app directory: python -m benchmarks.bench_fields
+"""
+import json
+import timeit
+from secrets import token_hex
+
+from fastapi.encoders import jsonable_encoder
+
+import crud
+from api.fields import project
+from api.ndjson import iter_ndjson
+from db.session import SessionLocal
+from models.user import User
+from schemas import Item, ItemFilter, UserCreate
+
+ITEMS = 10000
+PAGE_SIZES = [100, 1000]
+FIELDS = ["id", "sku", "price", "quantity"]
+REPEAT = 5
+# Fields returned, and columns loaded, by each variant
+VARIANTS = [
+    ("full", None, None),
+    ("fields", FIELDS, None),
+    ("load_only", FIELDS, FIELDS),
+]
+
+
+def query_page(db, owner_id: int, limit: int, columns) -> list:
+    # Start from an empty identity map, as a request does
+    db.expunge_all()
+    items, _ = crud.item.search(
+        db, item_filter=ItemFilter(), limit=limit, owner_id=owner_id, fields=columns
+    )
+    return items
+
+
+def encode_page(items: list, fields) -> bytes:
+    if fields is None:
+        # What FastAPI does with the response model
+        content = jsonable_encoder([Item.from_orm(item) for item in items])
+    else:
+        content = [project(item, fields) for item in items]
+    return json.dumps(content).encode()
+
+
+def query_stream(db, owner_id: int, columns) -> list:
+    db.expunge_all()
+    return list(
+        crud.item.iter_search(
+            db, item_filter=ItemFilter(), owner_id=owner_id, fields=columns
+        )
+    )
+
+
+def encode_stream(items: list, fields) -> bytes:
+    return b"".join(iter_ndjson(items, Item, chunk_rows=1000, fields=fields))
+
+
+def milliseconds(run) -> float:
+    return min(timeit.repeat(run, number=1, repeat=REPEAT)) * 1000
+
+
+def main() -> None:
+    db = SessionLocal()
+    user = crud.user.create(
+        db,
+        obj_in=UserCreate(
+            email=f"bench-{token_hex(4)}@example.com", password=token_hex(8)
+        ),
+    )
+    try:
+        crud.item.create_multi_with_owner(
+            db,
+            objs_in=[
+                dict(
+                    sku=f"SKU-{i}",
+                    type="food",
+                    description=f"Item number {i} " + "x" * 40,
+                    price=i % 100 + 0.99,
+                    quantity=i % 50,
+                    qaod="2021-11-20",
+                )
+                for i in range(ITEMS)
+            ],
+            owner_id=user.id,
+        )
+        db.execute("ANALYZE item")
+        print(
+            f"{'listing':>10} {'variant':>10} {'query (ms)':>11}"
+            f" {'encode (ms)':>12} {'size (KB)':>10}"
+        )
+        listings = [
+            (
+                f"page {limit}",
+                lambda columns, limit=limit: query_page(db, user.id, limit, columns),
+                encode_page,
+            )
+            for limit in PAGE_SIZES
+        ]
+        listings.append(
+            (
+                "ndjson",
+                lambda columns: query_stream(db, user.id, columns),
+                encode_stream,
+            )
+        )
+        for name, query, encode in listings:
+            for variant, fields, columns in VARIANTS:
+                query_ms = milliseconds(lambda: query(columns))
+                items = query(columns)
+                encode_ms = milliseconds(lambda: encode(items, fields))
+                size = len(encode(items, fields))
+                print(
+                    f"{name:>10} {variant:>10} {query_ms:>11.1f}"
+                    f" {encode_ms:>12.1f} {size / 1024:>10.1f}"
+                )
+    finally:
+        # Let the database cascade instead of deleting the items one by one
+        db.query(User).filter(User.id == user.id).delete()
+        db.commit()
+        db.close()
+
+
+if __name__ == "__main__":
+    main()
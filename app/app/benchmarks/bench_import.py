@@ -0,0 +1,92 @@
+"""
+Spreadsheet import time for synthetic 1k/10k/100k-row sheets, creating the
+items one by one (one commit per row) versus the batched single-transaction
+import, and re-importing the unchanged sheet, which writes nothing. Needs the
+database; the items are created for a throwaway user that is deleted
+afterwards, which cascades to the items.
+
+Run from the app directory: python -m benchmarks.bench_import
+"""
+import io
+import time
+from secrets import token_hex
+
+import crud
+from db.session import SessionLocal
+from models.user import User
+from schemas import ItemCreate, UserCreate
+
+ROW_COUNTS = [1000, 10000, 100000]
+# Creating rows one by one is only measured up to this many rows
+MAX_ONE_BY_ONE = 10000
+
+
+class Sheet:
+    """Stand-in for the UploadFile of a CSV sheet"""
+
+    def __init__(self, rows: int):
+        lines = ["SKU,Type,Description,Price,Quantity,QAOD"]
+        lines += [
+            f"SHEET-{rows}-{i},food,Item number {i},${i % 100}.99,{i % 50},2021-11-20"
+            for i in range(rows)
+        ]
+        self.filename = "items.csv"
+        self.content = "\n".join(lines).encode()
+
+    @property
+    def file(self) -> io.BytesIO:
+        return io.BytesIO(self.content)
+
+
+def import_one_by_one(db, rows: int, owner_id: int) -> None:
+    for i in range(rows):
+        crud.item.create_with_owner(
+            db=db,
+            obj_in=ItemCreate(
+                sku=f"ROW-{rows}-{i}",
+                type="food",
+                description=f"Item number {i}",
+                price=i % 100 + 0.99,
+                quantity=i % 50,
+                qaod="2021-11-20",
+            ),
+            owner_id=owner_id,
+        )
+
+
+def main() -> None:
+    db = SessionLocal()
+    user = crud.user.create(
+        db,
+        obj_in=UserCreate(
+            email=f"bench-{token_hex(4)}@example.com", password=token_hex(8)
+        ),
+    )
+    try:
+        print(
+            f"{'rows':>7} {'one by one (s)':>15} {'batched (s)':>12}"
+            f" {'re-import (s)':>14}"
+        )
+        for rows in ROW_COUNTS:
+            before = float("nan")
+            if rows <= MAX_ONE_BY_ONE:
+                start = time.perf_counter()
+                import_one_by_one(db, rows, user.id)
+                before = time.perf_counter() - start
+            sheet = Sheet(rows)
+            start = time.perf_counter()
+            crud.item.import_from_sheet(db=db, file=sheet, owner_id=user.id)
+            after = time.perf_counter() - start
+            start = time.perf_counter()
+            crud.item.import_from_sheet(db=db, file=sheet, owner_id=user.id)
+            again = time.perf_counter() - start
+            print(f"{rows:>7} {before:>15.2f} {after:>12.2f} {again:>14.2f}")
+    finally:
+        # Let the database cascade instead of deleting the items one by one
+        db.query(User).filter(User.id == user.id).delete()
+        db.commit()
+        db.close()
+
+
+if __name__ == "__main__":
+    main()
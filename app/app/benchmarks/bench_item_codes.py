@@ -0,0 +1,53 @@
+"""
+QR version and PNG size of item payloads with 22-character token hashes
+versus 9-character short codes, over a sample of item ids, for every error
+correction level.
+
+Run from the app directory: python -m benchmarks.bench_item_codes
+"""
+import random
+import statistics
+from collections import Counter
+from secrets import token_urlsafe
+from typing import Callable, List
+
+import qrcode
+
+from core.config import settings
+from core.item_codes import ItemCodec
+from qr_utils import ERROR_CORRECTION_LEVELS, qrcode_payload, render_qrcode
+
+SAMPLE = 200
+
+
+def qr_version(payload: str, error_correction: str) -> int:
+    qr = qrcode.QRCode(error_correction=ERROR_CORRECTION_LEVELS[error_correction])
+    qr.add_data(payload)
+    qr.make(fit=True)
+    return qr.version
+
+
+def report(name: str, make_hash: Callable[[int], str], ids: List[int]) -> None:
+    payloads = [qrcode_payload(make_hash(id)) for id in ids]
+    print(f"{name}: payload {len(payloads[0])} chars")
+    for level in ERROR_CORRECTION_LEVELS:
+        versions = Counter(qr_version(payload, level) for payload in payloads)
+        sizes = [
+            len(render_qrcode(payload, "png", error_correction=level))
+            for payload in payloads
+        ]
+        print(f"  {level}: versions "
+              + ", ".join(f"v{v}: {n}" for v, n in sorted(versions.items()))
+              + f", median PNG {statistics.median(sizes):.0f} B")
+
+
+def main() -> None:
+    codec = ItemCodec("benchmark")
+    ids = random.sample(range(1, 10 ** 7), SAMPLE)
+    print(f"MENU_APP_BASE_URL={settings.MENU_APP_BASE_URL}")
+    report("token", lambda id: token_urlsafe(16), ids)
+    report("short", lambda id: codec.next_code(id), ids)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,40 @@
+"""
+Presigning cost of 1/10/100 object keys, one botocore call per key versus a
+single batch call reusing the SigV4 signing key.
+
+Run from the app directory: python -m benchmarks.bench_presign
+"""
+import timeit
+
+from aws_utils import create_presigned_url, create_presigned_urls
+from core.config import settings
+
+KEY_COUNTS = [1, 10, 100]
+REPEAT = 50
+
+
+def presign_one_by_one(keys) -> None:
+    for key in keys:
+        create_presigned_url(settings.AWS_S3_BUCKET_NAME, key)
+
+
+def presign_batch(keys) -> None:
+    create_presigned_urls(settings.AWS_S3_BUCKET_NAME, keys)
+
+
+def main() -> None:
+    # Warm up the pooled client and the batch signer's endpoint lookup
+    presign_batch(["warmup"])
+    print(f"{'keys':>5} {'botocore (ms)':>14} {'batch (ms)':>11} {'speedup':>8}")
+    for count in KEY_COUNTS:
+        keys = [f"1-{i}-asset-{i}.mp4" for i in range(count)]
+        before = min(timeit.repeat(
+            lambda: presign_one_by_one(keys), number=1, repeat=REPEAT))
+        after = min(timeit.repeat(
+            lambda: presign_batch(keys), number=1, repeat=REPEAT))
+        print(f"{count:>5} {before * 1000:>14.3f} {after * 1000:>11.3f} "
+              f"{before / after:>7.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,26 @@
+"""
+QR code render throughput per output format, for a typical item payload.
+
+Run from the app directory: python -m benchmarks.bench_qr_render
+"""
+import timeit
+
+from qr_utils import QRCODE_MEDIA_TYPES, render_qrcode
+
+PAYLOAD = "https://menu.example.com/" + "x" * 22
+SIZES = [4, 10, 25]
+NUMBER = 20
+
+
+def main() -> None:
+    print(f"{'format':>6} {'size':>5} {'renders/s':>10} {'bytes':>8}")
+    for format in QRCODE_MEDIA_TYPES:
+        for size in SIZES:
+            seconds = min(timeit.repeat(
+                lambda: render_qrcode(PAYLOAD, format, size), number=NUMBER, repeat=3))
+            data = render_qrcode(PAYLOAD, format, size)
+            print(f"{format:>6} {size:>5} {NUMBER / seconds:>10.1f} {len(data):>8}")
+
+
+if __name__ == "__main__":
+    main()
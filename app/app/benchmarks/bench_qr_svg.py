@@ -0,0 +1,47 @@
+"""
+SVG output size and render time of the qrcode SvgFragmentImage factory (one
+<rect> per dark module) versus the single <path> renderer, for QR versions
+1 to 20. The QR matrix is built once per version; only the SVG is timed.
+
+Run from the app directory: python -m benchmarks.bench_qr_svg
+"""
+import io
+import timeit
+
+import numpy
+import qrcode
+import qrcode.image.svg
+
+from qr_utils import matrix_to_svg
+
+VERSIONS = range(1, 21)
+REPEAT = 5
+
+
+def render_factory(qr: qrcode.QRCode) -> bytes:
+    img = qr.make_image(image_factory=qrcode.image.svg.SvgFragmentImage)
+    file_like = io.BytesIO()
+    img.save(file_like)
+    return file_like.getvalue()
+
+
+def render_path(qr: qrcode.QRCode) -> bytes:
+    return matrix_to_svg(numpy.array(qr.get_matrix(), dtype=bool), 10)
+
+
+def main() -> None:
+    print(f"{'version':>7} {'factory (B)':>12} {'path (B)':>9} "
+          f"{'factory (ms)':>13} {'path (ms)':>10} {'speedup':>8}")
+    for version in VERSIONS:
+        qr = qrcode.QRCode(version=version)
+        qr.add_data("QR")
+        qr.make(fit=False)
+        before = min(timeit.repeat(lambda: render_factory(qr), number=1, repeat=REPEAT))
+        after = min(timeit.repeat(lambda: render_path(qr), number=1, repeat=REPEAT))
+        print(f"{version:>7} {len(render_factory(qr)):>12} "
+              f"{len(render_path(qr)):>9} {before * 1000:>13.2f} "
+              f"{after * 1000:>10.2f} {before / after:>7.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,57 @@
+"""
+Per-scan presigning latency with a fresh S3 client per call versus the
+pooled process-wide client.
+
+Run from the app directory: python -m benchmarks.bench_s3_client
+"""
+import timeit
+
+import boto3
+from botocore.client import Config
+
+from aws_utils import create_presigned_url
+from core.config import settings
+
+ASSET_COUNTS = [0, 5, 20]
+REPEAT = 20
+
+
+def presign_with_new_client(key: str) -> str:
+    s3_client = boto3.client(
+        's3',
+        settings.AWS_REGION,
+        aws_access_key_id=settings.AWS_ACCESS_KEY_ID,
+        aws_secret_access_key=settings.AWS_SECRET_ACCESS_KEY,
+        config=Config(signature_version='s3v4')
+    )
+    return s3_client.generate_presigned_url(
+        'get_object',
+        Params={'Bucket': settings.AWS_S3_BUCKET_NAME, 'Key': key},
+        ExpiresIn=3600,
+    )
+
+
+def presign_with_pooled_client(key: str) -> str:
+    return create_presigned_url(settings.AWS_S3_BUCKET_NAME, key)
+
+
+def scan(presign, assets: int) -> None:
+    # One presign for the logo and one per video/doc asset
+    presign('1-logo-logo.png')
+    for i in range(assets):
+        presign(f'1-{i}-video.mp4')
+
+
+def main() -> None:
+    print(f"{'assets':>6} {'new client (ms)':>16} {'pooled (ms)':>12} {'speedup':>8}")
+    for assets in ASSET_COUNTS:
+        before = min(timeit.repeat(
+            lambda: scan(presign_with_new_client, assets), number=1, repeat=REPEAT))
+        after = min(timeit.repeat(
+            lambda: scan(presign_with_pooled_client, assets), number=1, repeat=REPEAT))
+        print(f"{assets:>6} {before * 1000:>16.2f} {after * 1000:>12.2f} "
+              f"{before / after:>7.1f}x")
+
+
+if __name__ == "__main__":
+    main()
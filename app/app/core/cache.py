@@ -0,0 +1,254 @@
+import bisect
+import json
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
+
+from core.config import settings
+
+
+class CacheBackend:
+    """
+    Minimal key/value interface shared by every cache backend.
+
+    Values must be JSON-serializable so that every backend can store them.
+    """
+
+    def get(self, key: str) -> Optional[Any]:
+        raise NotImplementedError
+
+    def set(self, key: str, value: Any, ttl: float) -> None:
+        raise NotImplementedError
+
+    def delete(self, *keys: str) -> None:
+        raise NotImplementedError
+
+    def clear(self) -> None:
+        raise NotImplementedError
+
+    def append(self, key: str, values: Sequence[str], max_entries: int) -> str:
+        """
+        Append `values` as one entry of the log at `key`, which keeps about its
+        last `max_entries` entries, and return the id of the entry.
+        """
+        raise NotImplementedError
+
+    def read_after(self, key: str, after: str) -> Optional[Tuple[str, List[str]]]:
+        """
+        Id of the last entry of a log and the values of the entries appended
+        after the entry `after`, or None once `after` is not in the log anymore.
+        """
+        raise NotImplementedError
+
+
+class NullBackend(CacheBackend):
+    """Backend that never stores anything, used when caching is disabled."""
+
+    def get(self, key: str) -> Optional[Any]:
+        return None
+
+    def set(self, key: str, value: Any, ttl: float) -> None:
+        pass
+
+    def delete(self, *keys: str) -> None:
+        pass
+
+    def clear(self) -> None:
+        pass
+
+    def append(self, key: str, values: Sequence[str], max_entries: int) -> str:
+        return "0"
+
+    def read_after(self, key: str, after: str) -> Optional[Tuple[str, List[str]]]:
+        return after, []
+
+
+class MemoryBackend(CacheBackend):
+    """
+    In-process LRU cache with a per-entry TTL.
+
+    Every entry keeps its own deadline, so callers can shorten the lifetime of
+    entries that embed short-lived data such as presigned links.
+    """
+
+    def __init__(
+        self,
+        max_entries: int = 1024,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        self.max_entries = max_entries
+        self.clock = clock
+        self._entries: "OrderedDict[str, Tuple[float, Any]]" = OrderedDict()
+        self._logs: Dict[str, List[Tuple[int, List[str]]]] = {}
+        self._last_log_id = 0
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> Optional[Any]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            deadline, value = entry
+            if deadline <= self.clock():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return value
+
+    def set(self, key: str, value: Any, ttl: float) -> None:
+        if ttl <= 0 or self.max_entries <= 0:
+            return
+        with self._lock:
+            self._entries[key] = (self.clock() + ttl, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def delete(self, *keys: str) -> None:
+        with self._lock:
+            for key in keys:
+                self._entries.pop(key, None)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    def append(self, key: str, values: Sequence[str], max_entries: int) -> str:
+        with self._lock:
+            self._last_log_id += 1
+            log = self._logs.setdefault(key, [])
+            log.append((self._last_log_id, list(values)))
+            del log[:-max_entries]
+            return str(self._last_log_id)
+
+    def read_after(self, key: str, after: str) -> Optional[Tuple[str, List[str]]]:
+        with self._lock:
+            log = self._logs.get(key, [])
+            index = bisect.bisect_left(log, (int(after),))
+            if index == len(log) or log[index][0] != int(after):
+                return None
+            values = [value for _, entry in log[index + 1:] for value in entry]
+            return str(log[-1][0]), values
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+class RedisBackend(CacheBackend):
+    """
+    Backend speaking the Redis protocol, shared by every worker process.
+
+    `client` is anything exposing the redis-py `get`, `set(..., px=...)` and
+    `delete` methods, and `xadd` and `xrange` for logs, which are streams.
+    Expiry and eviction are left to the Redis server (configure
+    `maxmemory-policy allkeys-lru` for LRU behaviour).
+    """
+
+    def __init__(self, client: Any, prefix: str = ""):
+        self.client = client
+        self.prefix = prefix
+
+    @classmethod
+    def from_url(cls, url: str, prefix: str = "") -> "RedisBackend":
+        import redis
+
+        return cls(redis.Redis.from_url(url), prefix=prefix)
+
+    def get(self, key: str) -> Optional[Any]:
+        raw = self.client.get(self.prefix + key)
+        if raw is None:
+            return None
+        return json.loads(raw)
+
+    def set(self, key: str, value: Any, ttl: float) -> None:
+        if ttl <= 0:
+            return
+        self.client.set(
+            self.prefix + key, json.dumps(value), px=max(1, int(ttl * 1000))
+        )
+
+    def delete(self, *keys: str) -> None:
+        if keys:
+            self.client.delete(*[self.prefix + key for key in keys])
+
+    def clear(self) -> None:
+        keys = list(self.client.scan_iter(match=self.prefix + "*"))
+        if keys:
+            self.client.delete(*keys)
+
+    def append(self, key: str, values: Sequence[str], max_entries: int) -> str:
+        id = self.client.xadd(
+            self.prefix + key,
+            {"values": "\n".join(values)},
+            maxlen=max_entries,
+            approximate=True,
+        )
+        return id.decode()
+
+    def read_after(self, key: str, after: str) -> Optional[Tuple[str, List[str]]]:
+        entries = self.client.xrange(self.prefix + key, min=after)
+        if not entries or entries[0][0].decode() != after:
+            return None
+        values = [
+            value
+            for _, fields in entries[1:]
+            for value in fields[b"values"].decode().split("\n")
+            if value
+        ]
+        return entries[-1][0].decode(), values
+
+
+class ScanCache:
+    """
+    Read-through cache for the public scan payload, keyed by item hash.
+
+    Payloads embed presigned links, so an entry never outlives
+    `max_link_age` seconds: whoever receives a cached payload still has at
+    least the remaining link validity to fetch the objects.
+    """
+
+    def __init__(self, backend: CacheBackend, ttl: float, max_link_age: float):
+        self.backend = backend
+        self.ttl = ttl
+        self.max_link_age = max_link_age
+
+    @property
+    def entry_ttl(self) -> float:
+        return min(self.ttl, self.max_link_age)
+
+    def link_window(self) -> int:
+        """
+        Number of the current `max_link_age`-long wall-clock window.
+
+        Two payloads built in the same window carry links that are both still
+        valid, so the window can be part of a validator such as an ETag.
+        """
+        return int(time.time() // self.max_link_age)
+
+    def get(self, hash: str) -> Optional[Dict[str, Any]]:
+        return self.backend.get(hash)
+
+    def set(self, hash: str, payload: Dict[str, Any]) -> None:
+        self.backend.set(hash, payload, self.entry_ttl)
+
+    def invalidate(self, *hashes: Optional[str]) -> None:
+        self.backend.delete(*[hash for hash in hashes if hash])
+
+
+def get_cache_backend(prefix: str, max_entries: int) -> CacheBackend:
+    if settings.CACHE_BACKEND == "redis":
+        return RedisBackend.from_url(settings.CACHE_REDIS_URL, prefix=prefix)
+    if settings.CACHE_BACKEND == "memory":
+        return MemoryBackend(max_entries=max_entries)
+    return NullBackend()
+
+
+scan_cache = ScanCache(
+    get_cache_backend("scan:", settings.SCAN_CACHE_MAX_ENTRIES),
+    ttl=settings.SCAN_CACHE_TTL_SECONDS,
+    max_link_age=(
+        settings.AWS_PRESIGNED_URL_EXPIRATION
+        - settings.SCAN_CACHE_MIN_LINK_VALIDITY_SECONDS
+    ),
+)
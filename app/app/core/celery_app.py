@@ -1,5 +1,20 @@
 from celery import Celery
 
+from core.config import settings
+
 celery_app = Celery("worker", broker="amqp://guest@queue//")
 
-celery_app.conf.task_routes = {"app.worker.test_celery": "main-queue"}
+celery_app.conf.task_routes = {
+    "app.worker.test_celery": "main-queue",
+    "app.worker.load_scan_events": "main-queue",
+    "app.worker.generate_qrcodes": "main-queue",
+    "app.worker.delete_qrcodes": "main-queue",
+    "app.worker.run_import_job": "main-queue",
+}
+
+celery_app.conf.beat_schedule = {
+    "load-scan-events": {
+        "task": "app.worker.load_scan_events",
+        "schedule": settings.SCAN_EVENT_LOAD_SECONDS,
+    },
+}
@@ -84,7 +84,114 @@ class Settings(BaseSettings):
     AWS_ACCESS_KEY_ID: str
     AWS_SECRET_ACCESS_KEY: str
     AWS_S3_BUCKET_NAME: str
+    AWS_REGION: str = "us-east-2"
+    AWS_S3_MAX_POOL_CONNECTIONS: int = 10
     MENU_APP_BASE_URL: str
+    AWS_PRESIGNED_URL_EXPIRATION: int = 3600
+
+    # Number of gunicorn workers, read from the same variable as the image's
+    # gunicorn config
+    WEB_CONCURRENCY: int = 1
+    CACHE_REDIS_URL: Optional[str] = None
+    # "redis" shares caches between workers, "memory" keeps them per process
+    # and "none" disables caching. Defaults to "redis" when CACHE_REDIS_URL is
+    # set, else "none". With "memory", invalidation only reaches the process
+    # making the change, so it needs a single worker, and changes made by the
+    # celery worker reach scans after SCAN_CACHE_TTL_SECONDS.
+    CACHE_BACKEND: Optional[str] = None
+
+    @validator("CACHE_BACKEND", pre=True, always=True)
+    def cache_backend_is_shared(cls, v: Optional[str], values: Dict[str, Any]) -> str:
+        if not v:
+            v = "redis" if values.get("CACHE_REDIS_URL") else "none"
+        if v == "redis" and not values.get("CACHE_REDIS_URL"):
+            raise ValueError("CACHE_REDIS_URL is required by the redis backend")
+        if v == "memory" and values.get("WEB_CONCURRENCY", 1) > 1:
+            raise ValueError(
+                "the memory backend is per process, set CACHE_REDIS_URL to run "
+                "several workers"
+            )
+        return v
+
+    SCAN_CACHE_TTL_SECONDS: int = 300
+    SCAN_CACHE_MAX_ENTRIES: int = 10000
+    # Cached scan payloads are dropped while their presigned links still have
+    # at least this many seconds left
+    SCAN_CACHE_MIN_LINK_VALIDITY_SECONDS: int = 600
+
+    # The scan filter answers "unknown" from state that every API process and
+    # the celery worker must share, so it needs the redis cache backend, and
+    # defaults to enabled with it
+    SCAN_FILTER_ENABLED: Optional[bool] = None
+
+    @validator("SCAN_FILTER_ENABLED", always=True)
+    def scan_filter_needs_redis(cls, v: Optional[bool], values: Dict[str, Any]) -> bool:
+        shared = values.get("CACHE_BACKEND") == "redis"
+        if v and not shared:
+            raise ValueError("the scan filter needs the redis cache backend")
+        return shared if v is None else v
+
+    SCAN_FILTER_ERROR_RATE: float = 0.001
+    SCAN_FILTER_REBUILD_SECONDS: int = 3600
+    # Writes added to the shared log of new hashes kept for processes that have
+    # not applied them yet; one further behind rebuilds its filter
+    SCAN_FILTER_MAX_LOG_ENTRIES: int = 100000
+    SCAN_NEGATIVE_CACHE_TTL_SECONDS: int = 30
+    SCAN_NEGATIVE_CACHE_MAX_ENTRIES: int = 100000
+
+    SCAN_COUNTER_FLUSH_SECONDS: int = 10
+    SCAN_COUNTER_FLUSH_EVENTS: int = 1000
+
+    # Directory of the raw scan event log, written by the API and loaded into
+    # the analytics tables by the celery worker, so it must be a volume mounted
+    # in both containers; unset disables the log
+    SCAN_EVENT_LOG_DIR: Optional[str] = None
+    SCAN_EVENT_FLUSH_SECONDS: int = 5
+    SCAN_EVENT_FLUSH_EVENTS: int = 1000
+    SCAN_EVENT_SEGMENT_SECONDS: int = 60
+    SCAN_EVENT_LOAD_SECONDS: int = 60
+
+    # Rendered QR codes are kept in memory up to this size and, when a
+    # directory is set, also written to disk
+    QR_CACHE_MAX_BYTES: int = 32 * 1024 * 1024
+    QR_CACHE_DIR: Optional[str] = None
+    # Processes rendering bulk QR exports, 0 uses one per CPU
+    QR_RENDER_PROCESSES: int = 0
+    QR_EXPORT_MAX_IN_FLIGHT: int = 32
+    # Render QR codes in the celery worker and store them in S3 when items
+    # are created or their hash changes
+    QR_PREGENERATE_ENABLED: bool = True
+    QR_PREGENERATE_BATCH_SIZE: int = 500
+    # Tasks are published to the broker in the background, at most this long
+    # after the write
+    QR_PREGENERATE_FLUSH_SECONDS: int = 1
+
+    # "token" gives new items a random 22-character hash, "short" a 9-character
+    # code encrypting the item id with ITEM_CODE_KEY. Both are always accepted
+    # on scan, so the scheme can change without breaking printed codes.
+    ITEM_CODE_SCHEME: str = "token"
+    ITEM_CODE_KEY: Optional[str] = None
+
+    @validator("ITEM_CODE_KEY")
+    def item_code_key_is_set(cls, v: Optional[str], values: Dict[str, Any]) -> Any:
+        if values.get("ITEM_CODE_SCHEME") == "short" and not v:
+            raise ValueError("ITEM_CODE_KEY is required by the short code scheme")
+        return v
+
+    # Rows per page of listings, unless the client asks for fewer or more
+    PAGE_SIZE: int = 100
+    MAX_PAGE_SIZE: int = 1000
+
+    # Maximum number of row errors reported for an imported sheet
+    IMPORT_MAX_REPORTED_ERRORS: int = 100
+    # Rows parsed and committed at once by streaming imports, which bounds
+    # their memory use
+    IMPORT_BATCH_SIZE: int = 5000
+    # Directory shared with the celery worker where background imports spool
+    # their uploads; unset spools them to S3
+    IMPORT_SPOOL_DIR: Optional[str] = None
+    # Rows fetched from the server-side cursor, and encoded, at once by exports
+    EXPORT_BATCH_SIZE: int = 1000
 
     class Config:
         env_file = ".env"
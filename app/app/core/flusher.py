@@ -0,0 +1,75 @@
+import atexit
+import logging
+import os
+import threading
+from typing import Any, Optional
+
+logger = logging.getLogger(__name__)
+
+
+class BufferedFlusher:
+    """
+    Base class for write-behind buffers drained by a background thread.
+
+    Subclasses record events in memory under `self._lock`, call `_added`
+    with the number of buffered events, and implement `_flush_once`. The
+    buffer is flushed every `interval` seconds, as soon as `max_pending`
+    events are buffered, and when the process shuts down.
+    """
+
+    def __init__(self, interval: float, max_pending: int):
+        self.interval = interval
+        self.max_pending = max_pending
+        self._lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._stopped = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        if hasattr(os, "register_at_fork"):
+            os.register_at_fork(after_in_child=self._after_fork)
+
+    def _after_fork(self) -> None:
+        # Events buffered by the parent are flushed by the parent; the
+        # background thread does not survive the fork.
+        self._lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._stopped = threading.Event()
+        self._thread = None
+        self._reset()
+
+    def _reset(self) -> None:
+        raise NotImplementedError
+
+    def _flush_once(self) -> Any:
+        raise NotImplementedError
+
+    def _added(self, pending: int) -> None:
+        if pending >= self.max_pending:
+            self._wakeup.set()
+
+    def flush(self) -> Any:
+        try:
+            return self._flush_once()
+        except Exception as e:
+            logger.error(e)
+
+    def _run(self) -> None:
+        while not self._stopped.is_set():
+            self._wakeup.wait(self.interval)
+            self._wakeup.clear()
+            self.flush()
+
+    def start(self) -> None:
+        if self._thread is not None and self._thread.is_alive():
+            return
+        self._stopped.clear()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+        atexit.register(self.stop)
+
+    def stop(self) -> None:
+        self._stopped.set()
+        self._wakeup.set()
+        if self._thread is not None:
+            self._thread.join(timeout=self.interval)
+            self._thread = None
+        self.flush()
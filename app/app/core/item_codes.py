@@ -0,0 +1,86 @@
+import hashlib
+import secrets
+from typing import Optional, Tuple
+
+from core.config import settings
+
+ALPHABET = "0123456789ABCDEFGHIJKLMNOPQRSTUVWXYZabcdefghijklmnopqrstuvwxyz"
+ID_BITS = 32
+SALT_BITS = 16
+HALF_BITS = (ID_BITS + SALT_BITS) // 2
+HALF_MASK = (1 << HALF_BITS) - 1
+ROUNDS = 4
+# Shortest length holding every 48-bit value in base 62
+CODE_LENGTH = 9
+
+
+class ItemCodec:
+    """
+    Reversible, keyed encoding of (item id, salt) into a short code.
+
+    The 32-bit id and a 16-bit salt are packed into 48 bits and run through a
+    4-round Feistel network keyed with BLAKE2b, then written in base 62. The
+    permutation makes codes collision-free and unguessable without the key,
+    and decoding a code gives the primary key back without any index lookup.
+    Bumping the salt gives an item a new code, retiring the old one.
+    """
+
+    def __init__(self, key: Optional[str]):
+        self.key = (
+            hashlib.blake2b(key.encode("utf-8"), digest_size=32).digest()
+            if key
+            else None
+        )
+
+    def _round(self, round: int, half: int) -> int:
+        assert self.key is not None
+        digest = hashlib.blake2b(
+            half.to_bytes(3, "big") + bytes([round]), key=self.key, digest_size=3
+        ).digest()
+        return int.from_bytes(digest, "big")
+
+    def encode(self, id: int, salt: int) -> str:
+        if self.key is None:
+            raise RuntimeError("ITEM_CODE_KEY is not set")
+        if not 0 <= id < 1 << ID_BITS or not 0 <= salt < 1 << SALT_BITS:
+            raise ValueError("Item id or salt out of range")
+        value = salt << ID_BITS | id
+        left, right = value >> HALF_BITS, value & HALF_MASK
+        for round in range(ROUNDS):
+            left, right = right, left ^ self._round(round, right)
+        value = left << HALF_BITS | right
+        code = []
+        for _ in range(CODE_LENGTH):
+            value, digit = divmod(value, len(ALPHABET))
+            code.append(ALPHABET[digit])
+        return "".join(reversed(code))
+
+    def decode(self, code: str) -> Optional[Tuple[int, int]]:
+        """(id, salt) encoded in `code`, or None when it is not a short code"""
+        if self.key is None or len(code) != CODE_LENGTH:
+            return None
+        value = 0
+        for char in code:
+            digit = ALPHABET.find(char)
+            if digit < 0:
+                return None
+            value = value * len(ALPHABET) + digit
+        if value >> 2 * HALF_BITS:
+            return None
+        left, right = value >> HALF_BITS, value & HALF_MASK
+        for round in reversed(range(ROUNDS)):
+            left, right = right ^ self._round(round, left), left
+        value = left << HALF_BITS | right
+        return value & ((1 << ID_BITS) - 1), value >> ID_BITS
+
+    def next_code(self, id: int, previous: Optional[str] = None) -> str:
+        """New code of item `id`, different from its `previous` code"""
+        decoded = self.decode(previous) if previous else None
+        if decoded is not None and decoded[0] == id:
+            salt = (decoded[1] + 1) % (1 << SALT_BITS)
+        else:
+            salt = secrets.randbelow(1 << SALT_BITS)
+        return self.encode(id, salt)
+
+
+item_codec = ItemCodec(settings.ITEM_CODE_KEY)
@@ -0,0 +1,33 @@
+import base64
+import binascii
+import json
+from typing import Any, List, Sequence
+
+from fastapi.encoders import jsonable_encoder
+
+
+class InvalidCursor(ValueError):
+    pass
+
+
+def encode_cursor(values: Sequence[Any]) -> str:
+    """
+    Opaque cursor resuming a listing after the row with these sort key values.
+    """
+    data = json.dumps(jsonable_encoder(list(values)), separators=(",", ":"))
+    return base64.urlsafe_b64encode(data.encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str, length: int) -> List[Any]:
+    """
+    Sort key values of a cursor made by `encode_cursor`; raises InvalidCursor
+    when it is not a cursor of `length` keys.
+    """
+    try:
+        data = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        values = json.loads(data)
+    except (binascii.Error, UnicodeDecodeError, ValueError):
+        raise InvalidCursor(cursor)
+    if not isinstance(values, list) or len(values) != length:
+        raise InvalidCursor(cursor)
+    return values
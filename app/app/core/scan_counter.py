@@ -0,0 +1,75 @@
+from datetime import datetime
+from typing import Callable, Dict, List, Optional, Tuple
+
+from core.config import settings
+from core.flusher import BufferedFlusher
+
+ScanCounts = Dict[int, Tuple[int, datetime]]
+
+
+class ScanCounter(BufferedFlusher):
+    """
+    Count scans per item in memory and persist them in batches.
+
+    The request path only increments a dict entry. `writer` receives
+    `{item_id: (count, last_scanned_at)}` and must add the counts to the
+    stored totals, so every worker process can flush on its own.
+    """
+
+    def __init__(self, interval: float, max_pending: int):
+        super().__init__(interval, max_pending)
+        self.writer: Optional[Callable[[ScanCounts], None]] = None
+        self._reset()
+
+    def _reset(self) -> None:
+        self._counts: Dict[int, List] = {}
+        self._pending = 0
+
+    def start(self, writer: Callable[[ScanCounts], None]) -> None:  # type: ignore
+        self.writer = writer
+        super().start()
+
+    def increment(self, item_id: int) -> None:
+        now = datetime.utcnow()
+        with self._lock:
+            entry = self._counts.get(item_id)
+            if entry is None:
+                self._counts[item_id] = [1, now]
+            else:
+                entry[0] += 1
+                entry[1] = now
+            self._pending += 1
+            pending = self._pending
+        self._added(pending)
+
+    def _merge(self, counts: Dict[int, List]) -> None:
+        with self._lock:
+            for item_id, (count, last_scanned_at) in counts.items():
+                entry = self._counts.setdefault(item_id, [0, last_scanned_at])
+                entry[0] += count
+                entry[1] = max(entry[1], last_scanned_at)
+                self._pending += count
+
+    def _flush_once(self) -> int:
+        if self.writer is None:
+            return 0
+        with self._lock:
+            counts, self._counts = self._counts, {}
+            self._pending = 0
+        if not counts:
+            return 0
+        try:
+            self.writer(
+                {item_id: (count, last) for item_id, (count, last) in counts.items()}
+            )
+        except Exception:
+            # Keep the increments for the next flush instead of losing them
+            self._merge(counts)
+            raise
+        return len(counts)
+
+
+scan_counter = ScanCounter(
+    interval=settings.SCAN_COUNTER_FLUSH_SECONDS,
+    max_pending=settings.SCAN_COUNTER_FLUSH_EVENTS,
+)
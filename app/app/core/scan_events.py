@@ -0,0 +1,234 @@
+import json
+import os
+import socket
+import time
+from typing import Any, Dict, List, Optional
+
+from core.config import settings
+from core.flusher import BufferedFlusher
+
+OPEN_SUFFIX = ".ndjson.part"
+CLOSED_SUFFIX = ".ndjson"
+LOADING_SUFFIX = ".ndjson.loading"
+
+
+def classify_user_agent(user_agent: Optional[str]) -> str:
+    if not user_agent:
+        return "unknown"
+    ua = user_agent.lower()
+    if "bot" in ua or "spider" in ua or "crawl" in ua:
+        return "bot"
+    if "iphone" in ua or "ipad" in ua or "ios" in ua:
+        return "ios"
+    if "android" in ua:
+        return "android"
+    if "windows" in ua or "macintosh" in ua or "linux" in ua or "cros" in ua:
+        return "desktop"
+    return "other"
+
+
+class ScanEventLog(BufferedFlusher):
+    """
+    Append-only local log of raw scan events.
+
+    Events are buffered in memory and appended as JSON lines to a segment
+    file owned by this process. A segment is closed (renamed from
+    `*.ndjson.part` to `*.ndjson`) once it is `segment_seconds` old or the
+    process stops; only closed segments are picked up by the loader task.
+    Segments left open by a process that crashed are closed when the log
+    starts and by the loader task.
+    """
+
+    def __init__(
+        self,
+        directory: Optional[str],
+        interval: float,
+        max_pending: int,
+        segment_seconds: float,
+    ):
+        super().__init__(interval, max_pending)
+        self.directory = directory
+        self.segment_seconds = segment_seconds
+        self._reset()
+
+    def _reset(self) -> None:
+        self._events: List[str] = []
+        self._segment: Optional[str] = None
+        self._segment_opened_at = 0.0
+
+    @property
+    def enabled(self) -> bool:
+        return self.directory is not None
+
+    def append(
+        self,
+        *,
+        item_id: int,
+        hash: str,
+        user_agent: Optional[str],
+        referrer: Optional[str],
+    ) -> None:
+        if not self.enabled:
+            return
+        line = json.dumps(
+            {
+                "t": time.time(),
+                "i": item_id,
+                "h": hash,
+                "ua": classify_user_agent(user_agent),
+                "r": (referrer or "")[:255],
+            },
+            separators=(",", ":"),
+        )
+        with self._lock:
+            self._events.append(line)
+            pending = len(self._events)
+        self._added(pending)
+
+    def _close_segment(self) -> None:
+        if self._segment is not None:
+            closed = self._segment[: -len(OPEN_SUFFIX)] + CLOSED_SUFFIX
+            os.rename(self._segment, closed)
+            self._segment = None
+
+    def _flush_once(self) -> int:
+        if not self.enabled:
+            return 0
+        with self._lock:
+            events, self._events = self._events, []
+        now = time.time()
+        if self._segment is not None and (
+            now - self._segment_opened_at >= self.segment_seconds
+        ):
+            self._close_segment()
+        if not events:
+            return 0
+        if self._segment is None:
+            directory = str(self.directory)
+            os.makedirs(directory, exist_ok=True)
+            name = f"scans-{socket.gethostname()}-{os.getpid()}-{int(now * 1000)}"
+            self._segment = os.path.join(directory, name + OPEN_SUFFIX)
+            self._segment_opened_at = now
+        with open(self._segment, "a") as f:
+            f.write("\n".join(events) + "\n")
+        return len(events)
+
+    @property
+    def stale_after(self) -> float:
+        return stale_segment_seconds(self.segment_seconds, self.interval)
+
+    def start(self) -> None:
+        if self.enabled:
+            # Events flushed by a process that died before closing its segment
+            recover_segments(str(self.directory), self.stale_after)
+        super().start()
+
+    def stop(self) -> None:
+        super().stop()
+        with self._lock:
+            self._close_segment()
+
+
+def stale_segment_seconds(segment_seconds: float, interval: float) -> float:
+    """Age past which an open segment is no longer written by a live process."""
+    # A live owner closes its segment at the first flush after it is
+    # `segment_seconds` old
+    return 2 * (segment_seconds + interval)
+
+
+def _owner_is_gone(name: str) -> bool:
+    try:
+        owner, pid, _ = name[: -len(OPEN_SUFFIX)].rsplit("-", 2)
+        if owner != f"scans-{socket.gethostname()}":
+            return False
+        os.kill(int(pid), 0)
+    except ProcessLookupError:
+        return True
+    except (ValueError, OSError):
+        pass
+    return False
+
+
+def recover_segments(directory: str, stale_after: float) -> List[str]:
+    """
+    Close the open segments of `directory` left by processes that died.
+
+    A segment is abandoned when the process of this host that opened it is
+    gone, or when it has not been written for `stale_after` seconds, which
+    also covers processes of other hosts. Returns the closed segments.
+    """
+    if not os.path.isdir(directory):
+        return []
+    recovered = []
+    now = time.time()
+    for name in sorted(os.listdir(directory)):
+        if not name.endswith(OPEN_SUFFIX):
+            continue
+        path = os.path.join(directory, name)
+        closed = path[: -len(OPEN_SUFFIX)] + CLOSED_SUFFIX
+        try:
+            if not _owner_is_gone(name) and now - os.path.getmtime(path) < stale_after:
+                continue
+            os.rename(path, closed)
+        except FileNotFoundError:
+            continue
+        recovered.append(closed)
+    return recovered
+
+
+def claim_segments(directory: str, stale_after: float = 600) -> List[str]:
+    """
+    Claim the closed segments of `directory` for loading.
+
+    Segments are renamed to `*.ndjson.loading` so that concurrent loaders
+    never pick the same file. Segments left in that state by a loader that
+    died are claimed again once they are `stale_after` seconds old.
+    """
+    if not os.path.isdir(directory):
+        return []
+    claimed = []
+    now = time.time()
+    for name in sorted(os.listdir(directory)):
+        path = os.path.join(directory, name)
+        if name.endswith(CLOSED_SUFFIX):
+            loading = path[: -len(CLOSED_SUFFIX)] + LOADING_SUFFIX
+            try:
+                os.rename(path, loading)
+            except FileNotFoundError:
+                continue
+            claimed.append(loading)
+        elif name.endswith(LOADING_SUFFIX):
+            try:
+                if now - os.path.getmtime(path) > stale_after:
+                    os.utime(path)
+                    claimed.append(path)
+            except FileNotFoundError:
+                continue
+    return claimed
+
+
+def segment_name(path: str) -> str:
+    return os.path.basename(path)[: -len(LOADING_SUFFIX)]
+
+
+def read_segment(path: str) -> List[Dict[str, Any]]:
+    events = []
+    with open(path) as f:
+        for line in f:
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                events.append(json.loads(line))
+            except ValueError:
+                # A process killed mid-write can leave a truncated last line
+                continue
+    return events
+
+
+scan_events = ScanEventLog(
+    settings.SCAN_EVENT_LOG_DIR,
+    interval=settings.SCAN_EVENT_FLUSH_SECONDS,
+    max_pending=settings.SCAN_EVENT_FLUSH_EVENTS,
+    segment_seconds=settings.SCAN_EVENT_SEGMENT_SECONDS,
+)
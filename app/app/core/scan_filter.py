@@ -0,0 +1,220 @@
+import hashlib
+import logging
+import math
+import threading
+import time
+from typing import Any, Callable, Dict, Iterable, List, Optional
+
+from core.cache import CacheBackend, get_cache_backend
+from core.config import settings
+
+logger = logging.getLogger(__name__)
+
+
+class BloomFilter:
+    """
+    Fixed-size Bloom filter over strings.
+
+    Sized for `capacity` entries at the requested false-positive rate; the
+    `k` bit positions come from double hashing a single BLAKE2b digest.
+    """
+
+    def __init__(self, capacity: int, error_rate: float):
+        self.capacity = max(1, capacity)
+        self.error_rate = error_rate
+        bits = -self.capacity * math.log(error_rate) / math.log(2) ** 2
+        self.num_bits = max(8, int(math.ceil(bits)))
+        self.num_hashes = max(1, round(self.num_bits / self.capacity * math.log(2)))
+        self.bits = bytearray((self.num_bits + 7) // 8)
+        self.count = 0
+
+    def _positions(self, key: str) -> List[int]:
+        digest = hashlib.blake2b(key.encode("utf-8"), digest_size=16).digest()
+        h1 = int.from_bytes(digest[:8], "little")
+        h2 = int.from_bytes(digest[8:], "little") | 1
+        return [(h1 + i * h2) % self.num_bits for i in range(self.num_hashes)]
+
+    def add(self, key: str) -> None:
+        for position in self._positions(key):
+            self.bits[position >> 3] |= 1 << (position & 7)
+        self.count += 1
+
+    def __contains__(self, key: str) -> bool:
+        return all(
+            self.bits[position >> 3] & (1 << (position & 7))
+            for position in self._positions(key)
+        )
+
+    @property
+    def size_bytes(self) -> int:
+        return len(self.bits)
+
+    def false_positive_rate(self) -> float:
+        """Expected false-positive rate for the entries added so far."""
+        return (
+            1 - math.exp(-self.num_hashes * self.count / self.num_bits)
+        ) ** self.num_hashes
+
+
+class ScanFilter:
+    """
+    Reject scans of unknown hashes without querying Postgres.
+
+    A Bloom filter over every live `Item.hash` answers "definitely unknown"
+    for most random hashes, and a short-TTL negative cache catches repeated
+    misses, including false positives of the filter. Deleted hashes stay in
+    the filter until the next periodic rebuild; the negative cache hides them
+    in the meantime.
+
+    Writes append the hashes they add to a log in the cache backend. Before
+    answering "unknown", a process applies the hashes appended since it last
+    read the log to its own filter, so hashes created by other workers are
+    never rejected. Only a process that fell so far behind that the log was
+    trimmed past it rebuilds from the database. This needs a backend shared by
+    every process, so the filter is only enabled with redis.
+    """
+
+    def __init__(
+        self,
+        negative_cache: CacheBackend,
+        log: CacheBackend,
+        *,
+        error_rate: float,
+        rebuild_interval: float,
+        negative_ttl: float,
+        max_log_entries: int = 100000,
+    ):
+        self.negative_cache = negative_cache
+        self.log = log
+        self.error_rate = error_rate
+        self.rebuild_interval = rebuild_interval
+        self.negative_ttl = negative_ttl
+        self.max_log_entries = max_log_entries
+        self.loader: Optional[Callable[[], Iterable[str]]] = None
+        self._bloom: Optional[BloomFilter] = None
+        self._log_id = ""
+        self._built_at = 0.0
+        self._rebuilding = False
+        self._lock = threading.Lock()
+        self._stats = {"rejected": 0, "negative_hits": 0, "false_positives": 0}
+
+    def start(self, loader: Callable[[], Iterable[str]], wait: bool = False) -> None:
+        """Register the loader of all live hashes and build the filter."""
+        self.loader = loader
+        self.schedule_rebuild(wait=wait)
+
+    def rebuild(self) -> None:
+        assert self.loader is not None
+        # Hashes added while the snapshot loads are applied from the log
+        log_id = self.log.append("added", [], self.max_log_entries)
+        hashes = [hash for hash in self.loader() if hash]
+        bloom = BloomFilter(
+            capacity=int(len(hashes) * 1.5) + 1024, error_rate=self.error_rate
+        )
+        for hash in hashes:
+            bloom.add(hash)
+        with self._lock:
+            self._bloom = bloom
+            self._log_id = log_id
+            self._built_at = time.monotonic()
+
+    def _rebuild_in_background(self) -> None:
+        try:
+            self.rebuild()
+        except Exception as e:
+            logger.error(e)
+        finally:
+            self._rebuilding = False
+
+    def schedule_rebuild(self, wait: bool = False) -> None:
+        with self._lock:
+            if self._rebuilding or self.loader is None:
+                return
+            self._rebuilding = True
+        if wait:
+            self._rebuild_in_background()
+            return
+        threading.Thread(target=self._rebuild_in_background, daemon=True).start()
+
+    def _catch_up(self, bloom: BloomFilter) -> Optional[List[str]]:
+        """
+        Apply the hashes added since the log was last read to `bloom` and
+        return them, or None when some of them were trimmed from the log.
+        """
+        log_id = self._log_id
+        entries = self.log.read_after("added", log_id)
+        if entries is None:
+            return None
+        last_id, hashes = entries
+        with self._lock:
+            # Another thread may have applied them, or more, in the meantime
+            if self._bloom is bloom and self._log_id == log_id:
+                for hash in hashes:
+                    bloom.add(hash)
+                self._log_id = last_id
+        return hashes
+
+    def might_exist(self, hash: str) -> bool:
+        """False only when `hash` is known not to belong to any item."""
+        bloom = self._bloom
+        if bloom is None:
+            return True
+        if self.negative_cache.get(hash) is not None:
+            self._stats["negative_hits"] += 1
+            return False
+        age = time.monotonic() - self._built_at
+        if age > self.rebuild_interval or bloom.count > bloom.capacity:
+            self.schedule_rebuild()
+        if hash in bloom:
+            return True
+        added = self._catch_up(bloom)
+        if added is None:
+            self.schedule_rebuild()
+            return True
+        if hash in bloom or hash in added:
+            return True
+        self._stats["rejected"] += 1
+        return False
+
+    def record_miss(self, hash: str) -> None:
+        """Remember a hash that was looked up in the database and not found."""
+        bloom = self._bloom
+        if bloom is not None and hash in bloom:
+            self._stats["false_positives"] += 1
+        self.negative_cache.set(hash, 1, self.negative_ttl)
+
+    def added(self, *hashes: Optional[str]) -> None:
+        hashes = tuple(hash for hash in hashes if hash)
+        if not hashes:
+            return
+        self.negative_cache.delete(*hashes)
+        self.log.append("added", hashes, self.max_log_entries)
+
+    def removed(self, *hashes: Optional[str]) -> None:
+        for hash in hashes:
+            if hash:
+                self.negative_cache.set(hash, 1, self.negative_ttl)
+
+    def stats(self) -> Dict[str, Any]:
+        bloom = self._bloom
+        stats: Dict[str, Any] = dict(self._stats, ready=bloom is not None)
+        if bloom is not None:
+            stats.update(
+                entries=bloom.count,
+                capacity=bloom.capacity,
+                size_bytes=bloom.size_bytes,
+                hash_functions=bloom.num_hashes,
+                expected_false_positive_rate=bloom.false_positive_rate(),
+                age_seconds=time.monotonic() - self._built_at,
+            )
+        return stats
+
+
+scan_filter = ScanFilter(
+    get_cache_backend("scan-miss:", settings.SCAN_NEGATIVE_CACHE_MAX_ENTRIES),
+    get_cache_backend("scan-filter:", 16),
+    error_rate=settings.SCAN_FILTER_ERROR_RATE,
+    rebuild_interval=settings.SCAN_FILTER_REBUILD_SECONDS,
+    negative_ttl=settings.SCAN_NEGATIVE_CACHE_TTL_SECONDS,
+    max_log_entries=settings.SCAN_FILTER_MAX_LOG_ENTRIES,
+)
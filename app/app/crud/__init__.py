@@ -1,6 +1,8 @@
 from .crud_item import item
 from .crud_user import user
 from .crud_asset import asset
+from .crud_scan_count import scan_count
+from .crud_scan_event import scan_event
 
 # For a new basic set of CRUD operations you could just do
 
@@ -9,3 +11,4 @@ from .crud_asset import asset
 # from schemas.item import ItemCreate, ItemUpdate
 
 # item = CRUDBase[Item, ItemCreate, ItemUpdate](Item)
+from .crud_import_job import import_job
@@ -1,9 +1,23 @@
-from typing import Any, Dict, Generic, List, Optional, Type, TypeVar, Union
+from typing import (
+    Any,
+    Dict,
+    Generic,
+    Iterator,
+    List,
+    Optional,
+    Sequence,
+    Tuple,
+    Type,
+    TypeVar,
+    Union,
+)
 
 from fastapi.encoders import jsonable_encoder
 from pydantic import BaseModel
-from sqlalchemy.orm import Session
+from sqlalchemy import and_, literal, or_
+from sqlalchemy.orm import Query, Session, load_only
 
+from core.pagination import InvalidCursor, decode_cursor, encode_cursor
 from db.base_class import Base
 
 ModelType = TypeVar("ModelType", bound=Base)
@@ -31,15 +45,109 @@ class CRUDBase(Generic[ModelType, CreateSchemaType, UpdateSchemaType]):
         db: Session,
         *,
         skip: int = 0,
-        # limit: int = 100,
+        limit: int = 100,
     ) -> List[ModelType]:
         return (
             db.query(self.model)
+            .order_by(self.model.id)
             .offset(skip)
-            # .limit(limit)
+            .limit(limit)
             .all()
         )
 
+    def get_page(
+        self,
+        db: Session,
+        *,
+        limit: int,
+        cursor: Optional[str] = None,
+        query: Optional[Query] = None,
+        sort: Optional[Any] = None,
+        descending: bool = False,
+        fields: Optional[Sequence[str]] = None,
+    ) -> Tuple[List[ModelType], Optional[str]]:
+        """
+        Page of `limit` rows of `query`, all rows by default, ordered by the
+        `sort` column then by id. Rows whose sort value is NULL come last in
+        ascending order and first in descending order, like an index scan.
+
+        Pages are found by comparing the sort key to the last row of the
+        previous page (keyset pagination), which costs the same however deep
+        the page, and stays consistent while rows are added or removed.
+
+        Only the `fields` columns, and those of the sort, are loaded when
+        given; the other attributes of the rows must not be used.
+
+        :return: (rows, cursor of the next page or None on the last page);
+            raises InvalidCursor for an invalid `cursor`, or one made for
+            another sort
+        """
+        if query is None:
+            query = db.query(self.model)
+        id = self.model.id
+        keys = [id] if sort is None else [sort, id]
+        name = "-" + keys[0].key if descending else keys[0].key
+        if cursor is not None:
+            values = decode_cursor(cursor, len(keys) + 1)
+            if values[0] != name:
+                raise InvalidCursor(cursor)
+            query = query.filter(self._after(keys, values[1:], descending))
+        query = self._load_only(query, fields, keys)
+        rows = query.order_by(*self._order(keys, descending)).limit(limit + 1).all()
+        if len(rows) <= limit:
+            return rows, None
+        rows = rows[:limit]
+        return rows, encode_cursor([name, *[getattr(rows[-1], k.key) for k in keys]])
+
+    def iter_all(
+        self,
+        db: Session,
+        *,
+        query: Optional[Query] = None,
+        sort: Optional[Any] = None,
+        descending: bool = False,
+        batch_size: int = 1000,
+        fields: Optional[Sequence[str]] = None,
+    ) -> Iterator[ModelType]:
+        """
+        Every row of `query`, in the order of `get_page`, fetched `batch_size`
+        at a time through a server-side cursor.
+        """
+        if query is None:
+            query = db.query(self.model)
+        keys = [self.model.id] if sort is None else [sort, self.model.id]
+        query = self._load_only(query, fields, keys)
+        query = query.order_by(*self._order(keys, descending))
+        return iter(query.yield_per(batch_size))
+
+    def _load_only(
+        self, query: Query, fields: Optional[Sequence[str]], keys: List[Any]
+    ) -> Query:
+        if fields is None:
+            return query
+        names = dict.fromkeys([*fields, *[key.key for key in keys]])
+        return query.options(load_only(*names))
+
+    def _order(self, keys: List[Any], descending: bool) -> List[Any]:
+        return [key.desc() if descending else key.asc() for key in keys]
+
+    def _after(self, keys: List[Any], values: List[Any], descending: bool) -> Any:
+        """Condition on the rows after (sort value, id) `values` in page order"""
+        id, last_id = keys[-1], literal(values[-1], keys[-1].type)
+        id_after = id < last_id if descending else id > last_id
+        if len(keys) == 1:
+            return id_after
+        sort, value = keys[0], values[0]
+        if value is None:
+            # NULLs are last in ascending order, first in descending order
+            if descending:
+                return or_(sort.isnot(None), and_(sort.is_(None), id_after))
+            return and_(sort.is_(None), id_after)
+        value = literal(value, sort.type)
+        sort_after = sort < value if descending else sort > value
+        condition = or_(sort_after, and_(sort == value, id_after))
+        return condition if descending else or_(condition, sort.is_(None))
+
     def create(self, db: Session, *, obj_in: CreateSchemaType) -> ModelType:
         obj_in_data = jsonable_encoder(obj_in)
         db_obj = self.model(**obj_in_data)  # type: ignore
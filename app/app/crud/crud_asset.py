@@ -1,12 +1,14 @@
 from fastapi import UploadFile
 import pandas, io
-from typing import List
+from typing import Any, Dict, Iterator, List, Optional, Sequence, Tuple, Union
 
 from fastapi.encoders import jsonable_encoder
 from pandas._libs.tslibs import NaT
 from sqlalchemy.orm import Session
 
+from core.cache import scan_cache
 from crud.base import CRUDBase
+from crud.crud_item import item as crud_item
 from models.asset import Asset
 from schemas.asset import AssetCreate, AssetUpdate
 
@@ -22,10 +24,37 @@ class CRUDAsset(CRUDBase[Asset, AssetCreate, AssetUpdate]):
         db.refresh(db_obj)
         db_obj.order = float(db_obj.id)
         db.add(db_obj)
+        crud_item.bump_version(db, id=item_id)
         db.commit()
         db.refresh(db_obj)
+        scan_cache.invalidate(db_obj.item.hash)
         return db_obj
 
+    def update(
+        self,
+        db: Session,
+        *,
+        db_obj: Asset,
+        obj_in: Union[AssetUpdate, Dict[str, Any]]
+    ) -> Asset:
+        if isinstance(obj_in, dict):
+            update_data = dict(obj_in)
+        else:
+            update_data = obj_in.dict(exclude_unset=True)
+        update_data["version"] = Asset.version + 1
+        crud_item.bump_version(db, id=db_obj.item_id)
+        db_obj = super().update(db, db_obj=db_obj, obj_in=update_data)
+        scan_cache.invalidate(db_obj.item.hash)
+        return db_obj
+
+    def remove(self, db: Session, *, id: int) -> Asset:
+        asset = self.get(db, id=id)
+        hash = asset.item.hash
+        crud_item.bump_version(db, id=asset.item_id)
+        obj = super().remove(db, id=id)
+        scan_cache.invalidate(hash)
+        return obj
+
     def get_multi_by_item(
         self,
         db: Session,
@@ -37,9 +66,44 @@ class CRUDAsset(CRUDBase[Asset, AssetCreate, AssetUpdate]):
         return (
             db.query(self.model)
             .filter(Asset.item_id == item_id)
+            .order_by(Asset.order)
             .offset(skip)
             # .limit(limit)
             .all()
         )
 
+    def get_page_by_item(
+        self,
+        db: Session,
+        *,
+        item_id: int,
+        limit: int,
+        cursor: Optional[str] = None,
+        fields: Optional[Sequence[str]] = None,
+    ) -> Tuple[List[Asset], Optional[str]]:
+        return self.get_page(
+            db,
+            limit=limit,
+            cursor=cursor,
+            fields=fields,
+            query=db.query(self.model).filter(Asset.item_id == item_id),
+            sort=Asset.order,
+        )
+
+    def iter_by_item(
+        self,
+        db: Session,
+        *,
+        item_id: int,
+        batch_size: int = 1000,
+        fields: Optional[Sequence[str]] = None,
+    ) -> Iterator[Asset]:
+        return self.iter_all(
+            db,
+            fields=fields,
+            query=db.query(self.model).filter(Asset.item_id == item_id),
+            sort=Asset.order,
+            batch_size=batch_size,
+        )
+
 asset = CRUDAsset(Asset)
@@ -0,0 +1,137 @@
+from datetime import datetime
+from typing import Any, Dict, Optional, Tuple
+
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+
+from models.import_job import ACTIVE_STATUSES, ImportJob
+from schemas.item_import import ImportSummary
+
+
+class CRUDImportJob:
+    def get(self, db: Session, id: int) -> Optional[ImportJob]:
+        return db.query(ImportJob).filter(ImportJob.id == id).first()
+
+    def get_active(
+        self, db: Session, *, owner_id: int, sha256: str
+    ) -> Optional[ImportJob]:
+        return (
+            db.query(ImportJob)
+            .filter(ImportJob.owner_id == owner_id, ImportJob.sha256 == sha256)
+            .filter(ImportJob.status.in_(ACTIVE_STATUSES))
+            .first()
+        )
+
+    def create(
+        self,
+        db: Session,
+        *,
+        owner_id: int,
+        filename: str,
+        sha256: str,
+        location: str,
+    ) -> Tuple[ImportJob, bool]:
+        """
+        Create a queued job, unless the owner already has one importing the
+        same content. Returns the job and whether it was created.
+        """
+        existing = self.get_active(db, owner_id=owner_id, sha256=sha256)
+        if existing is not None:
+            return existing, False
+        job = ImportJob(
+            owner_id=owner_id,
+            filename=filename,
+            sha256=sha256,
+            location=location,
+            status="queued",
+            rows=0,
+            inserted=0,
+            updated=0,
+            unchanged=0,
+            failed=0,
+            errors=[],
+        )
+        db.add(job)
+        try:
+            db.commit()
+        except IntegrityError:
+            # The same content was uploaded concurrently
+            db.rollback()
+            existing = self.get_active(db, owner_id=owner_id, sha256=sha256)
+            if existing is None:
+                raise
+            return existing, False
+        db.refresh(job)
+        return job, True
+
+    def _set_status(self, db: Session, *, id: int, old: str, **values: object) -> bool:
+        updated = (
+            db.query(ImportJob)
+            .filter(ImportJob.id == id, ImportJob.status == old)
+            .update(values, synchronize_session=False)
+        )
+        db.commit()
+        return bool(updated)
+
+    def _progress(self, summary: ImportSummary) -> Dict[str, Any]:
+        counts = summary.dict(exclude={"errors"})
+        return dict(counts, errors=[error.dict() for error in summary.errors])
+
+    def start(self, db: Session, *, id: int) -> bool:
+        """Move a queued job to running; False if it is not queued anymore."""
+        return self._set_status(
+            db, id=id, old="queued", status="running", started_at=datetime.utcnow()
+        )
+
+    def update_progress(self, db: Session, *, id: int, summary: ImportSummary) -> bool:
+        """Record the progress of a running job; False once it was cancelled."""
+        return self._set_status(
+            db,
+            id=id,
+            old="running",
+            **self._progress(summary),
+        )
+
+    def finish(
+        self,
+        db: Session,
+        *,
+        id: int,
+        summary: ImportSummary,
+        error: Optional[str] = None,
+    ) -> bool:
+        return self._set_status(
+            db,
+            id=id,
+            old="running",
+            status="failed" if error else "succeeded",
+            **self._progress(summary),
+            error=error,
+            finished_at=datetime.utcnow(),
+        )
+
+    def fail_lost(self, db: Session, *, id: int) -> bool:
+        """
+        Fail a job left running by a worker that was lost, so that its upload
+        can be imported again.
+        """
+        return self._set_status(
+            db,
+            id=id,
+            old="running",
+            status="failed",
+            error="The import was interrupted, upload the file again",
+            finished_at=datetime.utcnow(),
+        )
+
+    def cancel(self, db: Session, *, id: int) -> bool:
+        """Cancel a queued or running job; batches already imported are kept."""
+        for old in ("queued", "running"):
+            if self._set_status(
+                db, id=id, old=old, status="cancelled", finished_at=datetime.utcnow()
+            ):
+                return True
+        return False
+
+
+import_job = CRUDImportJob()
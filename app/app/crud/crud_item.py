@@ -1,16 +1,81 @@
 from fastapi import UploadFile
-import pandas
-import io
-from typing import List, Optional
+from contextlib import contextmanager
+from datetime import datetime
+from typing import (
+    IO,
+    Any,
+    Callable,
+    Dict,
+    Iterator,
+    List,
+    NamedTuple,
+    Optional,
+    Sequence,
+    Tuple,
+    Union,
+)
+import re
 from secrets import token_urlsafe
 
 from fastapi.encoders import jsonable_encoder
-from pandas._libs.tslibs import NaT
-from sqlalchemy.orm import Session
+from sqlalchemy import literal, literal_column, or_, text
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Query, Session, joinedload
 
+from core.cache import scan_cache
+from core.config import settings
+from core.item_codes import item_codec
+from core.scan_filter import scan_filter
 from crud.base import CRUDBase
+from import_utils import (
+    ITEM_COLUMNS,
+    ImportValidationError,
+    check_columns,
+    iter_sheet,
+    normalize_items,
+    read_sheet,
+)
 from models.item import Item
+from qr_utils import (
+    enqueue_qrcode_deletion,
+    enqueue_qrcode_generation,
+    qr_cache,
+    qrcode_payload,
+)
 from schemas.item import ItemCreate, ItemUpdate
+from schemas.item_filter import ItemFilter
+from schemas.item_import import ImportRowError, ImportSummary
+
+# Sheet columns updated when an import finds the SKU of an existing item
+UPSERT_COLUMNS = ["type", "description", "price", "quantity", "qaod"]
+
+
+class DuplicateSKUError(Exception):
+    """The owner already has an item with this SKU"""
+
+
+@contextmanager
+def _unique_sku(db: Session, sku: Optional[str]) -> Iterator[None]:
+    """
+    Turn the violation of the unique owner and SKU index by the writes
+    committed inside the block into a DuplicateSKUError.
+    """
+    try:
+        yield
+    except IntegrityError as e:
+        db.rollback()
+        diag = getattr(e.orig, "diag", None)
+        if getattr(diag, "constraint_name", None) == "ix_item_owner_id_sku":
+            raise DuplicateSKUError(sku) from e
+        raise
+
+
+class UpsertResult(NamedTuple):
+    inserted: List[Item]
+    updated: List[Item]
+    # Rows equal to their item, or superseded by a later row of the same SKU
+    unchanged: int
 
 
 class CRUDItem(CRUDBase[Item, ItemCreate, ItemUpdate]):
@@ -18,12 +83,66 @@ class CRUDItem(CRUDBase[Item, ItemCreate, ItemUpdate]):
         self, db: Session, *, obj_in: ItemCreate, owner_id: int
     ) -> Item:
         obj_in_data = jsonable_encoder(obj_in)
-        db_obj = self.model(**obj_in_data, owner_id=owner_id, hash=token_urlsafe(16))
-        db.add(db_obj)
-        db.commit()
+        db_obj = self.model(**obj_in_data, owner_id=owner_id, hash=self.new_hash())
+        with _unique_sku(db, obj_in.sku):
+            db.add(db_obj)
+            if db_obj.hash is None:
+                # Short codes encode the id, which is only known once inserted
+                db.flush()
+                db_obj.hash = self.new_hash(db_obj.id)
+            db.commit()
         db.refresh(db_obj)
+        scan_filter.added(db_obj.hash)
+        enqueue_qrcode_generation(db_obj.id)
         return db_obj
 
+    def update(
+        self,
+        db: Session,
+        *,
+        db_obj: Item,
+        obj_in: Union[ItemUpdate, Dict[str, Any]]
+    ) -> Item:
+        if isinstance(obj_in, dict):
+            update_data = dict(obj_in)
+        else:
+            update_data = obj_in.dict(exclude_unset=True)
+        update_data["version"] = Item.version + 1
+        with _unique_sku(db, update_data.get("sku")):
+            db_obj = super().update(db, db_obj=db_obj, obj_in=update_data)
+        scan_cache.invalidate(db_obj.hash)
+        return db_obj
+
+    def bump_version(self, db: Session, *, id: int) -> None:
+        """
+        Mark the item as changed, e.g. when one of its assets is written.
+
+        The change is committed together with the caller's transaction.
+        """
+        db.query(self.model).filter(self.model.id == id).update(
+            {Item.version: Item.version + 1, Item.updated_at: datetime.utcnow()},
+            synchronize_session=False,
+        )
+
+    def remove(self, db: Session, *, id: int) -> Item:
+        hash = self.get(db, id=id).hash
+        obj = super().remove(db, id=id)
+        scan_cache.invalidate(hash)
+        scan_filter.removed(hash)
+        qr_cache.invalidate_payload(qrcode_payload(hash))
+        enqueue_qrcode_deletion(hash)
+        return obj
+
+    def remove_multi(self, db: Session, *, ids: list[int]) -> Any:
+        hashes = [obj.hash for obj in self.get_multi_by_ids(db, ids=ids)]
+        result = super().remove_multi(db, ids=ids)
+        scan_cache.invalidate(*hashes)
+        scan_filter.removed(*hashes)
+        for hash in hashes:
+            qr_cache.invalidate_payload(qrcode_payload(hash))
+        enqueue_qrcode_deletion(*hashes)
+        return result
+
     def get_multi_by_owner(
         self,
         db: Session,
@@ -40,6 +159,105 @@ class CRUDItem(CRUDBase[Item, ItemCreate, ItemUpdate]):
             .all()
         )
 
+    def get_page_by_owner(
+        self, db: Session, *, owner_id: int, limit: int, cursor: Optional[str] = None
+    ) -> Tuple[List[Item], Optional[str]]:
+        return self.get_page(
+            db,
+            limit=limit,
+            cursor=cursor,
+            query=db.query(self.model).filter(Item.owner_id == owner_id),
+        )
+
+    def filter(self, query: Query, item_filter: ItemFilter) -> Query:
+        """Restrict an item query to the items matching `item_filter`"""
+        f = item_filter
+        if f.sku_prefix:
+            query = query.filter(Item.sku.startswith(f.sku_prefix, autoescape=True))
+        if f.type:
+            query = query.filter(Item.type.in_(f.type))
+        if f.price_min is not None:
+            query = query.filter(Item.price >= f.price_min)
+        if f.price_max is not None:
+            query = query.filter(Item.price <= f.price_max)
+        if f.quantity_min is not None:
+            query = query.filter(Item.quantity >= f.quantity_min)
+        if f.quantity_max is not None:
+            query = query.filter(Item.quantity <= f.quantity_max)
+        if f.qaod_from is not None:
+            query = query.filter(Item.qaod >= f.qaod_from)
+        if f.qaod_to is not None:
+            query = query.filter(Item.qaod <= f.qaod_to)
+        if f.q:
+            # Substrings, or words similar to the search (pg_trgm's <%, with %
+            # doubled for psycopg2), both answered by the trigram indexes
+            pattern = "%" + re.sub(r"([%_/])", r"/\1", f.q) + "%"
+            query = query.filter(
+                or_(
+                    Item.sku.ilike(pattern, escape="/"),
+                    Item.description.ilike(pattern, escape="/"),
+                    literal(f.q).op("<%%")(Item.sku),
+                    literal(f.q).op("<%%")(Item.description),
+                )
+            )
+        return query
+
+    def search(
+        self,
+        db: Session,
+        *,
+        item_filter: ItemFilter,
+        limit: int,
+        cursor: Optional[str] = None,
+        owner_id: Optional[int] = None,
+        fields: Optional[Sequence[str]] = None,
+    ) -> Tuple[List[Item], Optional[str]]:
+        """Page of the items of owner, or of all items, matching `item_filter`"""
+        return self.get_page(
+            db,
+            limit=limit,
+            cursor=cursor,
+            fields=fields,
+            **self._search_order(db, item_filter=item_filter, owner_id=owner_id),
+        )
+
+    def iter_search(
+        self,
+        db: Session,
+        *,
+        item_filter: ItemFilter,
+        owner_id: Optional[int] = None,
+        batch_size: int = 1000,
+        fields: Optional[Sequence[str]] = None,
+    ) -> Iterator[Item]:
+        """Every item `search` would page through, from a server-side cursor"""
+        return self.iter_all(
+            db,
+            batch_size=batch_size,
+            fields=fields,
+            **self._search_order(db, item_filter=item_filter, owner_id=owner_id),
+        )
+
+    def _search_order(
+        self, db: Session, *, item_filter: ItemFilter, owner_id: Optional[int]
+    ) -> Dict[str, Any]:
+        query = db.query(self.model)
+        if owner_id is not None:
+            query = query.filter(Item.owner_id == owner_id)
+        sort = item_filter.sort.lstrip("-")
+        return dict(
+            query=self.filter(query, item_filter),
+            sort=None if sort == "id" else getattr(Item, sort),
+            descending=item_filter.sort.startswith("-"),
+        )
+
+    def get_by_sku(self, db: Session, *, owner_id: int, sku: str) -> Optional[Item]:
+        return (
+            db.query(self.model)
+            .filter(Item.owner_id == owner_id, Item.sku == sku)
+            .first()
+        )
+
     def get_multi_by_ids(
         self,
         db: Session,
@@ -52,38 +270,252 @@ class CRUDItem(CRUDBase[Item, ItemCreate, ItemUpdate]):
             .all()
         )
 
+    def iter_qrcode_rows(
+        self,
+        db: Session,
+        *,
+        ids: Optional[List[int]] = None,
+        owner_id: Optional[int] = None,
+        batch_size: int = 1000,
+    ) -> Iterator[Tuple[int, int, str, str]]:
+        """
+        (id, owner_id, sku, hash) of the given items, or of all items of owner,
+        in id order. Rows are fetched `batch_size` at a time through a
+        server-side cursor.
+        """
+        query = db.query(Item.id, Item.owner_id, Item.sku, Item.hash)
+        if ids is not None:
+            query = query.filter(Item.id.in_(ids))
+        if owner_id is not None:
+            query = query.filter(Item.owner_id == owner_id)
+        return iter(query.order_by(Item.id).yield_per(batch_size))
+
+    def iter_export_rows(
+        self, db: Session, *, owner_id: Optional[int] = None, batch_size: int = 1000
+    ) -> Iterator[Tuple[Any, ...]]:
+        """
+        Sheet columns of the items of owner, or of all items, in id order.
+        Rows are fetched `batch_size` at a time through a server-side cursor.
+        """
+        query = db.query(*[getattr(Item, name) for name in ITEM_COLUMNS])
+        if owner_id is not None:
+            query = query.filter(Item.owner_id == owner_id)
+        return iter(query.order_by(Item.id).yield_per(batch_size))
+
     def import_from_sheet(
         self,
         db: Session,
         *,
         file: UploadFile,
         owner_id: int,
+    ) -> UpsertResult:
+        batch = normalize_items(read_sheet(file.filename, file.file.read()))
+        if batch.errors:
+            raise ImportValidationError(batch.errors)
+        return self.upsert_multi_with_owner(
+            db=db, objs_in=batch.records(), owner_id=owner_id)
+
+    def import_sheet_in_batches(
+        self,
+        db: Session,
+        *,
+        filename: str,
+        file: IO[bytes],
+        owner_id: int,
+        batch_size: int,
+        max_errors: int = 100,
+        progress: Optional[Callable[[ImportSummary], bool]] = None,
+        dry_run: bool = False,
+    ) -> ImportSummary:
+        """
+        Import a sheet `batch_size` rows at a time, committing every batch,
+        so that memory does not grow with the size of the file. Invalid rows
+        are skipped and counted; the first `max_errors` errors are reported.
+
+        `progress` is called with the summary so far after every batch, and
+        stops the import by returning False. A `dry_run` only validates the
+        sheet and writes nothing.
+        """
+        summary = ImportSummary()
+        for chunk in iter_sheet(filename, file, batch_size):
+            errors = check_columns(chunk)
+            if errors:
+                summary.errors.extend(
+                    ImportRowError(**error._asdict()) for error in errors
+                )
+                break
+            batch = normalize_items(chunk)
+            summary.rows += len(batch) + batch.failed
+            summary.failed += batch.failed
+            summary.errors.extend(
+                ImportRowError(**error._asdict())
+                for error in batch.errors[:max(0, max_errors - len(summary.errors))]
+            )
+            if dry_run:
+                continue
+            result = self.upsert_multi_with_owner(
+                db=db, objs_in=batch.records(), owner_id=owner_id
+            )
+            summary.inserted += len(result.inserted)
+            summary.updated += len(result.updated)
+            summary.unchanged += result.unchanged
+            if progress is not None and progress(summary) is False:
+                break
+        return summary
+
+    def allocate_ids(self, db: Session, *, count: int) -> List[int]:
+        """Reserve `count` ids from the item id sequence in one round trip"""
+        result = db.execute(
+            text(
+                "SELECT nextval(pg_get_serial_sequence('item', 'id')) "
+                "FROM generate_series(1, :count)"
+            ),
+            {"count": count},
+        )
+        return [id for (id,) in result]
+
+    def _insert_values(
+        self, obj_in: Union[ItemCreate, Dict[str, Any]]
+    ) -> Dict[str, Any]:
+        """
+        Column values of a new item for a Core INSERT. Missing values take
+        the column default, as the ORM does, instead of NULL.
+        """
+        values = dict(obj_in if isinstance(obj_in, dict) else obj_in.dict())
+        for column in self.model.__table__.columns:
+            default = column.default
+            if values.get(column.key) is None and default and default.is_scalar:
+                values[column.key] = default.arg
+        return values
+
+    def create_multi_with_owner(
+        self,
+        db: Session,
+        *,
+        objs_in: Sequence[Union[ItemCreate, Dict[str, Any]]],
+        owner_id: int,
+        batch_size: int = 1000,
     ) -> List[Item]:
-        df = None
-        if file.filename.endswith('.csv'):
-            df = pandas.read_csv(io.BytesIO(file.file.read()))
-        else:
-            df = pandas.read_excel(file.file.read(), engine='openpyxl')
-        item_list = []
-        for index, row in df[df.SKU.notnull()].iterrows():
-            date = row[df.columns[5]]
-            if type(date) is not str:
-                date = date.strftime('%Y-%m-%d')
-            price = str(row[df.columns[3]])
-            if price.startswith('$'):
-                price = price[1:]
-            item_list.append(ItemCreate(
-                sku=row[df.columns[0]],
-                type=row[df.columns[1]],
-                description=row[df.columns[2]],
-                price=float(price),
-                quantity=int(row[df.columns[4]]),
-                qaod=date,
-            ))
-        for i in range(len(item_list)):
-            item_list[i] = self.create_with_owner(
-                db=db, obj_in=item_list[i], owner_id=owner_id)
-        return item_list
+        """
+        Insert many items in a single transaction, `batch_size` rows per
+        multi-row INSERT ... RETURNING.
+
+        Ids are reserved up front so that every hash, which may encode the id,
+        is generated before inserting. The returned items are built from the
+        returned rows and are not attached to the session.
+        """
+        if not objs_in:
+            return []
+        ids = self.allocate_ids(db, count=len(objs_in))
+        now = datetime.utcnow()
+        rows = [
+            dict(
+                self._insert_values(obj_in),
+                id=id,
+                owner_id=owner_id,
+                hash=self.new_hash(id),
+                version=1,
+                updated_at=now,
+            )
+            for id, obj_in in zip(ids, objs_in)
+        ]
+        table = self.model.__table__
+        items = []
+        try:
+            for start in range(0, len(rows), batch_size):
+                result = db.execute(
+                    table.insert()
+                    .values(rows[start:start + batch_size])
+                    .returning(*table.columns)
+                )
+                items.extend(self.model(**dict(row)) for row in result)
+            db.commit()
+        except Exception:
+            db.rollback()
+            raise
+        scan_filter.added(*[item.hash for item in items])
+        enqueue_qrcode_generation(*[item.id for item in items])
+        return items
+
+    def upsert_multi_with_owner(
+        self,
+        db: Session,
+        *,
+        objs_in: Sequence[Union[ItemCreate, Dict[str, Any]]],
+        owner_id: int,
+        batch_size: int = 1000,
+    ) -> UpsertResult:
+        """
+        Insert many items in a single transaction, updating the UPSERT_COLUMNS
+        of the owner's items that already have their SKU instead of creating
+        duplicates. Updated items keep their hash, so printed QR codes stay
+        valid.
+
+        Runs `batch_size` rows per INSERT ... ON CONFLICT DO UPDATE. Items
+        whose values do not change are not written at all.
+        """
+        # A statement cannot update the same row twice: the last row wins
+        by_sku: Dict[str, Dict[str, Any]] = {}
+        for obj_in in objs_in:
+            values = self._insert_values(obj_in)
+            by_sku[values["sku"]] = values
+        if not by_sku:
+            return UpsertResult([], [], 0)
+        # Rows updating an item leave gaps in the id sequence, which is fine
+        ids = self.allocate_ids(db, count=len(by_sku))
+        now = datetime.utcnow()
+        rows = [
+            dict(
+                values,
+                id=id,
+                owner_id=owner_id,
+                hash=self.new_hash(id),
+                version=1,
+                updated_at=now,
+            )
+            for id, values in zip(ids, by_sku.values())
+        ]
+        table = self.model.__table__
+        inserted, updated = [], []
+        try:
+            for start in range(0, len(rows), batch_size):
+                stmt = insert(table).values(rows[start:start + batch_size])
+                stmt = stmt.on_conflict_do_update(
+                    index_elements=[table.c.owner_id, table.c.sku],
+                    set_=dict(
+                        {name: stmt.excluded[name] for name in UPSERT_COLUMNS},
+                        version=table.c.version + 1,
+                        updated_at=stmt.excluded.updated_at,
+                    ),
+                    where=or_(
+                        *[
+                            table.c[name].is_distinct_from(stmt.excluded[name])
+                            for name in UPSERT_COLUMNS
+                        ]
+                    ),
+                )
+                # xmax is only set on rows written by the update
+                result = db.execute(
+                    stmt.returning(
+                        *table.columns,
+                        (literal_column("xmax") == 0).label("was_inserted"),
+                    )
+                )
+                for row in result:
+                    values = dict(row)
+                    was_inserted = values.pop("was_inserted")
+                    item = self.model(**values)
+                    (inserted if was_inserted else updated).append(item)
+            db.commit()
+        except Exception:
+            db.rollback()
+            raise
+        scan_cache.invalidate(*[item.hash for item in updated])
+        scan_filter.added(*[item.hash for item in inserted])
+        enqueue_qrcode_generation(*[item.id for item in inserted])
+        return UpsertResult(
+            inserted, updated, len(objs_in) - len(inserted) - len(updated)
+        )
 
     def refresh_hash(
         self,
@@ -91,15 +523,85 @@ class CRUDItem(CRUDBase[Item, ItemCreate, ItemUpdate]):
         *,
         db_obj: Item,
     ) -> Item:
-        db_obj.hash = token_urlsafe(16)
-        print(db_obj.hash)
+        old_hash = db_obj.hash
+        db_obj.hash = self.new_hash(db_obj.id, previous=old_hash)
+        db_obj.version = Item.version + 1
         db.add(db_obj)
         db.commit()
         db.refresh(db_obj)
+        scan_cache.invalidate(old_hash)
+        scan_filter.added(db_obj.hash)
+        scan_filter.removed(old_hash)
+        qr_cache.invalidate_payload(qrcode_payload(old_hash))
+        enqueue_qrcode_generation(db_obj.id)
+        enqueue_qrcode_deletion(old_hash)
         return db_obj
 
+    def get_missing_qrcodes(
+        self, db: Session, *, ids: List[int]
+    ) -> List[Tuple[int, str]]:
+        """(id, hash) of the given items whose QR codes are not stored yet"""
+        return (
+            db.query(Item.id, Item.hash)
+            .filter(Item.id.in_(ids))
+            .filter(or_(Item.qrcode_hash.is_(None), Item.qrcode_hash != Item.hash))
+            .all()
+        )
+
+    def set_qrcode_hash(self, db: Session, *, id: int, hash: str) -> bool:
+        """
+        Record that the QR codes of `hash` are stored, unless the item was
+        deleted or its hash changed in the meantime.
+        """
+        updated = (
+            db.query(Item)
+            .filter(Item.id == id, Item.hash == hash)
+            .update(
+                {Item.qrcode_hash: hash, Item.updated_at: Item.updated_at},
+                synchronize_session=False,
+            )
+        )
+        db.commit()
+        return bool(updated)
+
+    def new_hash(
+        self, id: Optional[int] = None, previous: Optional[str] = None
+    ) -> Optional[str]:
+        """
+        New hash of an item under ITEM_CODE_SCHEME. Short codes need the item
+        id, so None is returned for them until it is known.
+        """
+        if settings.ITEM_CODE_SCHEME != "short":
+            return token_urlsafe(16)
+        if id is None:
+            return None
+        return item_codec.next_code(id, previous)
+
     def get_by_hash(self, db: Session, hash: str) -> Optional[Item]:
+        decoded = item_codec.decode(hash)
+        if decoded is not None:
+            obj = self.get(db, id=decoded[0])
+            return obj if obj is not None and obj.hash == hash else None
         return db.query(self.model).filter(self.model.hash == hash).first()
 
+    def iter_hashes(self, db: Session) -> Iterator[str]:
+        for (hash,) in db.query(self.model.hash).yield_per(10000):
+            yield hash
+
+    def get_by_hash_with_assets(self, db: Session, hash: str) -> Optional[Item]:
+        """
+        Load the item and its assets, ordered by `Asset.order`, in one query.
+
+        Short codes are decoded to the primary key; other hashes are looked
+        up in the unique hash index.
+        """
+        query = db.query(self.model).options(joinedload(self.model.assets))
+        decoded = item_codec.decode(hash)
+        if decoded is None:
+            return query.filter(self.model.hash == hash).one_or_none()
+        obj = query.filter(self.model.id == decoded[0]).one_or_none()
+        # The salt may have been rotated by refresh_hash
+        return obj if obj is not None and obj.hash == hash else None
+
 
 item = CRUDItem(Item)
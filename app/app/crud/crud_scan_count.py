@@ -0,0 +1,46 @@
+from datetime import datetime
+from typing import Dict, Optional, Tuple
+
+from sqlalchemy import func
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.orm import Session
+
+from models.item import Item
+from models.scan_count import ScanCount
+
+
+class CRUDScanCount:
+    def get_by_item(self, db: Session, *, item_id: int) -> Optional[ScanCount]:
+        return db.query(ScanCount).filter(ScanCount.item_id == item_id).first()
+
+    def add_counts(
+        self, db: Session, *, counts: Dict[int, Tuple[int, datetime]]
+    ) -> None:
+        """
+        Add a batch of scan increments with one multi-row UPSERT.
+        """
+        # Items deleted since they were scanned would violate the foreign key
+        live_ids = {
+            id for (id,) in db.query(Item.id).filter(Item.id.in_(list(counts)))
+        }
+        rows = [
+            {"item_id": item_id, "count": count, "last_scanned_at": last_scanned_at}
+            for item_id, (count, last_scanned_at) in counts.items()
+            if item_id in live_ids
+        ]
+        if rows:
+            stmt = insert(ScanCount).values(rows)
+            stmt = stmt.on_conflict_do_update(
+                index_elements=[ScanCount.item_id],
+                set_={
+                    "count": ScanCount.count + stmt.excluded["count"],
+                    "last_scanned_at": func.greatest(
+                        ScanCount.last_scanned_at, stmt.excluded.last_scanned_at
+                    ),
+                },
+            )
+            db.execute(stmt)
+        db.commit()
+
+
+scan_count = CRUDScanCount()
@@ -0,0 +1,145 @@
+from collections import Counter
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.orm import Session
+
+from models.item import Item
+from models.scan_event import ScanEvent, ScanEventSegment
+from models.scan_rollup import ItemScanRollup, OwnerScanRollup
+
+BATCH_SIZE = 1000
+GRANULARITIES = {
+    "hour": lambda t: t.replace(minute=0, second=0, microsecond=0),
+    "day": lambda t: t.replace(hour=0, minute=0, second=0, microsecond=0),
+}
+
+
+def _chunks(rows: List[Dict[str, Any]], size: int = BATCH_SIZE) -> Any:
+    for start in range(0, len(rows), size):
+        yield rows[start:start + size]
+
+
+class CRUDScanEvent:
+    def load_segment(
+        self, db: Session, *, name: str, events: List[Dict[str, Any]]
+    ) -> int:
+        """
+        Bulk-load one event log segment and add it to the hourly and daily
+        rollups, in a single transaction. Loading a segment twice is a no-op.
+        """
+        if db.query(ScanEventSegment).get(name):
+            return 0
+        item_ids = {event["i"] for event in events}
+        owners = dict(
+            db.query(Item.id, Item.owner_id).filter(Item.id.in_(list(item_ids)))
+        )
+        rows = [
+            {
+                "item_id": event["i"],
+                "hash": event.get("h"),
+                "scanned_at": datetime.utcfromtimestamp(event["t"]),
+                "user_agent_class": event.get("ua"),
+                "referrer": event.get("r") or None,
+            }
+            for event in events
+            # Events of items deleted in the meantime are dropped
+            if event["i"] in owners
+        ]
+        for chunk in _chunks(rows):
+            db.execute(insert(ScanEvent).values(chunk))
+
+        item_counts: Counter = Counter()
+        owner_counts: Counter = Counter()
+        for row in rows:
+            owner_id = owners[row["item_id"]]
+            for granularity, truncate in GRANULARITIES.items():
+                bucket = truncate(row["scanned_at"])
+                item_counts[(granularity, row["item_id"], bucket, owner_id)] += 1
+                owner_counts[(granularity, owner_id, bucket)] += 1
+        item_rows = [
+            {
+                "granularity": granularity,
+                "item_id": item_id,
+                "bucket": bucket,
+                "owner_id": owner_id,
+                "count": count,
+            }
+            for (granularity, item_id, bucket, owner_id), count in item_counts.items()
+        ]
+        for chunk in _chunks(item_rows):
+            stmt = insert(ItemScanRollup).values(chunk)
+            db.execute(
+                stmt.on_conflict_do_update(
+                    index_elements=["granularity", "item_id", "bucket"],
+                    set_={"count": ItemScanRollup.count + stmt.excluded["count"]},
+                )
+            )
+        owner_rows = [
+            {
+                "granularity": granularity,
+                "owner_id": owner_id,
+                "bucket": bucket,
+                "count": count,
+            }
+            for (granularity, owner_id, bucket), count in owner_counts.items()
+            if owner_id is not None
+        ]
+        for chunk in _chunks(owner_rows):
+            stmt = insert(OwnerScanRollup).values(chunk)
+            db.execute(
+                stmt.on_conflict_do_update(
+                    index_elements=["granularity", "owner_id", "bucket"],
+                    set_={"count": OwnerScanRollup.count + stmt.excluded["count"]},
+                )
+            )
+        db.add(
+            ScanEventSegment(name=name, loaded_at=datetime.utcnow(), events=len(rows))
+        )
+        db.commit()
+        return len(rows)
+
+    def get_owner_rollups(
+        self,
+        db: Session,
+        *,
+        owner_id: int,
+        granularity: str,
+        start: datetime,
+        end: datetime,
+    ) -> List[OwnerScanRollup]:
+        return (
+            db.query(OwnerScanRollup)
+            .filter(
+                OwnerScanRollup.owner_id == owner_id,
+                OwnerScanRollup.granularity == granularity,
+                OwnerScanRollup.bucket >= start,
+                OwnerScanRollup.bucket < end,
+            )
+            .order_by(OwnerScanRollup.bucket)
+            .all()
+        )
+
+    def get_item_rollups(
+        self,
+        db: Session,
+        *,
+        owner_id: int,
+        granularity: str,
+        start: datetime,
+        end: datetime,
+        item_id: Optional[int] = None,
+    ) -> List[ItemScanRollup]:
+        query = db.query(ItemScanRollup).filter(
+            ItemScanRollup.owner_id == owner_id,
+            ItemScanRollup.granularity == granularity,
+            ItemScanRollup.bucket >= start,
+            ItemScanRollup.bucket < end,
+        )
+        if item_id is not None:
+            query = query.filter(ItemScanRollup.item_id == item_id)
+        return query.order_by(ItemScanRollup.item_id, ItemScanRollup.bucket).all()
+
+
+scan_event = CRUDScanEvent()
@@ -3,3 +3,8 @@
 from db.base_class import Base  # noqa
 from models.item import Item  # noqa
 from models.user import User  # noqa
+from models.asset import Asset  # noqa
+from models.scan_count import ScanCount  # noqa
+from models.scan_event import ScanEvent, ScanEventSegment  # noqa
+from models.scan_rollup import ItemScanRollup, OwnerScanRollup  # noqa
+from models.import_job import ImportJob  # noqa
@@ -0,0 +1,155 @@
+import csv
+import io
+import itertools
+import json
+import re
+import zipfile
+from typing import Any, Iterable, Iterator, Sequence
+from xml.sax.saxutils import escape
+
+from import_utils import ITEM_COLUMNS
+from qr_utils import ZipStream
+
+EXPORT_FORMATS = ["csv", "xlsx", "ndjson"]
+EXPORT_MEDIA_TYPES = {
+    "csv": "text/csv",
+    "xlsx": "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
+    "ndjson": "application/x-ndjson",
+}
+# Sheet headers of ITEM_COLUMNS, as read back by import_utils.map_columns
+EXPORT_HEADERS = ["SKU", "Type", "Description", "Price", "Quantity", "QAOD"]
+
+# Characters XML 1.0 does not allow, even escaped
+_XML_ILLEGAL = re.compile("[\x00-\x08\x0b\x0c\x0e-\x1f]")
+
+_XLSX_PARTS = {
+    "[Content_Types].xml": (
+        '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+        '<Types xmlns="http://schemas.openxmlformats.org/package/2006/'
+        'content-types">'
+        '<Default Extension="rels" ContentType="application/'
+        'vnd.openxmlformats-package.relationships+xml"/>'
+        '<Default Extension="xml" ContentType="application/xml"/>'
+        '<Override PartName="/xl/workbook.xml" ContentType="application/'
+        'vnd.openxmlformats-officedocument.spreadsheetml.sheet.main+xml"/>'
+        '<Override PartName="/xl/worksheets/sheet1.xml" ContentType="'
+        'application/vnd.openxmlformats-officedocument.spreadsheetml.'
+        'worksheet+xml"/>'
+        "</Types>"
+    ),
+    "_rels/.rels": (
+        '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+        '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/'
+        'relationships">'
+        '<Relationship Id="rId1" Type="http://schemas.openxmlformats.org/'
+        'officeDocument/2006/relationships/officeDocument" '
+        'Target="xl/workbook.xml"/>'
+        "</Relationships>"
+    ),
+    "xl/workbook.xml": (
+        '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+        '<workbook xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/'
+        'main" xmlns:r="http://schemas.openxmlformats.org/officeDocument/2006/'
+        'relationships">'
+        '<sheets><sheet name="Items" sheetId="1" r:id="rId1"/></sheets>'
+        "</workbook>"
+    ),
+    "xl/_rels/workbook.xml.rels": (
+        '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+        '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/'
+        'relationships">'
+        '<Relationship Id="rId1" Type="http://schemas.openxmlformats.org/'
+        'officeDocument/2006/relationships/worksheet" '
+        'Target="worksheets/sheet1.xml"/>'
+        "</Relationships>"
+    ),
+}
+
+
+def _chunks(rows: Iterable[Sequence[Any]], size: int) -> Iterator[list]:
+    rows = iter(rows)
+    while True:
+        chunk = list(itertools.islice(rows, size))
+        if not chunk:
+            return
+        yield chunk
+
+
+def _cell_text(value: Any) -> str:
+    """Text of a cell: "" for missing values, ISO format for dates"""
+    if value is None:
+        return ""
+    if hasattr(value, "isoformat"):
+        return value.isoformat()
+    return str(value)
+
+
+def iter_csv(rows: Iterable[Sequence[Any]], chunk_rows: int) -> Iterator[bytes]:
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(EXPORT_HEADERS)
+    for chunk in _chunks(rows, chunk_rows):
+        writer.writerows([[_cell_text(value) for value in row] for row in chunk])
+        yield buffer.getvalue().encode()
+        buffer.seek(0)
+        buffer.truncate()
+    yield buffer.getvalue().encode()
+
+
+def iter_ndjson(rows: Iterable[Sequence[Any]], chunk_rows: int) -> Iterator[bytes]:
+    for chunk in _chunks(rows, chunk_rows):
+        yield "".join(
+            json.dumps(
+                dict(zip(ITEM_COLUMNS, row)), default=_cell_text, separators=(",", ":")
+            )
+            + "\n"
+            for row in chunk
+        ).encode()
+
+
+def _xlsx_cell(value: Any) -> str:
+    if value is None:
+        return "<c/>"
+    if isinstance(value, (int, float)) and not isinstance(value, bool):
+        return f'<c t="n"><v>{value!r}</v></c>'
+    text = escape(_XML_ILLEGAL.sub("", _cell_text(value)))
+    return f'<c t="inlineStr"><is><t xml:space="preserve">{text}</t></is></c>'
+
+
+def _xlsx_row(row: Sequence[Any]) -> str:
+    return "<row>" + "".join(_xlsx_cell(value) for value in row) + "</row>"
+
+
+def iter_xlsx(rows: Iterable[Sequence[Any]], chunk_rows: int) -> Iterator[bytes]:
+    """
+    Stream an XLSX workbook of one sheet. The sheet is written with inline
+    strings, so that it can be compressed and sent as the rows come instead
+    of building a shared string table first.
+    """
+    stream = ZipStream()
+    with zipfile.ZipFile(stream, mode="w", compression=zipfile.ZIP_DEFLATED) as zf:
+        for name, data in _XLSX_PARTS.items():
+            zf.writestr(name, data)
+        with zf.open("xl/worksheets/sheet1.xml", "w", force_zip64=True) as sheet:
+            sheet.write(
+                b'<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+                b'<worksheet xmlns="http://schemas.openxmlformats.org/'
+                b'spreadsheetml/2006/main"><sheetData>'
+                + _xlsx_row(EXPORT_HEADERS).encode()
+            )
+            for chunk in _chunks(rows, chunk_rows):
+                sheet.write("".join(_xlsx_row(row) for row in chunk).encode())
+                yield stream.read()
+            sheet.write(b"</sheetData></worksheet>")
+    yield stream.read()
+
+
+def iter_export(
+    format: str, rows: Iterable[Sequence[Any]], chunk_rows: int = 1000
+) -> Iterator[bytes]:
+    """
+    Encode rows of ITEM_COLUMNS values in an EXPORT_FORMATS format, one chunk
+    per `chunk_rows` rows. CSV and XLSX exports can be imported back.
+    """
+    encoders = {"csv": iter_csv, "xlsx": iter_xlsx, "ndjson": iter_ndjson}
+    return encoders[format](rows, chunk_rows)
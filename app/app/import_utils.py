@@ -0,0 +1,294 @@
+import hashlib
+import io
+import itertools
+import os
+import re
+import tempfile
+import uuid
+from contextlib import contextmanager
+from typing import IO, Any, Dict, Iterator, List, NamedTuple, Tuple
+
+import openpyxl
+import pandas
+
+from aws_utils import delete_s3_object, download_s3_fileobj, upload_s3_fileobj
+from core.config import settings
+
+S3_LOCATION_PREFIX = "s3:"
+
+# Item fields read from the sheet, in the order of the sheet columns
+ITEM_COLUMNS = ["sku", "type", "description", "price", "quantity", "qaod"]
+# Headers naming each item field, lowercased and without punctuation or spaces
+COLUMN_HEADERS = {
+    "sku": ["sku"],
+    "type": ["type"],
+    "description": ["description"],
+    "price": ["price"],
+    "quantity": ["quantity", "qty"],
+    "qaod": ["qaod", "quantityasof", "quantityasofdate", "asof", "asofdate"],
+}
+
+
+class RowError(NamedTuple):
+    row: int  # line of the sheet, the header being line 1
+    column: str
+    message: str
+
+
+class ImportValidationError(ValueError):
+    """Raised when a sheet has invalid rows; nothing was imported"""
+
+    def __init__(self, errors: List[RowError]):
+        super().__init__(f"{len(errors)} invalid cells")
+        self.errors = errors
+
+
+class ItemBatch:
+    """
+    Column-oriented batch of parsed sheet rows.
+
+    `columns` holds one list per item field, valid rows only, and `rows` the
+    sheet line of each of them. Rows with invalid values are left out and
+    reported in `errors`.
+    """
+
+    def __init__(
+        self, columns: Dict[str, List[Any]], rows: List[int], errors: List[RowError]
+    ):
+        self.columns = columns
+        self.rows = rows
+        self.errors = errors
+
+    def __len__(self) -> int:
+        return len(self.rows)
+
+    @property
+    def failed(self) -> int:
+        """Number of rows left out because of errors"""
+        return len({error.row for error in self.errors})
+
+    def records(self) -> List[Dict[str, Any]]:
+        """One dict of item fields per valid row, ready for a bulk insert"""
+        names = list(self.columns)
+        return [dict(zip(names, values)) for values in zip(*self.columns.values())]
+
+
+def read_sheet(filename: str, content: bytes) -> pandas.DataFrame:
+    if filename.endswith('.csv'):
+        return pandas.read_csv(io.BytesIO(content))
+    return pandas.read_excel(io.BytesIO(content), engine='openpyxl')
+
+
+def iter_sheet(
+    filename: str, file: IO[bytes], batch_size: int
+) -> Iterator[pandas.DataFrame]:
+    """
+    Read a sheet in chunks of at most `batch_size` rows without loading the
+    whole file. CSV files are parsed incrementally by pandas and XLSX files
+    through openpyxl's read-only row iterator. Chunks are indexed by row
+    position in the sheet, like a DataFrame of the whole sheet would be.
+    """
+    if filename.endswith('.csv'):
+        yield from pandas.read_csv(file, chunksize=batch_size)
+        return
+    workbook = openpyxl.load_workbook(file, read_only=True, data_only=True)
+    try:
+        rows = workbook.active.iter_rows(values_only=True)
+        header = list(next(rows, None) or [])
+        start = 0
+        while True:
+            chunk = list(itertools.islice(rows, batch_size))
+            if not chunk:
+                break
+            df = pandas.DataFrame(chunk, index=range(start, start + len(chunk)))
+            names = header + [None] * (len(df.columns) - len(header))
+            df.columns = names[:len(df.columns)]
+            yield df
+            start += len(chunk)
+    finally:
+        workbook.close()
+
+
+def _header(label: Any) -> str:
+    return re.sub(r"[^a-z0-9]", "", str(label).lower())
+
+
+def map_columns(df: pandas.DataFrame) -> Tuple[Dict[str, int], List[RowError]]:
+    """
+    Find the sheet column of every item field.
+
+    Columns are matched by header name, in any order. A field without a
+    matching header falls back to its position in ITEM_COLUMNS, unless that
+    column is another field's. Fields found neither way are reported.
+
+    :return: (position of the column of each field found, errors)
+    """
+    positions: Dict[str, int] = {}
+    headers = [_header(label) for label in df.columns]
+    for name in ITEM_COLUMNS:
+        for position, header in enumerate(headers):
+            if header in COLUMN_HEADERS[name] and position not in positions.values():
+                positions[name] = position
+                break
+    known = {header for aliases in COLUMN_HEADERS.values() for header in aliases}
+    errors = []
+    for position, name in enumerate(ITEM_COLUMNS):
+        if name in positions:
+            continue
+        if position < len(headers) and headers[position] not in known:
+            positions[name] = position
+        else:
+            errors.append(RowError(1, name, "Missing column"))
+    return positions, errors
+
+
+def check_columns(df: pandas.DataFrame) -> List[RowError]:
+    """Errors of the item columns missing from a sheet"""
+    return map_columns(df)[1]
+
+
+def _text(column: pandas.Series) -> pandas.Series:
+    """Stripped strings, None for missing or blank cells"""
+    present = column.notna()
+    text = column.where(present, "").astype(str).str.strip()
+    return text.where(present & (text != ""), None)
+
+
+def _number(column: pandas.Series) -> pandas.Series:
+    """Numbers, NaN for missing or unparseable cells; "$1,234.50" is 1234.5"""
+    if pandas.api.types.is_numeric_dtype(column):
+        return column.astype(float)
+    text = column.where(column.notna(), "").astype(str).str.strip()
+    text = text.str.replace(r"^\$|,", "", regex=True)
+    return pandas.to_numeric(text, errors="coerce")
+
+
+def _date(column: pandas.Series) -> pandas.Series:
+    """"%Y-%m-%d" strings, None for missing or unparseable cells"""
+    if pandas.api.types.is_datetime64_any_dtype(column):
+        dates = column
+    else:
+        # ISO dates in one vectorized pass, then anything pandas can infer
+        dates = pandas.to_datetime(column, format="%Y-%m-%d", errors="coerce")
+        rest = dates.isna() & column.notna()
+        if rest.any():
+            dates[rest] = pandas.to_datetime(
+                column[rest].astype(str), errors="coerce"
+            )
+    return dates.dt.strftime("%Y-%m-%d").where(dates.notna(), None)
+
+
+def _values(column: pandas.Series) -> List[Any]:
+    """Python values of a column, None for missing cells"""
+    return column.astype(object).where(column.notna(), None).tolist()
+
+
+def _is_blank(value: Any) -> bool:
+    return pandas.isna(value) or str(value).strip() == ""
+
+
+def normalize_items(df: pandas.DataFrame) -> ItemBatch:
+    """
+    Parse and validate the item columns of a sheet column-wise, the columns
+    being found by `map_columns`.
+
+    Rows without a SKU are skipped, like blank lines. Every invalid cell of
+    the other rows is reported as a `RowError`, and its row left out of the
+    batch.
+    """
+    positions, errors = map_columns(df)
+    if errors:
+        return ItemBatch({name: [] for name in ITEM_COLUMNS}, [], errors)
+    raw = df.iloc[:, [positions[name] for name in ITEM_COLUMNS]]
+    raw = raw.set_axis(ITEM_COLUMNS, axis=1)
+
+    sku = _text(raw["sku"])
+    keep = sku.notna()
+    raw, sku = raw[keep], sku[keep]
+    parsed = pandas.DataFrame({
+        "sku": sku,
+        "type": _text(raw["type"]),
+        "description": _text(raw["description"]),
+        "price": _number(raw["price"]),
+        "quantity": _number(raw["quantity"]),
+        "qaod": _date(raw["qaod"]),
+    })
+
+    invalid = {
+        "type": parsed["type"].isna(),
+        "price": parsed["price"].isna() | (parsed["price"] < 0),
+        "quantity": parsed["quantity"].isna()
+        | (parsed["quantity"] % 1 != 0)
+        | (parsed["quantity"] < 0),
+        "qaod": parsed["qaod"].isna(),
+    }
+    failed = pandas.Series(False, index=parsed.index)
+    errors = []
+    for name, mask in invalid.items():
+        failed |= mask
+        for index in parsed.index[mask]:
+            blank = _is_blank(raw.at[index, name])
+            message = "Missing value" if blank else "Invalid value"
+            errors.append(RowError(int(index) + 2, name, message))
+    errors.sort()
+
+    valid = parsed[~failed]
+    columns = {
+        "sku": _values(valid["sku"]),
+        "type": _values(valid["type"]),
+        "description": _values(valid["description"]),
+        "price": valid["price"].astype(float).tolist(),
+        "quantity": valid["quantity"].astype("int64").tolist(),
+        "qaod": _values(valid["qaod"]),
+    }
+    return ItemBatch(columns, (valid.index + 2).tolist(), errors)
+
+
+def spool_upload(file: IO[bytes]) -> Tuple[str, str]:
+    """
+    Copy an upload where the worker can read it: to IMPORT_SPOOL_DIR when
+    set, else to S3.
+
+    :return: (location of the copy, SHA-256 of the content)
+    """
+    digest = hashlib.sha256()
+    fd, path = tempfile.mkstemp(suffix=".upload", dir=settings.IMPORT_SPOOL_DIR)
+    with os.fdopen(fd, "wb") as spooled:
+        for chunk in iter(lambda: file.read(1 << 20), b""):
+            digest.update(chunk)
+            spooled.write(chunk)
+    if settings.IMPORT_SPOOL_DIR is not None:
+        return path, digest.hexdigest()
+    key = f"imports/{uuid.uuid4().hex}"
+    try:
+        with open(path, "rb") as spooled:
+            upload_s3_fileobj(settings.AWS_S3_BUCKET_NAME, key, spooled)
+    finally:
+        os.remove(path)
+    return S3_LOCATION_PREFIX + key, digest.hexdigest()
+
+
+@contextmanager
+def open_spooled(location: str) -> Iterator[IO[bytes]]:
+    """Open a spooled upload for reading"""
+    if not location.startswith(S3_LOCATION_PREFIX):
+        with open(location, "rb") as spooled:
+            yield spooled
+        return
+    with tempfile.TemporaryFile() as spooled:
+        download_s3_fileobj(
+            settings.AWS_S3_BUCKET_NAME,
+            location[len(S3_LOCATION_PREFIX):],
+            spooled,
+        )
+        spooled.seek(0)
+        yield spooled
+
+
+def remove_spooled(location: str) -> None:
+    if location.startswith(S3_LOCATION_PREFIX):
+        delete_s3_object(
+            settings.AWS_S3_BUCKET_NAME, location[len(S3_LOCATION_PREFIX):]
+        )
+    elif os.path.exists(location):
+        os.remove(location)
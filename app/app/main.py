@@ -1,8 +1,16 @@
+from typing import Iterator
+
 from fastapi import FastAPI
 from starlette.middleware.cors import CORSMiddleware
 
+import crud
 from api.api_v1.api import api_router
 from core.config import settings
+from core.scan_counter import ScanCounts, scan_counter
+from core.scan_events import scan_events
+from core.scan_filter import scan_filter
+from db.session import SessionLocal
+from qr_utils import qrcode_tasks, shutdown_render_pool
 
 app = FastAPI(
     title=settings.PROJECT_NAME, openapi_url=f"{settings.API_V1_STR}/openapi.json"
@@ -16,6 +24,57 @@ if settings.BACKEND_CORS_ORIGINS:
         allow_credentials=True,
         allow_methods=["*"],
         allow_headers=["*"],
+        expose_headers=[
+            "X-Import-Inserted",
+            "X-Import-Updated",
+            "X-Import-Unchanged",
+            "X-Next-Cursor",
+        ],
     )
 
 app.include_router(api_router, prefix=settings.API_V1_STR)
+
+
+def load_item_hashes() -> Iterator[str]:
+    db = SessionLocal()
+    try:
+        yield from crud.item.iter_hashes(db)
+    finally:
+        db.close()
+
+
+@app.on_event("startup")
+def start_scan_filter() -> None:
+    if settings.SCAN_FILTER_ENABLED:
+        scan_filter.start(load_item_hashes)
+
+
+def write_scan_counts(counts: ScanCounts) -> None:
+    db = SessionLocal()
+    try:
+        crud.scan_count.add_counts(db, counts=counts)
+    finally:
+        db.close()
+
+
+@app.on_event("startup")
+def start_scan_counter() -> None:
+    scan_counter.start(write_scan_counts)
+    if scan_events.enabled:
+        scan_events.start()
+
+
+@app.on_event("shutdown")
+def stop_scan_counter() -> None:
+    scan_counter.stop()
+    scan_events.stop()
+
+
+@app.on_event("shutdown")
+def stop_render_pool() -> None:
+    shutdown_render_pool()
+
+
+@app.on_event("shutdown")
+def stop_qrcode_tasks() -> None:
+    qrcode_tasks.stop()
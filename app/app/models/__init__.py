@@ -1,3 +1,7 @@
 from .item import Item
 from .user import User
-from .asset import Asset
\ No newline at end of file
+from .asset import Asset
+from .scan_count import ScanCount
+from .scan_event import ScanEvent, ScanEventSegment
+from .scan_rollup import ItemScanRollup, OwnerScanRollup
+from .import_job import ImportJob
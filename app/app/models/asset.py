@@ -1,6 +1,7 @@
+from datetime import datetime
 from typing import TYPE_CHECKING
 
-from sqlalchemy import Column, ForeignKey, Integer, String
+from sqlalchemy import Column, DateTime, ForeignKey, Integer, String
 from sqlalchemy.orm import relationship
 
 from db.base_class import Base
@@ -17,4 +18,6 @@ class Asset(Base):
     link = Column(String)
     background = Column(String)
     item_id = Column(Integer, ForeignKey("item.id", ondelete="CASCADE"))
+    version = Column(Integer, nullable=False, default=1, server_default="1")
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
     item = relationship("Item", back_populates="assets")
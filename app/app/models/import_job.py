@@ -0,0 +1,40 @@
+from datetime import datetime
+
+from sqlalchemy import JSON, Column, DateTime, ForeignKey, Index, Integer, String, text
+
+from db.base_class import Base
+
+# Statuses of a job whose upload must not be imported again, see the index
+ACTIVE_STATUSES = ("queued", "running", "succeeded")
+
+
+class ImportJob(Base):
+    id = Column(Integer, primary_key=True, index=True)
+    owner_id = Column(Integer, ForeignKey("user.id", ondelete="CASCADE"), index=True)
+    filename = Column(String, nullable=False)
+    sha256 = Column(String, nullable=False)
+    # Path in IMPORT_SPOOL_DIR, or "s3:" and the key of the spooled upload
+    location = Column(String, nullable=False)
+    # queued, running, succeeded, failed or cancelled
+    status = Column(String, nullable=False, default="queued")
+    rows = Column(Integer, nullable=False, default=0)
+    inserted = Column(Integer, nullable=False, default=0)
+    updated = Column(Integer, nullable=False, default=0, server_default="0")
+    unchanged = Column(Integer, nullable=False, default=0, server_default="0")
+    failed = Column(Integer, nullable=False, default=0)
+    errors = Column(JSON, nullable=False, default=list)
+    error = Column(String)
+    created_at = Column(DateTime, nullable=False, default=datetime.utcnow)
+    started_at = Column(DateTime)
+    finished_at = Column(DateTime)
+
+    __table_args__ = (
+        # The same file uploaded twice by an owner is only imported once
+        Index(
+            "ix_importjob_owner_sha256_active",
+            "owner_id",
+            "sha256",
+            unique=True,
+            postgresql_where=text("status IN ('queued', 'running', 'succeeded')"),
+        ),
+    )
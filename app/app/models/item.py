@@ -1,6 +1,7 @@
+from datetime import datetime
 from typing import TYPE_CHECKING
 
-from sqlalchemy import Column, ForeignKey, Integer, String, FLOAT, DATE
+from sqlalchemy import Column, ForeignKey, Index, Integer, String, FLOAT, DATE, DateTime
 from sqlalchemy.orm import relationship
 
 from db.base_class import Base
@@ -14,9 +15,9 @@ class Item(Base):
     sku = Column(String, index=True)
     type = Column(String, index=True)
     description = Column(String, index=True)
-    price = Column(FLOAT)
-    quantity = Column(Integer)
-    qaod = Column(DATE)
+    price = Column(FLOAT, index=True)
+    quantity = Column(Integer, index=True)
+    qaod = Column(DATE, index=True)
     logo = Column(String, default="")
     background = Column(String, default="")
     headerText = Column(String, default="")
@@ -24,5 +25,28 @@ class Item(Base):
     subHeaderText = Column(String, default="")
     owner_id = Column(Integer, ForeignKey("user.id", ondelete="CASCADE"))
     hash = Column(String, unique=True)
+    # Hash of the QR codes stored in S3; lags behind `hash` until the worker
+    # has stored the codes of the current one
+    qrcode_hash = Column(String, nullable=True)
+    version = Column(Integer, nullable=False, default=1, server_default="1")
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
     owner = relationship("User", back_populates="items")
-    assets = relationship("Asset", back_populates="item")
+    assets = relationship("Asset", back_populates="item", order_by="Asset.order")
+
+    __table_args__ = (
+        # Imports update the item of a SKU instead of duplicating it
+        Index("ix_item_owner_id_sku", "owner_id", "sku", unique=True),
+        # Trigram indexes of the SKU prefix filter and the fuzzy search
+        Index(
+            "ix_item_sku_trgm",
+            "sku",
+            postgresql_using="gin",
+            postgresql_ops={"sku": "gin_trgm_ops"},
+        ),
+        Index(
+            "ix_item_description_trgm",
+            "description",
+            postgresql_using="gin",
+            postgresql_ops={"description": "gin_trgm_ops"},
+        ),
+    )
@@ -0,0 +1,16 @@
+from typing import TYPE_CHECKING
+
+from sqlalchemy import BigInteger, Column, DateTime, ForeignKey, Integer
+
+from db.base_class import Base
+
+if TYPE_CHECKING:
+    from .item import Item  # noqa: F401
+
+
+class ScanCount(Base):
+    item_id = Column(
+        Integer, ForeignKey("item.id", ondelete="CASCADE"), primary_key=True
+    )
+    count = Column(BigInteger, nullable=False, default=0)
+    last_scanned_at = Column(DateTime)
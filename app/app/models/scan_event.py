@@ -0,0 +1,19 @@
+from sqlalchemy import BigInteger, Column, DateTime, ForeignKey, Integer, String
+
+from db.base_class import Base
+
+
+class ScanEvent(Base):
+    id = Column(BigInteger, primary_key=True)
+    item_id = Column(Integer, ForeignKey("item.id", ondelete="CASCADE"), index=True)
+    hash = Column(String)
+    scanned_at = Column(DateTime, nullable=False)
+    user_agent_class = Column(String)
+    referrer = Column(String)
+
+
+# Event log segments already loaded, so that a segment is never loaded twice
+class ScanEventSegment(Base):
+    name = Column(String, primary_key=True)
+    loaded_at = Column(DateTime, nullable=False)
+    events = Column(Integer, nullable=False)
@@ -0,0 +1,28 @@
+from sqlalchemy import BigInteger, Column, DateTime, ForeignKey, Index, Integer, String
+
+from db.base_class import Base
+
+
+# Scans per item and per hour/day bucket
+class ItemScanRollup(Base):
+    granularity = Column(String, primary_key=True)
+    item_id = Column(
+        Integer, ForeignKey("item.id", ondelete="CASCADE"), primary_key=True
+    )
+    bucket = Column(DateTime, primary_key=True)
+    owner_id = Column(Integer, ForeignKey("user.id", ondelete="CASCADE"))
+    count = Column(BigInteger, nullable=False)
+
+    __table_args__ = (
+        Index("ix_itemscanrollup_owner_bucket", "owner_id", "granularity", "bucket"),
+    )
+
+
+# Scans of all the items of an owner per hour/day bucket
+class OwnerScanRollup(Base):
+    granularity = Column(String, primary_key=True)
+    owner_id = Column(
+        Integer, ForeignKey("user.id", ondelete="CASCADE"), primary_key=True
+    )
+    bucket = Column(DateTime, primary_key=True)
+    count = Column(BigInteger, nullable=False)
@@ -0,0 +1,499 @@
+import asyncio
+import hashlib
+import logging
+import os
+import re
+import shutil
+import struct
+import threading
+import zipfile
+import zlib
+from collections import OrderedDict, deque
+from concurrent.futures import Executor, Future, ProcessPoolExecutor
+from typing import Any, Deque, Iterable, Iterator, List, Optional, Tuple
+
+import numpy
+import qrcode
+from qrcode.constants import (
+    ERROR_CORRECT_H,
+    ERROR_CORRECT_L,
+    ERROR_CORRECT_M,
+    ERROR_CORRECT_Q,
+)
+
+from core.celery_app import celery_app
+from core.config import settings
+from core.flusher import BufferedFlusher
+
+logger = logging.getLogger(__name__)
+
+ERROR_CORRECTION_LEVELS = {
+    "L": ERROR_CORRECT_L,
+    "M": ERROR_CORRECT_M,
+    "Q": ERROR_CORRECT_Q,
+    "H": ERROR_CORRECT_H,
+}
+
+QRCODE_MEDIA_TYPES = {
+    "svg": "image/svg+xml",
+    "png": "image/png",
+    "pdf": "application/pdf",
+}
+
+# (payload, format, size, border, error correction level)
+RenderKey = Tuple[str, str, int, int, str]
+
+# Formats pre-generated by the worker, rendered with the default options
+STORED_QRCODE_FORMATS = ("svg", "png", "pdf")
+
+
+def qrcode_payload(hash: str) -> str:
+    """Content encoded in the QR code of the item with the given hash"""
+    return settings.MENU_APP_BASE_URL + '/' + hash
+
+
+def qrcode_object_key(hash: str, format: str) -> str:
+    """S3 key of the pre-generated QR code of the item with the given hash"""
+    return f"qrcodes/{hash}/qr.{format}"
+
+
+def is_stored_rendering(size: int, border: int, error_correction: str) -> bool:
+    """Whether a rendering with these options is pre-generated by the worker"""
+    return (size, border, error_correction) == (10, 4, "M")
+
+
+class QRCodeTasks(BufferedFlusher):
+    """
+    Write-behind queue of the QR code tasks of the worker.
+
+    Writes only record the items to render and the hashes to delete; a
+    background thread, started by the first task, publishes them to the broker
+    in batches, so writes neither wait for nor fail with the broker. Tasks
+    that are lost only cost renders on demand.
+    """
+
+    def __init__(self, interval: float, max_pending: int):
+        super().__init__(interval, max_pending)
+        self._reset()
+
+    def _reset(self) -> None:
+        self._item_ids: List[int] = []
+        self._hashes: List[str] = []
+
+    def generate(self, *item_ids: int) -> None:
+        self._add(self._item_ids, item_ids)
+
+    def delete(self, *hashes: str) -> None:
+        self._add(self._hashes, hashes)
+
+    def _add(self, pending: List[Any], values: Iterable[Any]) -> None:
+        self.start()
+        with self._lock:
+            pending.extend(values)
+            count = len(self._item_ids) + len(self._hashes)
+        self._added(count)
+
+    def _flush_once(self) -> int:
+        with self._lock:
+            item_ids, self._item_ids = self._item_ids, []
+            hashes, self._hashes = self._hashes, []
+        _send_in_batches(
+            "app.worker.generate_qrcodes", item_ids, settings.QR_PREGENERATE_BATCH_SIZE
+        )
+        # delete_objects accepts at most 1000 keys
+        _send_in_batches(
+            "app.worker.delete_qrcodes", hashes, 1000 // len(STORED_QRCODE_FORMATS)
+        )
+        return len(item_ids) + len(hashes)
+
+
+def _send_in_batches(name: str, values: List[Any], batch_size: int) -> None:
+    for start in range(0, len(values), batch_size):
+        try:
+            celery_app.send_task(name, args=[values[start:start + batch_size]])
+        except Exception as e:
+            # Items without stored codes are still rendered on demand
+            logger.error(e)
+
+
+qrcode_tasks = QRCodeTasks(
+    interval=settings.QR_PREGENERATE_FLUSH_SECONDS,
+    max_pending=settings.QR_PREGENERATE_BATCH_SIZE,
+)
+
+
+def enqueue_qrcode_generation(*item_ids: int) -> None:
+    """Have the worker render and store the QR codes of the given items"""
+    if settings.QR_PREGENERATE_ENABLED and item_ids:
+        qrcode_tasks.generate(*item_ids)
+
+
+def enqueue_qrcode_deletion(*hashes: Optional[str]) -> None:
+    """Have the worker delete the stored QR codes of the given hashes"""
+    hashes = tuple(hash for hash in hashes if hash)
+    if settings.QR_PREGENERATE_ENABLED and hashes:
+        qrcode_tasks.delete(*hashes)
+
+
+def qrcode_filename(id: int, sku: Optional[str], format: str) -> str:
+    """Archive entry name of the QR code of an item"""
+    name = re.sub(r"[^A-Za-z0-9._-]+", "_", sku or "").strip("._")
+    return f"{id}-{name}.{format}" if name else f"{id}.{format}"
+
+
+def qrcode_matrix(
+    payload: str, border: int = 4, error_correction: str = "M"
+) -> List[List[bool]]:
+    """Modules of the QR code of `payload`, quiet zone included"""
+    qr = qrcode.QRCode(
+        error_correction=ERROR_CORRECTION_LEVELS[error_correction], border=border
+    )
+    qr.add_data(payload)
+    qr.make(fit=True)
+    return qr.get_matrix()
+
+
+def matrix_to_svg(modules: numpy.ndarray, size: int) -> bytes:
+    """Encode a boolean module array as an SVG with a single path
+
+    Horizontal runs of dark modules are merged with identical runs of the rows
+    below into rectangles, each drawn as one path segment in module units.
+    `size` sets the physical size: 10 is one millimetre per module, like the
+    qrcode SVG factories.
+    """
+    rows, columns = modules.shape
+    padded = numpy.zeros((rows, columns + 2), dtype=numpy.int8)
+    padded[:, 1:-1] = modules
+    edges = numpy.diff(padded, axis=1)
+    run_rows, starts = numpy.nonzero(edges == 1)
+    _, ends = numpy.nonzero(edges == -1)
+    # Order runs by shape then row, so that runs stacked on consecutive rows
+    # are adjacent and can be merged into one rectangle
+    order = numpy.lexsort((run_rows, ends, starts))
+    run_rows, starts, ends = run_rows[order], starts[order], ends[order]
+    continues = numpy.zeros(len(order), dtype=bool)
+    continues[1:] = (
+        (starts[1:] == starts[:-1])
+        & (ends[1:] == ends[:-1])
+        & (run_rows[1:] == run_rows[:-1] + 1)
+    )
+    first = numpy.nonzero(~continues)[0]
+    heights = numpy.diff(numpy.append(first, len(order)))
+    path = "".join(
+        f"M{x} {y}h{w}v{h}h-{w}z"
+        for x, y, w, h in zip(
+            starts[first].tolist(),
+            run_rows[first].tolist(),
+            (ends[first] - starts[first]).tolist(),
+            heights.tolist(),
+        )
+    )
+    extent = f"{columns * size / 10:g}mm"
+    return (
+        f'<svg xmlns="http://www.w3.org/2000/svg" version="1.1" '
+        f'width="{extent}" height="{extent}" viewBox="0 0 {columns} {rows}" '
+        f'shape-rendering="crispEdges"><path d="{path}"/></svg>'
+    ).encode("ascii")
+
+
+def _dark_runs(row: List[bool]) -> Iterator[Tuple[int, int]]:
+    """(start, length) of every horizontal run of dark modules in `row`"""
+    start = None
+    for x, dark in enumerate(row):
+        if dark and start is None:
+            start = x
+        elif not dark and start is not None:
+            yield start, x - start
+            start = None
+    if start is not None:
+        yield start, len(row) - start
+
+
+def _png_chunk(tag: bytes, data: bytes) -> bytes:
+    chunk = tag + data
+    return struct.pack(">I", len(data)) + chunk + struct.pack(">I", zlib.crc32(chunk))
+
+
+def matrix_to_png(matrix: List[List[bool]], size: int) -> bytes:
+    """Encode modules as a 1-bit grayscale PNG with `size` pixels per module"""
+    width = len(matrix[0]) * size
+    padding = "0" * (-width % 8)
+    scanlines = []
+    for row in matrix:
+        bits = "".join(("0" if dark else "1") * size for dark in row) + padding
+        scanline = b"\x00" + int(bits, 2).to_bytes(len(bits) // 8, "big")
+        scanlines.append(scanline * size)
+    header = struct.pack(">IIBBBBB", width, len(matrix) * size, 1, 0, 0, 0, 0)
+    return b"".join([
+        b"\x89PNG\r\n\x1a\n",
+        _png_chunk(b"IHDR", header),
+        _png_chunk(b"IDAT", zlib.compress(b"".join(scanlines), 9)),
+        _png_chunk(b"IEND", b""),
+    ])
+
+
+def matrix_to_pdf(matrix: List[List[bool]], size: int) -> bytes:
+    """Encode modules as a single page vector PDF, `size` points per module"""
+    count = len(matrix)
+    operations = ["0 g"]
+    for y, row in enumerate(matrix):
+        bottom = (count - y - 1) * size
+        for start, length in _dark_runs(row):
+            operations.append(f"{start * size} {bottom} {length * size} {size} re")
+    operations.append("f")
+    content = zlib.compress("\n".join(operations).encode("ascii"))
+    extent = count * size
+    objects = [
+        b"<< /Type /Catalog /Pages 2 0 R >>",
+        b"<< /Type /Pages /Kids [3 0 R] /Count 1 >>",
+        b"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 %d %d] "
+        b"/Resources << >> /Contents 4 0 R >>" % (extent, extent),
+        b"<< /Length %d /Filter /FlateDecode >>\nstream\n" % len(content)
+        + content
+        + b"\nendstream",
+    ]
+    pdf = bytearray(b"%PDF-1.4\n")
+    offsets = []
+    for number, obj in enumerate(objects, 1):
+        offsets.append(len(pdf))
+        pdf += b"%d 0 obj\n" % number + obj + b"\nendobj\n"
+    xref = len(pdf)
+    pdf += b"xref\n0 %d\n0000000000 65535 f \n" % (len(objects) + 1)
+    for offset in offsets:
+        pdf += b"%010d 00000 n \n" % offset
+    pdf += b"trailer\n<< /Size %d /Root 1 0 R >>\nstartxref\n%d\n%%%%EOF\n" % (
+        len(objects) + 1,
+        xref,
+    )
+    return bytes(pdf)
+
+
+def render_qrcode(
+    payload: str,
+    format: str = "svg",
+    size: int = 10,
+    border: int = 4,
+    error_correction: str = "M",
+) -> bytes:
+    """Render a QR code
+
+    :param payload: string to encode
+    :param format: "svg", "png" or "pdf"
+    :param size: size of a module in pixels (points for PDF)
+    :param border: width of the quiet zone in modules
+    :param error_correction: error correction level, one of L, M, Q, H
+    :return: The rendered image
+    """
+    if format == "svg":
+        modules = numpy.array(
+            qrcode_matrix(payload, border, error_correction), dtype=bool
+        )
+        return matrix_to_svg(modules, size)
+    if format == "png":
+        return matrix_to_png(qrcode_matrix(payload, border, error_correction), size)
+    if format == "pdf":
+        return matrix_to_pdf(qrcode_matrix(payload, border, error_correction), size)
+    raise ValueError(f"Unsupported QR code format: {format}")
+
+
+class QRCodeCache:
+    """Bounded cache of rendered QR codes
+
+    Images are kept in an in-memory LRU holding at most `max_bytes`, and are
+    also written to `directory` when one is configured, so that they survive
+    evictions and restarts. Files are grouped per payload, which lets
+    `invalidate_payload` drop every rendering of a payload at once.
+    """
+
+    def __init__(self, max_bytes: int, directory: Optional[str] = None):
+        self.max_bytes = max_bytes
+        self.directory = directory
+        self._entries: "OrderedDict[RenderKey, bytes]" = OrderedDict()
+        self._size = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def _payload_dir(self, payload: str) -> str:
+        digest = hashlib.sha256(payload.encode('utf-8')).hexdigest()
+        return os.path.join(str(self.directory), digest)
+
+    def _path(self, key: RenderKey) -> str:
+        payload, format, size, border, error_correction = key
+        name = f"{size}-{border}-{error_correction}.{format}"
+        return os.path.join(self._payload_dir(payload), name)
+
+    def _remember(self, key: RenderKey, data: bytes) -> None:
+        with self._lock:
+            previous = self._entries.pop(key, None)
+            if previous is not None:
+                self._size -= len(previous)
+            if len(data) > self.max_bytes:
+                return
+            self._entries[key] = data
+            self._size += len(data)
+            while self._size > self.max_bytes:
+                _, evicted = self._entries.popitem(last=False)
+                self._size -= len(evicted)
+
+    def get(self, key: RenderKey) -> Optional[bytes]:
+        with self._lock:
+            data = self._entries.get(key)
+            if data is not None:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return data
+        if self.directory is not None:
+            try:
+                with open(self._path(key), 'rb') as f:
+                    data = f.read()
+            except OSError:
+                data = None
+            if data is not None:
+                self._remember(key, data)
+                self.hits += 1
+                return data
+        self.misses += 1
+        return None
+
+    def set(self, key: RenderKey, data: bytes) -> None:
+        self._remember(key, data)
+        if self.directory is not None:
+            path = self._path(key)
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            # Write atomically so that readers never see a partial image
+            tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+            with open(tmp_path, 'wb') as f:
+                f.write(data)
+            os.replace(tmp_path, path)
+
+    def invalidate_payload(self, payload: str) -> None:
+        with self._lock:
+            for key in [key for key in self._entries if key[0] == payload]:
+                self._size -= len(self._entries.pop(key))
+        if self.directory is not None:
+            shutil.rmtree(self._payload_dir(payload), ignore_errors=True)
+
+    def get_or_render(
+        self,
+        payload: str,
+        format: str = "svg",
+        size: int = 10,
+        border: int = 4,
+        error_correction: str = "M",
+    ) -> bytes:
+        key = (payload, format, size, border, error_correction)
+        data = self.get(key)
+        if data is None:
+            data = render_qrcode(*key)
+            self.set(key, data)
+        return data
+
+    async def get_or_render_async(
+        self,
+        payload: str,
+        format: str = "svg",
+        size: int = 10,
+        border: int = 4,
+        error_correction: str = "M",
+        executor: Optional[Executor] = None,
+    ) -> bytes:
+        """Like `get_or_render`, rendering misses in the render pool"""
+        key = (payload, format, size, border, error_correction)
+        data = self.get(key)
+        if data is None:
+            loop = asyncio.get_event_loop()
+            data = await loop.run_in_executor(
+                executor or get_render_pool(), render_qrcode, *key
+            )
+            self.set(key, data)
+        return data
+
+
+_render_pool: Optional[ProcessPoolExecutor] = None
+_render_pool_lock = threading.Lock()
+
+
+def get_render_pool() -> ProcessPoolExecutor:
+    """Process pool used for bulk renders, created on first use"""
+    global _render_pool
+    with _render_pool_lock:
+        if _render_pool is None:
+            _render_pool = ProcessPoolExecutor(
+                max_workers=settings.QR_RENDER_PROCESSES or None
+            )
+        return _render_pool
+
+
+def shutdown_render_pool() -> None:
+    global _render_pool
+    with _render_pool_lock:
+        if _render_pool is not None:
+            _render_pool.shutdown(wait=False)
+            _render_pool = None
+
+
+def render_qrcodes(
+    jobs: Iterable[Tuple[Any, RenderKey]],
+    executor: Optional[Executor] = None,
+    max_in_flight: int = 16,
+) -> Iterator[Tuple[Any, bytes]]:
+    """Render many QR codes in a pool
+
+    :param jobs: pairs of (tag, render key), consumed lazily
+    :param executor: pool to render in, the shared process pool by default
+    :param max_in_flight: maximum number of renders submitted but not consumed
+    :return: pairs of (tag, image) in the order of `jobs`
+    """
+    executor = executor or get_render_pool()
+    pending: Deque[Tuple[Any, Future]] = deque()
+    try:
+        for tag, key in jobs:
+            data = qr_cache.get(key)
+            if data is not None:
+                future: Future = Future()
+                future.set_result(data)
+            else:
+                future = executor.submit(render_qrcode, *key)
+            pending.append((tag, future))
+            if len(pending) >= max_in_flight:
+                tag, future = pending.popleft()
+                yield tag, future.result()
+        while pending:
+            tag, future = pending.popleft()
+            yield tag, future.result()
+    finally:
+        for _, future in pending:
+            future.cancel()
+
+
+class ZipStream:
+    """Write-only file object handing out what was written since last read"""
+
+    def __init__(self) -> None:
+        self._chunks: List[bytes] = []
+
+    def write(self, data: bytes) -> int:
+        self._chunks.append(bytes(data))
+        return len(data)
+
+    def flush(self) -> None:
+        pass
+
+    def read(self) -> bytes:
+        data = b"".join(self._chunks)
+        self._chunks = []
+        return data
+
+
+def iter_zip(entries: Iterable[Tuple[str, bytes]]) -> Iterator[bytes]:
+    """Stream a ZIP archive of (name, data) entries, one chunk per entry"""
+    stream = ZipStream()
+    with zipfile.ZipFile(stream, mode="w", compression=zipfile.ZIP_DEFLATED) as zf:
+        for name, data in entries:
+            zf.writestr(name, data)
+            yield stream.read()
+    yield stream.read()
+
+
+qr_cache = QRCodeCache(settings.QR_CACHE_MAX_BYTES, settings.QR_CACHE_DIR)
@@ -1,6 +1,12 @@
-from .item import Item, ItemCreate, ItemInDB, ItemUpdate
+from .item import Item, ItemCreate, ItemInDB, ItemScan, ItemUpdate
 from .msg import Msg
 from .token import Token, TokenPayload
 from .user import User, UserCreate, UserInDB, UserUpdate, UserWithToken
 from .asset import Asset, AssetCreate, AssetInDB, AssetUpdate
-from .objectKey import ObjectKey
\ No newline at end of file
+from .objectKey import ObjectKey
+from .scan_count import ScanCount
+from .scan_rollup import ScanRollup
+from .qrcode import QRCodeExport
+from .item_import import ImportRowError, ImportSummary
+from .import_job import ImportJob
+from .item_filter import ItemFilter
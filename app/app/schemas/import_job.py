@@ -0,0 +1,26 @@
+from datetime import datetime
+from typing import List, Optional
+
+from pydantic import BaseModel
+
+from .item_import import ImportRowError
+
+
+# Properties to return to client
+class ImportJob(BaseModel):
+    id: int
+    filename: str
+    status: str
+    rows: int
+    inserted: int
+    updated: int
+    unchanged: int
+    failed: int
+    errors: List[ImportRowError]
+    error: Optional[str] = None
+    created_at: datetime
+    started_at: Optional[datetime] = None
+    finished_at: Optional[datetime] = None
+
+    class Config:
+        orm_mode = True
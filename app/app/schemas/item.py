@@ -1,7 +1,9 @@
-from typing import Optional
+from typing import List, Optional
 from datetime import date
 from pydantic import BaseModel
 
+from .asset import Asset
+
 
 # Shared properties
 class ItemBase(BaseModel):
@@ -58,3 +60,9 @@ class Item(ItemInDBBase):
 # Properties properties stored in DB
 class ItemInDB(ItemInDBBase):
     pass
+
+
+# Public payload of a scanned QR code, with presigned logo and asset links
+class ItemScan(BaseModel):
+    item: Item
+    assets: List[Asset]
@@ -0,0 +1,23 @@
+from datetime import date
+from typing import List, Optional
+
+from pydantic import BaseModel, Field
+
+# Columns items can be sorted by, all of them indexed
+ITEM_SORT_KEYS = ["id", "sku", "price", "quantity", "qaod"]
+
+
+# Properties to filter item listings by
+class ItemFilter(BaseModel):
+    sku_prefix: Optional[str] = None
+    type: Optional[List[str]] = None
+    price_min: Optional[float] = None
+    price_max: Optional[float] = None
+    quantity_min: Optional[int] = None
+    quantity_max: Optional[int] = None
+    qaod_from: Optional[date] = None
+    qaod_to: Optional[date] = None
+    # Fuzzy search over SKUs and descriptions
+    q: Optional[str] = None
+    # One of ITEM_SORT_KEYS, descending when prefixed with "-"
+    sort: str = Field("id", regex="^-?(" + "|".join(ITEM_SORT_KEYS) + ")$")
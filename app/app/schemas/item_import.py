@@ -0,0 +1,22 @@
+from typing import List
+
+from pydantic import BaseModel
+
+
+class ImportRowError(BaseModel):
+    row: int
+    column: str
+    message: str
+
+
+# Properties to return to client after an import
+class ImportSummary(BaseModel):
+    # Rows read, blank lines and rows without a SKU excepted
+    rows: int = 0
+    inserted: int = 0
+    # Rows of an existing SKU, which keeps its hash
+    updated: int = 0
+    unchanged: int = 0
+    failed: int = 0
+    # First errors only, see IMPORT_MAX_REPORTED_ERRORS
+    errors: List[ImportRowError] = []
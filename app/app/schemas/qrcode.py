@@ -0,0 +1,13 @@
+from typing import List, Optional
+
+from pydantic import BaseModel, Field
+
+
+# Properties to receive on bulk QR code export
+class QRCodeExport(BaseModel):
+    # All items of the current user when unset
+    ids: Optional[List[int]] = None
+    format: str = Field("svg", regex="^(svg|png|pdf)$")
+    size: int = Field(10, ge=1, le=100)
+    border: int = Field(4, ge=0, le=20)
+    error_correction: str = Field("M", regex="^[LMQH]$")
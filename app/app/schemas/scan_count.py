@@ -0,0 +1,14 @@
+from datetime import datetime
+from typing import Optional
+
+from pydantic import BaseModel
+
+
+# Properties to return to client
+class ScanCount(BaseModel):
+    item_id: int
+    count: int = 0
+    last_scanned_at: Optional[datetime] = None
+
+    class Config:
+        orm_mode = True
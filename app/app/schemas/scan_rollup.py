@@ -0,0 +1,14 @@
+from datetime import datetime
+from typing import Optional
+
+from pydantic import BaseModel
+
+
+# Properties to return to client
+class ScanRollup(BaseModel):
+    bucket: datetime
+    count: int
+    item_id: Optional[int] = None
+
+    class Config:
+        orm_mode = True
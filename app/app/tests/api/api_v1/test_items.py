@@ -1,8 +1,12 @@
+from typing import Any
+
 from fastapi.testclient import TestClient
 from sqlalchemy.orm import Session
 
+import crud
 from core.config import settings
 from tests.utils.item import create_random_item
+from tests.utils.utils import random_lower_string
 
 
 def test_create_item(
@@ -33,3 +37,22 @@ def test_read_item(
     assert content["description"] == item.description
     assert content["id"] == item.id
     assert content["owner_id"] == item.owner_id
+
+
+def test_create_item_with_concurrent_duplicate_sku(
+    client: TestClient, normal_user_token_headers: dict, monkeypatch: Any
+) -> None:
+    data = {
+        "sku": random_lower_string(),
+        "type": "food",
+        "price": 1,
+        "quantity": 1,
+        "qaod": "2021-11-20",
+    }
+    url = f"{settings.API_V1_STR}/items/"
+    response = client.post(url, headers=normal_user_token_headers, json=data)
+    assert response.status_code == 200
+    # As if the other request created it after this one checked
+    monkeypatch.setattr(crud.item, "get_by_sku", lambda *args, **kwargs: None)
+    response = client.post(url, headers=normal_user_token_headers, json=data)
+    assert response.status_code == 400
@@ -0,0 +1,22 @@
+from api.etag import etag_matches, make_etag
+
+
+def test_make_etag_is_quoted() -> None:
+    assert make_etag("item", 12, 3) == '"item-12-3"'
+
+
+def test_etag_matches_list_and_weak_validators() -> None:
+    etag = make_etag("item", 12, 3)
+    assert etag_matches(etag, etag)
+    assert etag_matches('"item-12-2", W/"item-12-3"', etag)
+    assert etag_matches("*", etag)
+    assert not etag_matches('"item-12-2"', etag)
+    assert not etag_matches(None, etag)
+
+
+def test_weak_etag() -> None:
+    etag = make_etag("scan", 12, 3, weak=True)
+    assert etag == 'W/"scan-12-3"'
+    assert etag_matches(etag, etag)
+    assert etag_matches('"scan-12-3"', etag)
+    assert not etag_matches('W/"scan-12-2"', etag)
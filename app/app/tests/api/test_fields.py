@@ -0,0 +1,34 @@
+import json
+from datetime import date
+
+import pytest
+from fastapi import HTTPException
+from starlette.responses import Response
+
+import models
+import schemas
+from api.fields import fields_param, fields_response, project, selectable_fields
+
+
+def test_selectable_fields_are_columns() -> None:
+    assert "presigned_link" not in selectable_fields(schemas.Asset, models.Asset)
+    assert "sku" in selectable_fields(schemas.Item, models.Item)
+
+
+def test_fields_param() -> None:
+    get_fields = fields_param(schemas.Item, models.Item)
+    assert get_fields(None) is None
+    assert get_fields("id, sku,price,sku") == ["id", "sku", "price"]
+    with pytest.raises(HTTPException) as e:
+        get_fields("id,owner,assets")
+    assert e.value.status_code == 400
+    assert e.value.detail == "Unknown fields: owner, assets"
+
+
+def test_fields_response_keeps_headers() -> None:
+    item = models.Item(id=1, sku="A1", price=1.5, qaod=date(2021, 11, 20))
+    response = Response()
+    response.headers["X-Next-Cursor"] = "abc"
+    projected = fields_response(response, [project(item, ["id", "qaod"])])
+    assert json.loads(projected.body) == [{"id": 1, "qaod": "2021-11-20"}]
+    assert projected.headers["X-Next-Cursor"] == "abc"
@@ -0,0 +1,33 @@
+import json
+from datetime import date
+
+from api.ndjson import iter_ndjson, wants_ndjson
+from schemas import Item
+
+
+class Row:
+    def __init__(self, id: int):
+        self.id = id
+        self.sku = f"SKU-{id}"
+        self.type = "food"
+        self.description = None
+        self.price = 1.5
+        self.quantity = id
+        self.qaod = date(2021, 11, 20)
+        self.owner_id = 1
+        self.hash = f"hash{id}"
+
+
+def test_wants_ndjson() -> None:
+    assert wants_ndjson("application/x-ndjson")
+    assert wants_ndjson("application/json;q=0.5, application/x-ndjson;q=1")
+    assert not wants_ndjson("application/json")
+    assert not wants_ndjson(None)
+
+
+def test_iter_ndjson_streams_lines() -> None:
+    chunks = list(iter_ndjson((Row(id) for id in range(5)), Item, chunk_rows=2))
+    assert len(chunks) == 3
+    lines = b"".join(chunks).decode().splitlines()
+    assert [json.loads(line)["id"] for line in lines] == [0, 1, 2, 3, 4]
+    assert json.loads(lines[0])["qaod"] == "2021-11-20"
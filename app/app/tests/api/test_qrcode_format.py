@@ -0,0 +1,9 @@
+from api.api_v1.endpoints.items import qrcode_format_from_accept
+
+
+def test_qrcode_format_from_accept() -> None:
+    assert qrcode_format_from_accept(None) is None
+    assert qrcode_format_from_accept("application/json") is None
+    assert qrcode_format_from_accept("image/png") == "png"
+    assert qrcode_format_from_accept("application/pdf;q=0.9, image/png") == "pdf"
+    assert qrcode_format_from_accept("text/html, image/svg+xml") == "svg"
@@ -0,0 +1,106 @@
+from typing import Any, Dict, Optional
+
+import pytest
+from pydantic import ValidationError
+
+from core.cache import MemoryBackend, RedisBackend, ScanCache
+from core.config import Settings
+
+
+class FakeClock:
+    def __init__(self) -> None:
+        self.now = 0.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+class FakeRedis:
+    """Local stand-in for a Redis server, honouring `px` expiry."""
+
+    def __init__(self, clock: FakeClock) -> None:
+        self.clock = clock
+        self.data: Dict[str, Any] = {}
+
+    def get(self, key: str) -> Optional[bytes]:
+        entry = self.data.get(key)
+        if entry is None or entry[0] <= self.clock():
+            return None
+        return entry[1]
+
+    def set(self, key: str, value: str, px: int) -> None:
+        self.data[key] = (self.clock() + px / 1000, value.encode())
+
+    def delete(self, *keys: str) -> None:
+        for key in keys:
+            self.data.pop(key, None)
+
+
+def test_memory_backend_expires_entries() -> None:
+    clock = FakeClock()
+    backend = MemoryBackend(clock=clock)
+    backend.set("a", {"x": 1}, ttl=10)
+    assert backend.get("a") == {"x": 1}
+    clock.now = 10
+    assert backend.get("a") is None
+
+
+def test_memory_backend_evicts_least_recently_used() -> None:
+    backend = MemoryBackend(max_entries=2)
+    backend.set("a", 1, ttl=60)
+    backend.set("b", 2, ttl=60)
+    assert backend.get("a") == 1
+    backend.set("c", 3, ttl=60)
+    assert backend.get("b") is None
+    assert backend.get("a") == 1
+    assert backend.get("c") == 3
+
+
+def test_memory_backend_log() -> None:
+    backend = MemoryBackend()
+    first = backend.append("log", [], max_entries=3)
+    backend.append("log", ["a", "b"], max_entries=3)
+    last = backend.append("log", ["c"], max_entries=3)
+    assert backend.read_after("log", first) == (last, ["a", "b", "c"])
+    assert backend.read_after("log", last) == (last, [])
+    backend.append("log", ["d"], max_entries=3)
+    # Trimmed, so the entries after it cannot be told apart from lost ones
+    assert backend.read_after("log", first) is None
+
+
+def test_scan_cache_never_outlives_presigned_links() -> None:
+    clock = FakeClock()
+    cache = ScanCache(MemoryBackend(clock=clock), ttl=3600, max_link_age=60)
+    cache.set("hash", {"item": {"logo": "https://signed"}})
+    clock.now = 59
+    assert cache.get("hash") is not None
+    clock.now = 60
+    assert cache.get("hash") is None
+
+
+def test_scan_cache_invalidate() -> None:
+    clock = FakeClock()
+    cache = ScanCache(
+        RedisBackend(FakeRedis(clock), prefix="scan:"), ttl=60, max_link_age=600
+    )
+    cache.set("a", {"item": {"id": 1}})
+    cache.set("b", {"item": {"id": 2}})
+    assert cache.get("a") == {"item": {"id": 1}}
+    cache.invalidate("a", None)
+    assert cache.get("a") is None
+    assert cache.get("b") == {"item": {"id": 2}}
+    clock.now = 60
+    assert cache.get("b") is None
+
+
+def test_memory_backend_needs_a_single_worker() -> None:
+    assert Settings(WEB_CONCURRENCY=4).CACHE_BACKEND == "none"
+    memory = Settings(WEB_CONCURRENCY=1, CACHE_BACKEND="memory")
+    assert memory.CACHE_BACKEND == "memory"
+    with pytest.raises(ValidationError):
+        Settings(WEB_CONCURRENCY=4, CACHE_BACKEND="memory")
+    shared = Settings(WEB_CONCURRENCY=4, CACHE_REDIS_URL="redis://cache")
+    assert shared.CACHE_BACKEND == "redis"
+    assert Settings(WEB_CONCURRENCY=4, CACHE_BACKEND="none").CACHE_BACKEND == "none"
+    with pytest.raises(ValidationError):
+        Settings(CACHE_BACKEND="redis")
@@ -0,0 +1,42 @@
+from secrets import token_urlsafe
+
+import pytest
+
+from core.item_codes import CODE_LENGTH, ItemCodec
+
+
+def test_codes_round_trip() -> None:
+    codec = ItemCodec("secret")
+    for id, salt in [(1, 0), (2, 0), (1, 1), (2 ** 31 - 1, 2 ** 16 - 1)]:
+        code = codec.encode(id, salt)
+        assert len(code) == CODE_LENGTH and code.isalnum()
+        assert codec.decode(code) == (id, salt)
+
+
+def test_codes_are_unique_and_keyed() -> None:
+    codec = ItemCodec("secret")
+    codes = {codec.encode(id, salt) for id in range(1, 2001) for salt in range(3)}
+    assert len(codes) == 6000
+    assert ItemCodec("other").encode(1, 0) != codec.encode(1, 0)
+
+
+def test_legacy_hashes_are_not_decoded() -> None:
+    codec = ItemCodec("secret")
+    assert codec.decode(token_urlsafe(16)) is None
+    assert codec.decode("zzzzzzzzz") is None
+    assert codec.decode("abc-def_g") is None
+    assert ItemCodec(None).decode(codec.encode(1, 0)) is None
+
+
+def test_next_code_rotates_salt() -> None:
+    codec = ItemCodec("secret")
+    first = codec.next_code(42)
+    second = codec.next_code(42, first)
+    assert second != first
+    assert codec.decode(second) == (42, (codec.decode(first)[1] + 1) % 2 ** 16)
+    assert codec.decode(codec.next_code(42, token_urlsafe(16)))[0] == 42
+
+
+def test_encode_requires_key() -> None:
+    with pytest.raises(RuntimeError):
+        ItemCodec(None).encode(1, 0)
@@ -0,0 +1,17 @@
+import datetime
+
+import pytest
+
+from core.pagination import InvalidCursor, decode_cursor, encode_cursor
+
+
+def test_cursor_round_trip() -> None:
+    cursor = encode_cursor([3, "a b", datetime.date(2021, 11, 20), 42])
+    assert "=" not in cursor
+    assert decode_cursor(cursor, 4) == [3, "a b", "2021-11-20", 42]
+
+
+@pytest.mark.parametrize("cursor", ["", "not a cursor", encode_cursor([1, 2])])
+def test_invalid_cursor(cursor: str) -> None:
+    with pytest.raises(InvalidCursor):
+        decode_cursor(cursor, 1)
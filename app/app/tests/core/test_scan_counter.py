@@ -0,0 +1,49 @@
+import time
+from typing import List
+
+import pytest
+
+from core.scan_counter import ScanCounter, ScanCounts
+
+
+def test_scan_counter_flushes_aggregated_counts() -> None:
+    batches: List[ScanCounts] = []
+    counter = ScanCounter(interval=3600, max_pending=1000)
+    counter.writer = batches.append
+    for item_id in [1, 2, 1, 1]:
+        counter.increment(item_id)
+    assert counter.flush() == 2
+    assert {item_id: count for item_id, (count, _) in batches[0].items()} == {
+        1: 3,
+        2: 1,
+    }
+    assert counter.flush() == 0
+
+
+def test_scan_counter_keeps_counts_when_write_fails() -> None:
+    def failing_writer(counts: ScanCounts) -> None:
+        raise RuntimeError("database is down")
+
+    counter = ScanCounter(interval=3600, max_pending=1000)
+    counter.writer = failing_writer
+    counter.increment(1)
+    with pytest.raises(RuntimeError):
+        counter._flush_once()
+    batches: List[ScanCounts] = []
+    counter.writer = batches.append
+    counter.increment(1)
+    counter.flush()
+    assert batches[0][1][0] == 2
+
+
+def test_scan_counter_flushes_when_batch_is_full() -> None:
+    batches: List[ScanCounts] = []
+    counter = ScanCounter(interval=3600, max_pending=3)
+    counter.start(batches.append)
+    for _ in range(3):
+        counter.increment(7)
+    deadline = time.monotonic() + 5
+    while not batches and time.monotonic() < deadline:
+        time.sleep(0.01)
+    counter.stop()
+    assert batches[0][7][0] == 3
@@ -0,0 +1,81 @@
+import os
+import socket
+import time
+from pathlib import Path
+
+from core.scan_events import (
+    ScanEventLog,
+    claim_segments,
+    classify_user_agent,
+    read_segment,
+    recover_segments,
+    segment_name,
+)
+
+
+def test_classify_user_agent() -> None:
+    iphone = "Mozilla/5.0 (iPhone; CPU iPhone OS 15_0 like Mac OS X) Safari/604.1"
+    assert classify_user_agent(iphone) == "ios"
+    assert classify_user_agent("Mozilla/5.0 (Linux; Android 12)") == "android"
+    assert classify_user_agent("Googlebot/2.1") == "bot"
+    assert classify_user_agent(None) == "unknown"
+
+
+def test_segments_are_loaded_only_once_closed(tmp_path: Path) -> None:
+    log = ScanEventLog(
+        str(tmp_path), interval=3600, max_pending=100, segment_seconds=60
+    )
+    log.append(item_id=1, hash="abc", user_agent="Android", referrer=None)
+    log.append(item_id=2, hash="def", user_agent=None, referrer="https://x.test")
+    assert log.flush() == 2
+    assert claim_segments(str(tmp_path)) == []
+
+    log.stop()
+    claimed = claim_segments(str(tmp_path))
+    assert len(claimed) == 1
+    assert segment_name(claimed[0]).startswith("scans-")
+    events = read_segment(claimed[0])
+    assert [(e["i"], e["h"], e["ua"], e["r"]) for e in events] == [
+        (1, "abc", "android", ""),
+        (2, "def", "unknown", "https://x.test"),
+    ]
+    # A claimed segment is not handed to a second loader
+    assert claim_segments(str(tmp_path)) == []
+    os.remove(claimed[0])
+
+
+def test_segments_left_open_by_a_crash_are_recovered(tmp_path: Path) -> None:
+    def make_log() -> ScanEventLog:
+        return ScanEventLog(
+            str(tmp_path), interval=3600, max_pending=100, segment_seconds=60
+        )
+
+    # A process that dies between writing its segment and renaming it
+    crashed = make_log()
+    crashed.append(item_id=1, hash="abc", user_agent=None, referrer=None)
+    assert crashed.flush() == 1
+    (path,) = tmp_path.iterdir()
+    old = time.time() - 3 * crashed.stale_after
+    os.utime(path, (old, old))
+    # A process of this host that is gone, whatever the age of its segment
+    # (pids never go above 2 ** 22)
+    dead = tmp_path / f"scans-{socket.gethostname()}-{2 ** 22 + 1}-1.ndjson.part"
+    dead.write_text('{"t":1,"i":2,"h":"def","ua":"unknown","r":""}\n{"t":')
+    # A segment still being written by a live process is left alone; segments
+    # of a process are named by the millisecond they were opened
+    time.sleep(0.01)
+    live = make_log()
+    live.append(item_id=3, hash="ghi", user_agent=None, referrer=None)
+    assert live.flush() == 1
+
+    restarted = make_log()
+    restarted.start()
+    restarted.stop()
+    claimed = claim_segments(str(tmp_path))
+    events = [event["i"] for path in claimed for event in read_segment(path)]
+    assert sorted(events) == [1, 2]
+    for path in claimed:
+        os.remove(path)
+    assert recover_segments(str(tmp_path), stale_after=3600) == []
+    live.stop()
+    assert len(claim_segments(str(tmp_path))) == 1
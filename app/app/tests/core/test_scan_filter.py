@@ -0,0 +1,97 @@
+import time
+from typing import List
+
+import pytest
+from pydantic import ValidationError
+
+from core.cache import MemoryBackend
+from core.config import Settings
+from core.scan_filter import BloomFilter, ScanFilter
+
+
+def make_filter(hashes: List[str], log: MemoryBackend, loads: List[int]) -> ScanFilter:
+    scan_filter = ScanFilter(
+        MemoryBackend(),
+        log,
+        error_rate=0.001,
+        rebuild_interval=3600,
+        negative_ttl=30,
+        max_log_entries=2,
+    )
+
+    def loader() -> List[str]:
+        loads.append(1)
+        return list(hashes)
+
+    scan_filter.start(loader, wait=True)
+    return scan_filter
+
+
+def test_bloom_filter_has_no_false_negatives() -> None:
+    bloom = BloomFilter(capacity=10000, error_rate=0.01)
+    keys = [f"hash-{i}" for i in range(10000)]
+    for key in keys:
+        bloom.add(key)
+    assert all(key in bloom for key in keys)
+    false_positives = sum(f"other-{i}" in bloom for i in range(10000))
+    assert false_positives < 200
+    assert 0.005 < bloom.false_positive_rate() < 0.02
+
+
+def test_scan_filter_rejects_unknown_hashes() -> None:
+    scan_filter = make_filter(["a", "b"], MemoryBackend(), [])
+    assert scan_filter.might_exist("a")
+    assert not scan_filter.might_exist("unknown")
+    assert scan_filter.stats()["rejected"] == 1
+
+
+def test_scan_filter_tracks_local_writes() -> None:
+    scan_filter = make_filter(["a"], MemoryBackend(), [])
+    scan_filter.added("new")
+    assert scan_filter.might_exist("new")
+    scan_filter.removed("a")
+    assert not scan_filter.might_exist("a")
+    scan_filter.record_miss("missing")
+    assert not scan_filter.might_exist("missing")
+    scan_filter.added("missing")
+    assert scan_filter.might_exist("missing")
+
+
+def test_scan_filter_applies_remote_writes_without_rebuilding() -> None:
+    log = MemoryBackend()
+    loads: List[int] = []
+    scan_filter = make_filter(["a"], log, loads)
+    # Another worker sharing the backend creates an item
+    other = ScanFilter(
+        MemoryBackend(), log, error_rate=0.001, rebuild_interval=3600, negative_ttl=30
+    )
+    other.added("remote")
+    assert scan_filter.might_exist("remote")
+    assert not scan_filter.might_exist("unknown")
+    assert len(loads) == 1
+
+
+def test_scan_filter_rebuilds_when_behind_the_log() -> None:
+    log = MemoryBackend()
+    hashes = ["a"]
+    loads: List[int] = []
+    scan_filter = make_filter(hashes, log, loads)
+    hashes.extend(["b", "c", "d"])
+    for hash in hashes[1:]:
+        log.append("added", [hash], max_entries=2)
+    # "b" was trimmed from the log, so the filter cannot tell it is unknown
+    assert scan_filter.might_exist("unknown")
+    for _ in range(100):
+        if len(loads) == 2 and not scan_filter._rebuilding:
+            break
+        time.sleep(0.01)
+    assert len(loads) == 2
+    assert scan_filter.might_exist("b")
+    assert not scan_filter.might_exist("unknown")
+
+
+def test_scan_filter_needs_a_shared_backend() -> None:
+    assert not Settings().SCAN_FILTER_ENABLED
+    with pytest.raises(ValidationError):
+        Settings(SCAN_FILTER_ENABLED=True)
+    assert Settings(CACHE_REDIS_URL="redis://cache").SCAN_FILTER_ENABLED
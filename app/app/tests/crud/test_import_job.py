@@ -0,0 +1,56 @@
+from pathlib import Path
+
+from sqlalchemy.orm import Session
+
+import crud
+from tests.utils.user import create_random_user
+from tests.utils.utils import random_lower_string
+from worker import run_import_job
+
+CSV = b"SKU,Type,Description,Price,Quantity,QAOD\nA-1,food,,1.5,1,2021-11-20\n"
+
+
+def create_job(db: Session, tmp_path: Path) -> int:
+    user = create_random_user(db)
+    location = tmp_path / "upload"
+    location.write_bytes(CSV)
+    job, created = crud.import_job.create(
+        db,
+        owner_id=user.id,
+        filename="items.csv",
+        sha256=random_lower_string(),
+        location=str(location),
+    )
+    assert created
+    return job.id
+
+
+def test_run_import_job(db: Session, tmp_path: Path) -> None:
+    job_id = create_job(db, tmp_path)
+    run_import_job(job_id)
+    db.expire_all()
+    job = crud.import_job.get(db, id=job_id)
+    assert (job.status, job.rows, job.inserted) == ("succeeded", 1, 1)
+    assert not (tmp_path / "upload").exists()
+
+
+def test_redelivered_import_job_fails(db: Session, tmp_path: Path) -> None:
+    job_id = create_job(db, tmp_path)
+    # As left by a worker lost while importing
+    assert crud.import_job.start(db, id=job_id)
+    run_import_job(job_id)
+    db.expire_all()
+    job = crud.import_job.get(db, id=job_id)
+    assert job.status == "failed" and job.finished_at is not None
+    assert not (tmp_path / "upload").exists()
+    active = crud.import_job.get_active(db, owner_id=job.owner_id, sha256=job.sha256)
+    assert active is None
+
+
+def test_cancelled_import_job_removes_upload(db: Session, tmp_path: Path) -> None:
+    job_id = create_job(db, tmp_path)
+    assert crud.import_job.cancel(db, id=job_id)
+    run_import_job(job_id)
+    db.expire_all()
+    assert crud.import_job.get(db, id=job_id).status == "cancelled"
+    assert not (tmp_path / "upload").exists()
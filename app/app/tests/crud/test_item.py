@@ -1,7 +1,16 @@
+import datetime
+import io
+from typing import Any, Dict, Iterator, List, Set
+
+import pytest
+from sqlalchemy.dialects import postgresql
 from sqlalchemy.orm import Session
 
 import crud
+from crud.crud_item import DuplicateSKUError
+from models.item import Item
 from schemas.item import ItemCreate, ItemUpdate
+from schemas.item_filter import ItemFilter
 from tests.utils.user import create_random_user
 from tests.utils.utils import random_lower_string
 
@@ -59,3 +68,223 @@ def test_delete_item(db: Session) -> None:
     assert item2.title == title
     assert item2.description == description
     assert item2.owner_id == user.id
+
+
+def test_create_multi_with_owner(db: Session) -> None:
+    user = create_random_user(db)
+    items_in = [
+        ItemCreate(
+            sku=random_lower_string(),
+            type="food",
+            description=random_lower_string(),
+            price=1.5,
+            quantity=i,
+            qaod="2021-11-20",
+        )
+        for i in range(5)
+    ]
+    items = crud.item.create_multi_with_owner(
+        db=db, objs_in=items_in, owner_id=user.id, batch_size=2
+    )
+    assert [item.sku for item in items] == [item_in.sku for item_in in items_in]
+    assert len({item.hash for item in items}) == 5
+    stored = crud.item.get_multi_by_ids(db=db, ids=[item.id for item in items])
+    assert {item.id for item in stored} == {item.id for item in items}
+    assert all(item.owner_id == user.id for item in stored)
+
+
+def test_bulk_inserts_apply_column_defaults(db: Session) -> None:
+    user = create_random_user(db)
+    item_in = ItemCreate(
+        sku=random_lower_string(),
+        type="food",
+        price=1.5,
+        quantity=1,
+        qaod="2021-11-20",
+    )
+    assert item_in.logo is None
+    single = crud.item.create_with_owner(db=db, obj_in=item_in, owner_id=user.id)
+    [created] = crud.item.create_multi_with_owner(
+        db=db, objs_in=[item_in.copy(update={"sku": "bulk"})], owner_id=user.id
+    )
+    [upserted] = crud.item.upsert_multi_with_owner(
+        db=db, objs_in=[item_in.copy(update={"sku": "upsert"})], owner_id=user.id
+    ).inserted
+    for item in [single, created, upserted]:
+        stored = crud.item.get(db=db, id=item.id)
+        assert stored.logo == ""
+        assert (stored.background, stored.headerText) == ("", "")
+        assert (stored.headerColor, stored.subHeaderText) == ("", "")
+
+
+def test_import_sheet_in_batches(db: Session) -> None:
+    user = create_random_user(db)
+    sheet = (
+        "SKU,Type,Description,Price,Quantity,QAOD\n"
+        + "".join(f"{random_lower_string()},food,,$1.50,{i},2021-11-20\n"
+                  for i in range(5))
+        + "BAD,food,,abc,1,2021-11-20\n"
+    )
+    summary = crud.item.import_sheet_in_batches(
+        db=db,
+        filename="items.csv",
+        file=io.BytesIO(sheet.encode()),
+        owner_id=user.id,
+        batch_size=2,
+    )
+    assert (summary.rows, summary.inserted, summary.failed) == (6, 5, 1)
+    assert summary.errors[0].row == 7
+    assert len(crud.item.get_multi_by_owner(db=db, owner_id=user.id)) == 5
+
+
+def test_upsert_multi_with_owner(db: Session) -> None:
+    user = create_random_user(db)
+    items_in = [
+        dict(
+            sku=f"SKU-{i}",
+            type="food",
+            description=None,
+            price=1.5,
+            quantity=i,
+            qaod="2021-11-20",
+        )
+        for i in range(3)
+    ]
+    first = crud.item.upsert_multi_with_owner(
+        db=db, objs_in=items_in, owner_id=user.id
+    )
+    assert (len(first.inserted), len(first.updated), first.unchanged) == (3, 0, 0)
+    items_in[1] = dict(items_in[1], price=2.5)
+    second = crud.item.upsert_multi_with_owner(
+        db=db, objs_in=items_in, owner_id=user.id, batch_size=2
+    )
+    assert (len(second.inserted), len(second.updated), second.unchanged) == (0, 1, 2)
+    assert second.updated[0].id == first.inserted[1].id
+    assert second.updated[0].hash == first.inserted[1].hash
+    assert second.updated[0].price == 2.5
+    assert len(crud.item.get_multi_by_owner(db=db, owner_id=user.id)) == 3
+
+
+def test_import_sheet_dry_run(db: Session) -> None:
+    user = create_random_user(db)
+    sheet = (
+        "SKU,Type,Description,Price,Quantity,QAOD\n"
+        "A1,food,,$1.50,1,2021-11-20\n"
+        "A2,food,,abc,1,2021-11-20\n"
+    )
+    summary = crud.item.import_sheet_in_batches(
+        db=db,
+        filename="items.csv",
+        file=io.BytesIO(sheet.encode()),
+        owner_id=user.id,
+        batch_size=10,
+        dry_run=True,
+    )
+    assert (summary.rows, summary.inserted, summary.failed) == (2, 0, 1)
+    assert summary.errors[0].row == 3
+    assert crud.item.get_multi_by_owner(db=db, owner_id=user.id) == []
+
+
+def test_get_page_by_owner(db: Session) -> None:
+    user = create_random_user(db)
+    crud.item.create_multi_with_owner(
+        db=db,
+        objs_in=[
+            dict(sku=f"SKU-{i}", type="food", price=1.0, quantity=i, qaod="2021-11-20")
+            for i in range(5)
+        ],
+        owner_id=user.id,
+    )
+    ids, cursor = [], None
+    while True:
+        items, cursor = crud.item.get_page_by_owner(
+            db=db, owner_id=user.id, limit=2, cursor=cursor
+        )
+        ids.append([item.id for item in items])
+        if cursor is None:
+            break
+    assert [len(page) for page in ids] == [2, 2, 1]
+    flat = [id for page in ids for id in page]
+    assert flat == sorted(flat)
+
+
+def test_search_sorts_and_filters(db: Session) -> None:
+    user = create_random_user(db)
+    crud.item.create_multi_with_owner(
+        db=db,
+        objs_in=[
+            dict(
+                sku=f"SKU-{i}", type="food", price=i % 3, quantity=i, qaod="2021-11-20"
+            )
+            for i in range(6)
+        ],
+        owner_id=user.id,
+    )
+    item_filter = ItemFilter(quantity_min=1, sort="-price")
+    items, cursor = crud.item.search(
+        db=db, item_filter=item_filter, limit=3, owner_id=user.id
+    )
+    rest, last = crud.item.search(
+        db=db, item_filter=item_filter, limit=3, cursor=cursor, owner_id=user.id
+    )
+    assert last is None
+    assert [item.price for item in items + rest] == [2, 2, 1, 1, 0]
+    with pytest.raises(ValueError):
+        crud.item.search(
+            db=db, item_filter=ItemFilter(), limit=3, cursor=cursor, owner_id=user.id
+        )
+
+
+def index_conditions(plan: Dict[str, Any]) -> Iterator[str]:
+    """Names of the indexes searched with an index condition in a JSON plan"""
+    if "Index Name" in plan and "Index Cond" in plan:
+        yield plan["Index Name"]
+    for child in plan.get("Plans", []):
+        yield from index_conditions(child)
+
+
+@pytest.mark.parametrize(
+    "item_filter,indexes",
+    [
+        # The B-tree index serves prefixes when the database collation is C
+        (ItemFilter(sku_prefix="SKU-1"), [{"ix_item_sku_trgm", "ix_item_sku"}]),
+        (ItemFilter(type=["food", "drink"]), [{"ix_item_type"}]),
+        (ItemFilter(price_min=1, price_max=2), [{"ix_item_price"}]),
+        (ItemFilter(quantity_min=10), [{"ix_item_quantity"}]),
+        (ItemFilter(qaod_from=datetime.date(2021, 1, 1)), [{"ix_item_qaod"}]),
+        (
+            ItemFilter(q="apple"),
+            [{"ix_item_sku_trgm"}, {"ix_item_description_trgm"}],
+        ),
+    ],
+)
+def test_item_filters_use_their_index(
+    db: Session, item_filter: ItemFilter, indexes: List[Set[str]]
+) -> None:
+    query = crud.item.filter(db.query(Item), item_filter)
+    compiled = query.statement.compile(dialect=postgresql.psycopg2.dialect())
+    cursor = db.connection().connection.cursor()
+    # Sequential scans win on a small table unless they are ruled out
+    cursor.execute("SET LOCAL enable_seqscan = off")
+    cursor.execute("EXPLAIN (FORMAT JSON) " + compiled.string, compiled.params)
+    plan = cursor.fetchone()[0][0]["Plan"]
+    db.rollback()
+    used = set(index_conditions(plan))
+    for alternatives in indexes:
+        assert used & alternatives, plan
+
+
+def test_duplicate_sku_is_rejected(db: Session) -> None:
+    user = create_random_user(db)
+    item_in = ItemCreate(sku="dup", type="food", price=1, quantity=1, qaod="2021-11-20")
+    item = crud.item.create_with_owner(db=db, obj_in=item_in, owner_id=user.id)
+    with pytest.raises(DuplicateSKUError):
+        crud.item.create_with_owner(db=db, obj_in=item_in, owner_id=user.id)
+    other = crud.item.create_with_owner(
+        db=db, obj_in=item_in.copy(update={"sku": "other"}), owner_id=user.id
+    )
+    with pytest.raises(DuplicateSKUError):
+        crud.item.update(db=db, db_obj=other, obj_in=ItemUpdate(sku="dup"))
+    # The session is still usable
+    assert crud.item.get(db=db, id=item.id).sku == "dup"
+    assert crud.item.get(db=db, id=other.id).sku == "other"
@@ -0,0 +1,47 @@
+import datetime
+from typing import Any
+
+import aws_utils
+from aws_utils import S3ClientProvider
+
+
+def test_s3_client_is_shared() -> None:
+    provider = S3ClientProvider("eu-west-1", max_pool_connections=4)
+    client = provider.get_client()
+    assert provider.get_client() is client
+    assert client.meta.region_name == "eu-west-1"
+    assert client.meta.config.max_pool_connections == 4
+    assert provider.stats() == {"hits": 1, "builds": 1}
+
+
+def test_s3_client_is_rebuilt_in_forked_process() -> None:
+    provider = S3ClientProvider("us-east-2", max_pool_connections=10)
+    client = provider.get_client()
+    provider._after_fork()
+    assert provider.get_client() is not client
+    assert provider.stats()["builds"] == 2
+
+
+class FrozenDatetime(datetime.datetime):
+    @classmethod
+    def utcnow(cls) -> datetime.datetime:
+        return cls(2021, 11, 20, 23, 59, 59)
+
+
+def test_batch_presign_matches_botocore(monkeypatch: Any) -> None:
+    monkeypatch.setattr(aws_utils.datetime, "datetime", FrozenDatetime)
+    keys = [
+        "1-logo-logo.png",
+        "1-2-my video (final)+v2.mp4",
+        "12-34-menü/ümlaut~tilde&amp=x.pdf",
+    ]
+    urls = aws_utils.create_presigned_urls("qr-product-details", keys, expiration=900)
+    client = aws_utils.s3_clients.get_client()
+    assert urls == [
+        client.generate_presigned_url(
+            "get_object",
+            Params={"Bucket": "qr-product-details", "Key": key},
+            ExpiresIn=900,
+        )
+        for key in keys
+    ]
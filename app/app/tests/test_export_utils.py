@@ -0,0 +1,47 @@
+import datetime
+import io
+import json
+
+import pytest
+
+from export_utils import EXPORT_FORMATS, iter_export
+from import_utils import iter_sheet, normalize_items, read_sheet
+
+ROWS = [
+    ("A1", "food", "Apples & <pears>", 1.5, 3, datetime.date(2021, 11, 20)),
+    ("A2", "food", None, 1234.0, 0, datetime.date(2021, 1, 2)),
+    ("A3", "drink", "Water\x01", 2.0, 5, datetime.date(2021, 11, 21)),
+]
+RECORDS = [
+    {"sku": "A1", "type": "food", "description": "Apples & <pears>", "price": 1.5,
+     "quantity": 3, "qaod": "2021-11-20"},
+    {"sku": "A2", "type": "food", "description": None, "price": 1234.0,
+     "quantity": 0, "qaod": "2021-01-02"},
+]
+
+
+@pytest.mark.parametrize("format", ["csv", "xlsx"])
+def test_export_round_trips_through_import(format: str) -> None:
+    data = b"".join(iter_export(format, iter(ROWS[:2]), chunk_rows=1))
+    batch = normalize_items(read_sheet(f"items.{format}", data))
+    assert batch.errors == []
+    assert batch.records() == RECORDS
+    chunks = list(iter_sheet(f"items.{format}", io.BytesIO(data), batch_size=1))
+    assert len(chunks) == 2
+
+
+def test_export_ndjson() -> None:
+    data = b"".join(iter_export("ndjson", iter(ROWS[:2]), chunk_rows=1))
+    assert [json.loads(line) for line in data.splitlines()] == RECORDS
+
+
+def test_export_streams_chunks() -> None:
+    for format in EXPORT_FORMATS:
+        chunks = list(iter_export(format, iter(ROWS), chunk_rows=1))
+        assert len(chunks) >= 3
+
+
+def test_export_xlsx_drops_illegal_characters() -> None:
+    data = b"".join(iter_export("xlsx", iter(ROWS[2:]), chunk_rows=10))
+    batch = normalize_items(read_sheet("items.xlsx", data))
+    assert batch.columns["description"] == ["Water"]
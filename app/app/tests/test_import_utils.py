@@ -0,0 +1,130 @@
+import datetime
+import hashlib
+import io
+import os
+from pathlib import Path
+from typing import Any
+
+import openpyxl
+import pandas
+
+from core.config import settings
+from import_utils import (
+    RowError,
+    iter_sheet,
+    map_columns,
+    normalize_items,
+    open_spooled,
+    read_sheet,
+    remove_spooled,
+    spool_upload,
+)
+
+CSV = b"""SKU,Type,Description,Price,Quantity,QAOD
+A1,food,Apples,$1.50,3,2021-11-20
+A2,food,,"$1,234.00",4,11/20/2021
+,,,,,
+A3,,Pears,abc,2.5,not a date
+A4,drink,Water,2,5,
+"""
+
+
+def test_normalize_items_parses_columns() -> None:
+    batch = normalize_items(read_sheet("items.csv", CSV))
+    assert len(batch) == 2
+    assert batch.rows == [2, 3]
+    assert batch.records() == [
+        {"sku": "A1", "type": "food", "description": "Apples", "price": 1.5,
+         "quantity": 3, "qaod": "2021-11-20"},
+        {"sku": "A2", "type": "food", "description": None, "price": 1234.0,
+         "quantity": 4, "qaod": "2021-11-20"},
+    ]
+
+
+def test_normalize_items_reports_row_errors() -> None:
+    batch = normalize_items(read_sheet("items.csv", CSV))
+    assert batch.errors == [
+        RowError(5, "price", "Invalid value"),
+        RowError(5, "qaod", "Invalid value"),
+        RowError(5, "quantity", "Invalid value"),
+        RowError(5, "type", "Missing value"),
+        RowError(6, "qaod", "Missing value"),
+    ]
+
+
+def test_normalize_items_accepts_typed_cells() -> None:
+    df = pandas.DataFrame({
+        "SKU": ["A1"],
+        "Type": ["food"],
+        "Description": ["Apples"],
+        "Price": [2.25],
+        "Quantity": [7.0],
+        "QAOD": [datetime.datetime(2021, 11, 20)],
+    })
+    batch = normalize_items(df)
+    assert batch.errors == []
+    assert batch.columns["price"] == [2.25]
+    assert batch.columns["quantity"] == [7]
+    assert batch.columns["qaod"] == ["2021-11-20"]
+
+
+def test_normalize_items_needs_every_column() -> None:
+    batch = normalize_items(pandas.read_csv(io.StringIO("SKU,Type\nA1,food\n")))
+    assert len(batch) == 0
+    assert [error.column for error in batch.errors] == [
+        "description", "price", "quantity", "qaod"
+    ]
+    assert {error.row for error in batch.errors} == {1}
+
+
+def test_map_columns_by_header_then_position() -> None:
+    df = pandas.read_csv(io.StringIO(
+        "Qty,Price ($),Notes,SKU,Type,As of\n3,1.50,Apples,A1,food,2021-11-20\n"
+    ))
+    positions, errors = map_columns(df)
+    assert errors == []
+    # "Price ($)" is matched by name, "Notes" by the position of descriptions
+    assert positions == {
+        "sku": 3, "type": 4, "description": 2, "price": 1, "quantity": 0,
+        "qaod": 5,
+    }
+    assert normalize_items(df).records() == [
+        {"sku": "A1", "type": "food", "description": "Apples", "price": 1.5,
+         "quantity": 3, "qaod": "2021-11-20"},
+    ]
+
+
+def test_iter_sheet_reads_csv_in_chunks() -> None:
+    chunks = list(iter_sheet("items.csv", io.BytesIO(CSV), batch_size=2))
+    assert [len(chunk) for chunk in chunks] == [2, 2, 1]
+    batch = normalize_items(chunks[2])
+    assert batch.errors == [RowError(6, "qaod", "Missing value")]
+
+
+def test_iter_sheet_reads_xlsx_in_chunks() -> None:
+    workbook = openpyxl.Workbook()
+    sheet = workbook.active
+    sheet.append(["SKU", "Type", "Description", "Price", "Quantity", "QAOD"])
+    for i in range(5):
+        qaod = datetime.date(2021, 11, i + 1)
+        sheet.append([f"A{i}", "food", None, i + 0.5, i, qaod])
+    file = io.BytesIO()
+    workbook.save(file)
+    file.seek(0)
+    chunks = list(iter_sheet("items.xlsx", file, batch_size=2))
+    assert [len(chunk) for chunk in chunks] == [2, 2, 1]
+    assert list(chunks[0].columns)[:2] == ["SKU", "Type"]
+    batch = normalize_items(chunks[2])
+    assert batch.rows == [6]
+    assert batch.records()[0]["qaod"] == "2021-11-05"
+
+
+def test_spool_upload_to_directory(tmp_path: Path, monkeypatch: Any) -> None:
+    monkeypatch.setattr(settings, "IMPORT_SPOOL_DIR", str(tmp_path))
+    location, sha256 = spool_upload(io.BytesIO(CSV))
+    assert os.path.dirname(location) == str(tmp_path)
+    assert sha256 == hashlib.sha256(CSV).hexdigest()
+    with open_spooled(location) as file:
+        assert len(list(iter_sheet("items.csv", file, batch_size=10))) == 1
+    remove_spooled(location)
+    assert not os.listdir(tmp_path)
@@ -0,0 +1,178 @@
+import io
+import os
+import re
+import struct
+import zipfile
+import zlib
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, List
+
+import numpy
+
+import qr_utils
+from core.config import settings
+from qr_utils import (
+    QRCodeCache,
+    iter_zip,
+    matrix_to_svg,
+    qrcode_filename,
+    qrcode_matrix,
+    render_qrcode,
+    render_qrcodes,
+)
+
+
+def test_render_qrcode_depends_on_options() -> None:
+    svg = render_qrcode("https://menu.example.com/abc")
+    assert svg.startswith(b"<svg")
+    assert render_qrcode("https://menu.example.com/abc") == svg
+    assert render_qrcode("https://menu.example.com/abc", size=5) != svg
+    assert render_qrcode("https://menu.example.com/abc", error_correction="H") != svg
+
+
+def test_qr_cache_renders_once() -> None:
+    cache = QRCodeCache(max_bytes=1024 * 1024)
+    svg = cache.get_or_render("https://menu.example.com/abc")
+    assert cache.get_or_render("https://menu.example.com/abc") is svg
+    assert (cache.hits, cache.misses) == (1, 1)
+    assert cache.get_or_render("https://menu.example.com/abc", size=5) != svg
+
+
+def test_qr_cache_is_bounded() -> None:
+    size = len(render_qrcode("https://menu.example.com/0"))
+    cache = QRCodeCache(max_bytes=int(size * 2.5))
+    for i in range(5):
+        cache.get_or_render(f"https://menu.example.com/{i}")
+    assert len(cache._entries) == 2
+    assert cache._size <= cache.max_bytes
+
+
+def test_qr_cache_spills_to_disk(tmp_path: str) -> None:
+    directory = str(tmp_path)
+    cache = QRCodeCache(1024 * 1024, directory)
+    svg = cache.get_or_render("https://menu.example.com/a")
+    other = QRCodeCache(1024 * 1024, directory)
+    assert other.get(("https://menu.example.com/a", "svg", 10, 4, "M")) == svg
+    assert other.misses == 0
+
+
+def test_qr_cache_invalidates_payload(tmp_path: str) -> None:
+    cache = QRCodeCache(1024 * 1024, str(tmp_path))
+    cache.get_or_render("https://menu.example.com/a")
+    cache.get_or_render("https://menu.example.com/a", size=5)
+    cache.get_or_render("https://menu.example.com/b")
+    cache.invalidate_payload("https://menu.example.com/a")
+    assert len(cache._entries) == 1
+    assert len(os.listdir(str(tmp_path))) == 1
+    assert cache.get(("https://menu.example.com/a", "svg", 10, 4, "M")) is None
+
+
+def test_qrcode_filename() -> None:
+    assert qrcode_filename(7, "AB-12", "svg") == "7-AB-12.svg"
+    assert qrcode_filename(7, "a/b c", "svg") == "7-a_b_c.svg"
+    assert qrcode_filename(7, None, "svg") == "7.svg"
+
+
+def test_render_qrcodes_keeps_order_and_bounds_work() -> None:
+    submitted = []
+
+    class RecordingExecutor(ThreadPoolExecutor):
+        def submit(self, fn: Any, *args: Any) -> Any:  # type: ignore
+            submitted.append(args[0])
+            return super().submit(fn, *args)
+
+    keys = [(f"https://menu.example.com/{i}", "svg", 2, 1, "L") for i in range(10)]
+    with RecordingExecutor(max_workers=2) as executor:
+        results = render_qrcodes(
+            ((i, key) for i, key in enumerate(keys)),
+            executor=executor,
+            max_in_flight=3,
+        )
+        first = next(results)
+        assert len(submitted) == 3
+        rest = list(results)
+    assert [tag for tag, _ in [first] + rest] == list(range(10))
+    assert rest[-1][1] == render_qrcode(*keys[-1])
+
+
+def test_iter_zip_streams_valid_archive() -> None:
+    entries = [("a.svg", b"<svg>a</svg>"), ("b.svg", b"<svg>b</svg>")]
+    chunks = list(iter_zip(iter(entries)))
+    assert len(chunks) == 3
+    with zipfile.ZipFile(io.BytesIO(b"".join(chunks))) as zf:
+        assert zf.namelist() == ["a.svg", "b.svg"]
+        assert zf.read("b.svg") == b"<svg>b</svg>"
+
+
+def test_render_png_matches_matrix() -> None:
+    matrix = qrcode_matrix("https://menu.example.com/abc", border=2)
+    png = render_qrcode("https://menu.example.com/abc", "png", size=3, border=2)
+    assert png.startswith(b"\x89PNG\r\n\x1a\n")
+    width, height = struct.unpack(">II", png[16:24])
+    assert width == height == len(matrix) * 3
+    idat_length = struct.unpack(">I", png[33:37])[0]
+    raw = zlib.decompress(png[41:41 + idat_length])
+    stride = 1 + (width + 7) // 8
+    for y in range(height):
+        scanline = raw[y * stride + 1:(y + 1) * stride]
+        for x in range(0, width, 3):
+            white = scanline[x // 8] >> (7 - x % 8) & 1
+            assert white != matrix[y // 3][x // 3]
+
+
+def test_render_pdf_is_well_formed() -> None:
+    pdf = render_qrcode("https://menu.example.com/abc", "pdf", size=2, border=4)
+    assert pdf.startswith(b"%PDF-1.4\n")
+    assert pdf.endswith(b"%%EOF\n")
+    xref = int(pdf.rsplit(b"startxref\n", 1)[1].split(b"\n")[0])
+    assert pdf[xref:].startswith(b"xref\n0 5\n")
+    offsets = [int(line[:10]) for line in pdf[xref:].split(b"\n")[3:7]]
+    for number, offset in enumerate(offsets, 1):
+        assert pdf[offset:].startswith(b"%d 0 obj" % number)
+
+
+def test_qrcode_tasks_are_published_in_batches(monkeypatch: Any) -> None:
+    sent = []
+    monkeypatch.setattr(settings, "QR_PREGENERATE_BATCH_SIZE", 2)
+    monkeypatch.setattr(
+        qr_utils.celery_app, "send_task", lambda name, args: sent.append((name, args))
+    )
+    tasks = qr_utils.QRCodeTasks(interval=3600, max_pending=100)
+    tasks.generate(1, 2, 3)
+    tasks.delete("a")
+    assert sent == []
+    assert tasks.flush() == 4
+    assert sent == [
+        ("app.worker.generate_qrcodes", [[1, 2]]),
+        ("app.worker.generate_qrcodes", [[3]]),
+        ("app.worker.delete_qrcodes", [["a"]]),
+    ]
+    tasks.stop()
+
+
+def test_qrcode_tasks_tolerate_broker_errors(monkeypatch: Any) -> None:
+    def send_task(name: str, args: List[Any]) -> None:
+        raise ConnectionError("broker is down")
+
+    monkeypatch.setattr(qr_utils.celery_app, "send_task", send_task)
+    tasks = qr_utils.QRCodeTasks(interval=3600, max_pending=100)
+    tasks.generate(1)
+    assert tasks.flush() == 1
+    tasks.stop()
+
+
+def test_svg_path_covers_dark_modules_exactly() -> None:
+    modules = numpy.array(qrcode_matrix("https://menu.example.com/abc"), dtype=bool)
+    svg = matrix_to_svg(modules, size=10).decode()
+    assert 'width="37mm"' in svg and 'viewBox="0 0 37 37"' in svg
+    painted = numpy.zeros(modules.shape, dtype=int)
+    for x, y, w, h in re.findall(r"M(\d+) (\d+)h(\d+)v(\d+)h-\d+z", svg):
+        x, y, w, h = int(x), int(y), int(w), int(h)
+        painted[y:y + h, x:x + w] += 1
+    assert (painted == modules).all()
+
+
+def test_svg_scales_with_size() -> None:
+    modules = numpy.ones((3, 3), dtype=bool)
+    assert 'width="1.5mm"' in matrix_to_svg(modules, size=5).decode()
+    assert 'd="M0 0h3v3h-3z"' in matrix_to_svg(modules, size=5).decode()
@@ -1,7 +1,29 @@
+import os
+from typing import List
+
 from raven import Client
 
+import crud
+import schemas
+from aws_utils import delete_s3_objects, upload_s3_object
 from core.celery_app import celery_app
 from core.config import settings
+from core.scan_events import (
+    claim_segments,
+    read_segment,
+    recover_segments,
+    segment_name,
+    stale_segment_seconds,
+)
+from db.session import SessionLocal
+from import_utils import open_spooled, remove_spooled
+from qr_utils import (
+    QRCODE_MEDIA_TYPES,
+    STORED_QRCODE_FORMATS,
+    qrcode_object_key,
+    qrcode_payload,
+    render_qrcode,
+)
 
 client_sentry = Client(settings.SENTRY_DSN)
 
@@ -9,3 +31,123 @@ client_sentry = Client(settings.SENTRY_DSN)
 @celery_app.task(acks_late=True)
 def test_celery(word: str) -> str:
     return f"test task return {word}"
+
+
+@celery_app.task(acks_late=True)
+def load_scan_events() -> int:
+    """
+    Bulk-load the closed scan event log segments and update the rollups.
+    """
+    if not settings.SCAN_EVENT_LOG_DIR:
+        return 0
+    recover_segments(
+        settings.SCAN_EVENT_LOG_DIR,
+        stale_segment_seconds(
+            settings.SCAN_EVENT_SEGMENT_SECONDS, settings.SCAN_EVENT_FLUSH_SECONDS
+        ),
+    )
+    loaded = 0
+    db = SessionLocal()
+    try:
+        for path in claim_segments(settings.SCAN_EVENT_LOG_DIR):
+            loaded += crud.scan_event.load_segment(
+                db, name=segment_name(path), events=read_segment(path)
+            )
+            os.remove(path)
+    finally:
+        db.close()
+    return loaded
+
+
+@celery_app.task(acks_late=True)
+def generate_qrcodes(item_ids: List[int]) -> int:
+    """
+    Render the QR codes of items in the stored formats and upload them to S3.
+    """
+    generated = 0
+    db = SessionLocal()
+    try:
+        for id, hash in crud.item.get_missing_qrcodes(db, ids=item_ids):
+            payload = qrcode_payload(hash)
+            keys = [qrcode_object_key(hash, format) for format in STORED_QRCODE_FORMATS]
+            for key, format in zip(keys, STORED_QRCODE_FORMATS):
+                upload_s3_object(
+                    settings.AWS_S3_BUCKET_NAME,
+                    key,
+                    render_qrcode(payload, format),
+                    QRCODE_MEDIA_TYPES[format],
+                )
+            if crud.item.set_qrcode_hash(db, id=id, hash=hash):
+                generated += 1
+            else:
+                # Deleted or refreshed while rendering: nothing references them
+                delete_s3_objects(settings.AWS_S3_BUCKET_NAME, keys)
+    finally:
+        db.close()
+    return generated
+
+
+@celery_app.task(acks_late=True)
+def delete_qrcodes(hashes: List[str]) -> None:
+    """
+    Delete the stored QR codes of hashes that are no longer in use.
+    """
+    delete_s3_objects(
+        settings.AWS_S3_BUCKET_NAME,
+        [
+            qrcode_object_key(hash, format)
+            for hash in hashes
+            for format in STORED_QRCODE_FORMATS
+        ],
+    )
+
+
+@celery_app.task(acks_late=True)
+def run_import_job(job_id: int) -> None:
+    """
+    Import the spooled sheet of an import job, recording its progress after
+    every batch and stopping at the next batch once it is cancelled. The
+    spooled sheet is removed whatever the outcome.
+    """
+    db = SessionLocal()
+    job = None
+    try:
+        job = crud.import_job.get(db, id=job_id)
+        if job is None:
+            return
+        if not crud.import_job.start(db, id=job_id):
+            # The task is only delivered again once the worker running it was
+            # lost: fail the job rather than leave it running, which would
+            # keep the same upload from being imported again
+            crud.import_job.fail_lost(db, id=job_id)
+            return
+        # Batches are committed as they go, so a failure keeps the progress
+        # of the last one
+        summary = schemas.ImportSummary()
+
+        def progress(current: schemas.ImportSummary) -> bool:
+            nonlocal summary
+            summary = current.copy(deep=True)
+            return crud.import_job.update_progress(db, id=job_id, summary=current)
+
+        try:
+            with open_spooled(job.location) as file:
+                summary = crud.item.import_sheet_in_batches(
+                    db,
+                    filename=job.filename,
+                    file=file,
+                    owner_id=job.owner_id,
+                    batch_size=settings.IMPORT_BATCH_SIZE,
+                    max_errors=settings.IMPORT_MAX_REPORTED_ERRORS,
+                    progress=progress,
+                )
+        except Exception as e:
+            db.rollback()
+            crud.import_job.finish(db, id=job_id, summary=summary, error=str(e))
+            raise
+        else:
+            crud.import_job.finish(db, id=job_id, summary=summary)
+    finally:
+        if job is not None:
+            remove_spooled(job.location)
+        db.close()
@@ -3,4 +3,8 @@ set -e
 
 python /app/app/celeryworker_pre_start.py
 
-celery worker -A app.worker -l info -Q main-queue -c 1
+# -B also runs the beat scheduler of celery_app.conf.beat_schedule, such as the
+# periodic load of the scan event log. There must be a single such worker, and
+# SCAN_EVENT_LOG_DIR must be a volume mounted in both this and the backend
+# container, which writes the log.
+celery worker -A app.worker -l info -Q main-queue -c 1 -B -s /tmp/celerybeat-schedule